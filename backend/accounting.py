@@ -6,6 +6,7 @@ import uuid
 import csv
 import io
 import json
+from mongo_codec import to_datetime
 
 class AccountingEntryType(str, Enum):
     SALE = "sale"
@@ -46,6 +47,8 @@ class FrenchAccounting:
     }
     
     def __init__(self):
+        # In-memory entries of get_journal_entries_summary and of the exports called without
+        # entries. Generated entries are not added: the API shares one instance between requests.
         self.entries: List[AccountingEntry] = []
     
     def generate_invoice_entries(
@@ -58,7 +61,7 @@ class FrenchAccounting:
         """Génère les écritures comptables pour une facture selon les normes françaises"""
         
         entries = []
-        invoice_date = datetime.fromisoformat(invoice_data['invoice_date'])
+        invoice_date = to_datetime(invoice_data['invoice_date'])
         invoice_number = invoice_data['invoice_number']
         client_name = client_data['company_name']
         
@@ -111,7 +114,6 @@ class FrenchAccounting:
             )
             entries.append(vat_entry)
         
-        self.entries.extend(entries)
         return entries
     
     def generate_payment_entries(
@@ -160,7 +162,6 @@ class FrenchAccounting:
         )
         entries.append(client_entry)
         
-        self.entries.extend(entries)
         return entries
     
     def _get_vat_account_code(self, vat_rate: float, settings: Dict[str, Any]) -> str:
@@ -174,8 +175,12 @@ class FrenchAccounting:
         else:
             return self.ACCOUNT_CODES['vat_collected_standard']
     
-    def export_to_csv(self, entries: Optional[List[AccountingEntry]] = None) -> str:
-        """Exporte les écritures au format CSV pour logiciels comptables"""
+    def export_to_csv(self, entries: Optional[List[AccountingEntry]] = None, include_headers: bool = True) -> str:
+        """Exporte les écritures au format CSV pour logiciels comptables
+
+        Sans en-têtes (include_headers=False) pour les lots suivants d'un export
+        écrit par morceaux.
+        """
         if entries is None:
             entries = self.entries
         
@@ -194,7 +199,8 @@ class FrenchAccounting:
             'Montant',
             'Sens'
         ]
-        writer.writerow(headers)
+        if include_headers:
+            writer.writerow(headers)
         
         for entry in entries:
             amount = entry.debit if entry.debit > 0 else entry.credit
@@ -215,7 +221,7 @@ class FrenchAccounting:
         
         return output.getvalue()
     
-    def export_to_ciel(self, entries: Optional[List[AccountingEntry]] = None) -> str:
+    def export_to_ciel(self, entries: Optional[List[AccountingEntry]] = None, include_headers: bool = True) -> str:
         """Export spécifique pour CIEL Compta"""
         if entries is None:
             entries = self.entries
@@ -225,7 +231,8 @@ class FrenchAccounting:
         
         # Format CIEL
         headers = ['Date', 'Journal', 'Compte', 'Libellé', 'Débit', 'Crédit', 'Numéro pièce']
-        writer.writerow(headers)
+        if include_headers:
+            writer.writerow(headers)
         
         for entry in entries:
             row = [
@@ -241,7 +248,7 @@ class FrenchAccounting:
         
         return output.getvalue()
     
-    def export_to_sage(self, entries: Optional[List[AccountingEntry]] = None) -> str:
+    def export_to_sage(self, entries: Optional[List[AccountingEntry]] = None, include_headers: bool = True) -> str:
         """Export spécifique pour SAGE"""
         if entries is None:
             entries = self.entries
@@ -254,7 +261,8 @@ class FrenchAccounting:
             'Date_comptable', 'Compte_general', 'Compte_tiers', 'Libelle', 
             'Sens', 'Montant', 'Reference', 'Date_echeance'
         ]
-        writer.writerow(headers)
+        if include_headers:
+            writer.writerow(headers)
         
         for entry in entries:
             sens = '1' if entry.debit > 0 else '2'  # SAGE utilise 1 pour débit, 2 pour crédit
@@ -274,7 +282,7 @@ class FrenchAccounting:
         
         return output.getvalue()
     
-    def export_to_cegid(self, entries: Optional[List[AccountingEntry]] = None) -> str:
+    def export_to_cegid(self, entries: Optional[List[AccountingEntry]] = None, include_headers: bool = True) -> str:
         """Export spécifique pour CEGID"""
         if entries is None:
             entries = self.entries
@@ -288,7 +296,8 @@ class FrenchAccounting:
             'Date', 'Code_journal', 'Numero_compte', 'Libelle_compte',
             'Libelle_ecriture', 'Montant_debit', 'Montant_credit', 'Numero_piece'
         ]
-        writer.writerow(headers)
+        if include_headers:
+            writer.writerow(headers)
         
         for entry in entries:
             row = [
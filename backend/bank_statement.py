@@ -0,0 +1,329 @@
+import csv
+import io
+import re
+import hashlib
+import unicodedata
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# FACT2025-000042, as well as the older FACT000042, with the spaces or dashes banks add
+INVOICE_NUMBER_PATTERN = re.compile(r"FACT[\s\-/]*(?:\d{4}[\s\-/]*)?\d{6}")
+LEGAL_FORMS = {"SA", "SAS", "SASU", "SARL", "EURL", "SCI", "SNC", "ETS", "STE", "SOCIETE"}
+CSV_DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y")
+
+# Accepted CSV headers, compared once normalized (no accents, lower case)
+CSV_COLUMNS = {
+    "date": ("date operation", "date comptable", "date", "booking date", "date valeur", "value date"),
+    "amount": ("montant", "amount", "montant eur"),
+    "credit": ("credit", "credit eur"),
+    "debit": ("debit", "debit eur"),
+    "label": ("libelle", "libelle operation", "label", "description", "motif", "communication"),
+    "counterparty": ("nom", "name", "tiers", "emetteur", "donneur d ordre", "contrepartie", "counterparty"),
+    "reference": ("reference", "reference banque", "ref", "transaction id", "id"),
+}
+
+
+class StatementError(ValueError):
+    pass
+
+
+class StatementLine(NamedTuple):
+    line_id: str  # bank reference, or a digest of the line when the bank gives none
+    booking_date: date
+    amount: float  # positive for credits
+    label: str
+    counterparty: str
+    bank_reference: Optional[str]
+
+
+class Match(NamedTuple):
+    allocations: List[Tuple[str, float]]  # (invoice id, amount), empty when the line needs a review
+    reason: str
+    candidates: List[str]
+
+
+def normalize(text: Optional[str]) -> str:
+    """Upper case words without accents nor punctuation"""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^A-Za-z0-9]+", " ", text).upper().split())
+
+
+def name_key(name: Optional[str]) -> str:
+    return " ".join(word for word in normalize(name).split() if word not in LEGAL_FORMS)
+
+
+def invoice_number_key(number: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", number.upper())
+
+
+def parse_amount(value: Optional[str]) -> Optional[float]:
+    """French or English formatted amount: 1 234,56 / 1,234.56 / -12.5"""
+    value = re.sub(r"[\s €]|EUR", "", value or "")
+    if not value:
+        return None
+    if "," in value and "." in value:
+        thousands = "," if value.rfind(".") > value.rfind(",") else "."
+        value = value.replace(thousands, "")
+    value = value.replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    value = (value or "").strip()[:10]
+    for date_format in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child(element, *names):
+    for name in names:
+        if element is None:
+            return None
+        element = next((child for child in element if _local(child.tag) == name), None)
+    return element
+
+
+def _text(element, *names) -> Optional[str]:
+    element = _child(element, *names)
+    return element.text.strip() if element is not None and element.text else None
+
+
+def _children(element, name: str) -> List[Any]:
+    return [child for child in element if _local(child.tag) == name] if element is not None else []
+
+
+class BankStatement:
+    """Lines of a CSV or CAMT.053 bank statement, read as a stream.
+
+    The file is never loaded whole: CSV rows are decoded as they are read
+    and the CAMT XML is parsed incrementally, entry by entry. Rows that
+    cannot be read (CSV line numbers, CAMT entry positions) are skipped
+    and listed in invalid_rows.
+    """
+
+    def __init__(self, stream: BinaryIO, filename: str = ""):
+        self.stream = stream
+        self.filename = filename or ""
+        self.invalid_rows: List[int] = []
+        self._digests = Counter()
+
+    def __iter__(self) -> Iterator[StatementLine]:
+        head = self.stream.read(4096)
+        self.stream.seek(0)
+        if self.filename.lower().endswith(".xml") or head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+            return self._camt_lines()
+        return self._csv_lines(head)
+
+    def _line(
+        self, booking_date: date, amount: float, label: str, counterparty: str, bank_reference: Optional[str]
+    ) -> StatementLine:
+        if bank_reference:
+            line_id = f"ref:{bank_reference}"
+        else:
+            # Identical lines are legitimate (two equal transfers the same day), number them
+            digest = hashlib.sha1(
+                f"{booking_date.isoformat()}|{amount:.2f}|{label}|{counterparty}".encode()
+            ).hexdigest()[:20]
+            self._digests[digest] += 1
+            line_id = f"sha1:{digest}:{self._digests[digest]}"
+        return StatementLine(line_id, booking_date, amount, label, counterparty, bank_reference)
+
+    def _csv_lines(self, head: bytes) -> Iterator[StatementLine]:
+        try:
+            head.decode("utf-8")
+            encoding = "utf-8-sig"
+        except UnicodeDecodeError:
+            # Most French banks still export in Windows-1252
+            encoding = "cp1252"
+        text = io.TextIOWrapper(self.stream, encoding=encoding, errors="replace", newline="")
+        # Guessed from the header only, amounts with a decimal comma would fool a sniffer
+        header_line = head.decode(encoding, errors="ignore").splitlines()[0] if head.strip() else ""
+        delimiter = max(";,\t|", key=header_line.count)
+        reader = csv.reader(text, delimiter=delimiter)
+
+        header = [normalize(column).lower() for column in next(reader, [])]
+        columns = {}
+        for field, aliases in CSV_COLUMNS.items():
+            position = next((header.index(alias) for alias in aliases if alias in header), None)
+            if position is not None:
+                columns[field] = position
+        if "date" not in columns or not ({"amount", "credit"} & columns.keys()):
+            raise StatementError("CSV statement needs a date and an amount (or credit) column")
+
+        def cell(row: List[str], field: str) -> str:
+            position = columns.get(field)
+            return row[position].strip() if position is not None and position < len(row) else ""
+
+        for row_number, row in enumerate(reader, start=2):
+            if not any(value.strip() for value in row):
+                continue
+            booking_date = parse_date(cell(row, "date"))
+            if "amount" in columns:
+                amount = parse_amount(cell(row, "amount"))
+            else:
+                credit, debit = parse_amount(cell(row, "credit")), parse_amount(cell(row, "debit"))
+                amount = credit if credit else (-abs(debit) if debit else None)
+            if booking_date is None or amount is None:
+                self.invalid_rows.append(row_number)
+                continue
+            yield self._line(
+                booking_date, amount, cell(row, "label"), cell(row, "counterparty"), cell(row, "reference") or None
+            )
+
+    def _camt_lines(self) -> Iterator[StatementLine]:
+        try:
+            entries = 0
+            for _, element in ET.iterparse(self.stream, events=("end",)):
+                if _local(element.tag) == "Ntry":
+                    entries += 1
+                    yield from self._camt_entry(element, entries)
+                    element.clear()
+        except ET.ParseError as e:
+            raise StatementError(f"Invalid CAMT.053 file: {e}")
+
+    def _camt_entry(self, entry, position: int) -> Iterator[StatementLine]:
+        sign = -1 if _text(entry, "CdtDbtInd") == "DBIT" else 1
+        booking_date = parse_date(
+            _text(entry, "BookgDt", "Dt") or _text(entry, "BookgDt", "DtTm") or _text(entry, "ValDt", "Dt")
+        )
+        entry_amount = parse_amount(_text(entry, "Amt"))
+        entry_reference = _text(entry, "AcctSvcrRef")
+        if booking_date is None or entry_amount is None:
+            self.invalid_rows.append(position)
+            return
+
+        # A batch booking carries one transaction detail per transfer
+        transactions = [
+            transaction
+            for details in _children(entry, "NtryDtls")
+            for transaction in _children(details, "TxDtls")
+        ] or [None]
+        for number, transaction in enumerate(transactions, start=1):
+            amount = parse_amount(_text(transaction, "Amt") or _text(transaction, "AmtDtls", "TxAmt", "Amt"))
+            if amount is None:
+                amount = entry_amount if len(transactions) == 1 else None
+            if amount is None:
+                self.invalid_rows.append(position)
+                continue
+
+            remittance = _child(transaction, "RmtInf")
+            label = " ".join(
+                [element.text.strip() for element in _children(remittance, "Ustrd") if element.text]
+                + [reference for structured in _children(remittance, "Strd")
+                   if (reference := _text(structured, "CdtrRefInf", "Ref"))]
+            ) or _text(entry, "AddtlNtryInf") or ""
+            counterparty = (
+                _text(transaction, "RltdPties", "Dbtr", "Nm")
+                or _text(transaction, "RltdPties", "Dbtr", "Pty", "Nm")
+                or ""
+            )
+            reference = _text(transaction, "Refs", "AcctSvcrRef")
+            if not reference:
+                end_to_end = _text(transaction, "Refs", "EndToEndId")
+                if end_to_end and end_to_end != "NOTPROVIDED":
+                    reference = end_to_end
+                elif entry_reference:
+                    reference = entry_reference if len(transactions) == 1 else f"{entry_reference}/{number}"
+            yield self._line(booking_date, sign * abs(amount), label, counterparty, reference)
+
+
+class InvoiceMatcher:
+    """In-memory index of the open invoices a statement is matched against.
+
+    Invoices are indexed by number, by remaining amount (in cents) and by
+    client name. A line quoting invoice numbers is allocated to them;
+    otherwise its amount must equal the remaining amount of exactly one
+    open invoice of the client named on the line. Everything else goes to
+    review with the candidate invoices found. Allocated amounts are taken
+    off the index so that two lines never settle the same balance.
+    """
+
+    def __init__(self, invoices: Iterable[Dict[str, Any]], clients: Iterable[Dict[str, Any]]):
+        self.remaining: Dict[str, int] = {}
+        self.client_of: Dict[str, str] = {}
+        self.by_number: Dict[str, str] = {}
+        self.by_amount: Dict[int, Set[str]] = defaultdict(set)
+        for invoice in invoices:
+            remaining = round(invoice["remaining_amount"] * 100)
+            if remaining <= 0:
+                continue
+            self.remaining[invoice["id"]] = remaining
+            self.client_of[invoice["id"]] = invoice["client_id"]
+            self.by_number[invoice_number_key(invoice["invoice_number"])] = invoice["id"]
+            self.by_amount[remaining].add(invoice["id"])
+
+        self.clients_by_name: Dict[str, Set[str]] = defaultdict(set)
+        self.longest_name = 1
+        for client in clients:
+            for name in (client.get("company_name"), client.get("contact_name")):
+                key = name_key(name)
+                if key:
+                    self.clients_by_name[key].add(client["id"])
+                    self.longest_name = max(self.longest_name, len(key.split()))
+
+    def _named_clients(self, text: str) -> Set[str]:
+        """Clients whose name appears as whole words in the text"""
+        words = name_key(text).split()
+        clients = set()
+        for start in range(len(words)):
+            for end in range(start + 1, min(len(words), start + self.longest_name) + 1):
+                clients |= self.clients_by_name.get(" ".join(words[start:end]), set())
+        return clients
+
+    def _allocate(self, invoice_id: str, cents: int) -> None:
+        remaining = self.remaining[invoice_id]
+        self.by_amount[remaining].discard(invoice_id)
+        self.remaining[invoice_id] = remaining - cents
+        if remaining - cents > 0:
+            self.by_amount[remaining - cents].add(invoice_id)
+
+    def match(self, line: StatementLine) -> Match:
+        cents = round(line.amount * 100)
+
+        numbers = INVOICE_NUMBER_PATTERN.findall(f"{line.label} {line.bank_reference or ''}".upper())
+        quoted = list(dict.fromkeys(
+            self.by_number[key] for key in map(invoice_number_key, numbers) if key in self.by_number
+        ))
+        quoted_open = [invoice_id for invoice_id in quoted if self.remaining[invoice_id] > 0]
+        if len(quoted) == 1:
+            invoice_id = quoted[0]
+            if 0 < cents <= self.remaining[invoice_id]:
+                self._allocate(invoice_id, cents)
+                return Match([(invoice_id, cents / 100)], "invoice_number", [])
+            return Match([], "exceeds_remaining", quoted)
+        if quoted:
+            # One transfer settling several invoices must pay them in full
+            if quoted_open and cents == sum(self.remaining[invoice_id] for invoice_id in quoted_open):
+                allocations = [(invoice_id, self.remaining[invoice_id] / 100) for invoice_id in quoted_open]
+                for invoice_id in quoted_open:
+                    self._allocate(invoice_id, self.remaining[invoice_id])
+                return Match(allocations, "invoice_numbers", [])
+            return Match([], "several_invoices", quoted)
+
+        candidates = sorted(self.by_amount.get(cents, ()))
+        clients = self._named_clients(f"{line.counterparty} {line.label}")
+        if clients:
+            candidates = [invoice_id for invoice_id in candidates if self.client_of[invoice_id] in clients]
+            if len(candidates) == 1:
+                self._allocate(candidates[0], cents)
+                return Match([(candidates[0], cents / 100)], "amount_and_client", [])
+            return Match([], "several_candidates" if candidates else "no_candidate", candidates)
+        # The amount alone is not enough to book a payment
+        return Match([], "amount_only" if candidates else "no_candidate", candidates[:10])
+
+
+def reconcile(lines: Iterable[StatementLine], matcher: InvoiceMatcher) -> List[Tuple[StatementLine, Match]]:
+    """Match the credit lines of a statement, debits are left out"""
+    return [(line, matcher.match(line)) for line in lines if line.amount > 0]
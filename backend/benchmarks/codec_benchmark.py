@@ -0,0 +1,120 @@
+"""Micro-benchmark of the Mongo codec against the previous generic helpers.
+
+Usage (from the backend directory):
+    python -m benchmarks.codec_benchmark [rows]
+"""
+import os
+import sys
+import copy
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from server import Client, Invoice, OrderItem, InvoiceStatus  # noqa: E402
+from mongo_codec import codec_for  # noqa: E402
+
+
+def legacy_prepare_for_mongo(data):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, datetime):
+                data[key] = value.isoformat()
+            elif isinstance(value, dict):
+                data[key] = legacy_prepare_for_mongo(value)
+            elif isinstance(value, list):
+                data[key] = [legacy_prepare_for_mongo(item) if isinstance(item, dict) else item for item in value]
+    return data
+
+
+def legacy_parse_from_mongo(item):
+    if isinstance(item, dict):
+        for key, value in item.items():
+            if isinstance(value, str) and 'T' in value:
+                try:
+                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                except:
+                    pass
+    return item
+
+
+def make_client(index):
+    return Client(
+        company_name=f"TRANSPORTS MARTIN {index}",
+        contact_name="Thomas Petit",
+        email=f"contact{index}@transports-martin.fr",
+        phone="+33 1 23 45 67 89",
+        address="12 Rue de la Tour",
+        city="SAINT-ETIENNE",
+        postal_code="42000",
+        country="France",
+        vat_number="FR12345678901",
+        rcs_number="RCS SAINT-ETIENNE 123 456 789"
+    ).model_dump()
+
+
+def make_invoice(index):
+    now = datetime.now(timezone.utc)
+    items = [
+        OrderItem(
+            vehicle_id=str(uuid.uuid4()),
+            daily_rate=45.0,
+            total_days=30,
+            start_date=now - timedelta(days=30),
+            end_date=now,
+            item_total_ht=1350.0
+        )
+        for _ in range(3)
+    ]
+    return Invoice(
+        invoice_number=f"FACT2025-{index:06d}",
+        order_id=str(uuid.uuid4()),
+        client_id=str(uuid.uuid4()),
+        invoice_date=now,
+        due_date=now + timedelta(days=30),
+        items=items,
+        total_ht=4050.0,
+        total_vat=810.0,
+        total_ttc=4860.0,
+        grand_total=4860.0,
+        remaining_amount=4860.0,
+        status=InvoiceStatus.SENT
+    ).model_dump()
+
+
+def measure(label, func, rows):
+    batch = copy.deepcopy(rows)
+    started = time.perf_counter()
+    for row in batch:
+        func(row)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {len(rows) / elapsed:>12,.0f} rows/s")
+
+
+def run(model, factory, count):
+    codec = codec_for(model)
+    models = [factory(i) for i in range(count)]
+    stored = [legacy_prepare_for_mongo(copy.deepcopy(row)) for row in models]
+
+    print(f"{model.__name__}, {count} rows")
+    print(" Write path:")
+    measure("prepare_for_mongo (legacy)", legacy_prepare_for_mongo, models)
+    measure("ModelCodec.encode", codec.encode, models)
+    print(" Read path:")
+    measure("parse_from_mongo (legacy)", legacy_parse_from_mongo, stored)
+    measure("ModelCodec.decode", codec.decode, stored)
+    print(" Read path + model validation:")
+    measure("legacy", lambda row: model(**legacy_parse_from_mongo(row)), stored)
+    measure("codec", lambda row: model(**codec.decode(row)), stored)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    run(Client, make_client, count)
+    run(Invoice, make_invoice, count)
+
+
+if __name__ == '__main__':
+    main()
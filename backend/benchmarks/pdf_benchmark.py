@@ -0,0 +1,108 @@
+"""Invoice PDF rendering cost and throughput.
+
+CPU time and peak memory allocated per invoice of 1 and 50 items, as
+rendered before templates were compiled (template built for each invoice,
+ASCII85 page streams) and now, then PDFs rendered per second in process
+and with 1 to N worker processes.
+
+Usage (from the backend directory):
+    python -m benchmarks.pdf_benchmark [invoices] [max_workers]
+"""
+import os
+import sys
+import time
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab import rl_config
+
+from pdf_generator import compiled_template, render_invoice_pdf, sample_pdf_payload, warm_up
+
+
+def worker_counts(max_workers):
+    counts, workers = [], 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+def render_cost(payload, renders, compile_template):
+    """CPU ms and allocated KiB per rendering"""
+    def render():
+        if compile_template:
+            compiled_template.cache_clear()
+        render_invoice_pdf(payload)
+
+    render()
+    # Best of 5 runs, the noise only ever adds time
+    cpu_ms = float("inf")
+    for _ in range(5):
+        started = time.process_time()
+        for _ in range(renders):
+            render()
+        cpu_ms = min(cpu_ms, (time.process_time() - started) * 1000 / renders)
+
+    # Peak of the memory traced during one rendering, averaged
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(10):
+        if compile_template:
+            compiled_template.cache_clear()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        render_invoice_pdf(payload)
+        allocated += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return cpu_ms, allocated / 10 / 1024
+
+
+def run_micro(renders):
+    variants = (("before", True, 1), ("compiled template", False, 0))
+    for items in (1, 50):
+        payload = sample_pdf_payload(items=items)
+        for label, compile_template, use_a85 in variants:
+            rl_config.useA85 = use_a85
+            cpu_ms, allocated_kib = render_cost(payload, renders, compile_template)
+            print(f"  {items:>2} items, {label:<18} {cpu_ms:>7.2f} ms CPU  {allocated_kib:>8.1f} KiB")
+    rl_config.useA85 = 0
+
+
+def run_in_process(payloads):
+    warm_up()
+    started = time.perf_counter()
+    for payload in payloads:
+        render_invoice_pdf(payload)
+    return len(payloads) / (time.perf_counter() - started)
+
+
+def run_pool(payloads, workers):
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        # Same warm up as the API startup, not part of the measure
+        for future in [pool.submit(warm_up) for _ in range(workers)]:
+            future.result()
+        started = time.perf_counter()
+        for _ in pool.map(render_invoice_pdf, payloads, chunksize=1):
+            pass
+        return len(payloads) / (time.perf_counter() - started)
+
+
+def main():
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    payloads = [sample_pdf_payload(items=1 + index % 5) for index in range(invoices)]
+
+    print("Cost per invoice")
+    run_micro(renders=40)
+
+    print(f"{invoices} invoices, {os.cpu_count()} cores")
+    baseline = run_in_process(payloads)
+    print(f"  in process   {baseline:>8.1f} PDF/s")
+    for workers in worker_counts(max_workers):
+        throughput = run_pool(payloads, workers)
+        print(f"  {workers:>2} workers   {throughput:>8.1f} PDF/s  x{throughput / baseline:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Parsing and matching time of a bank statement against open invoices.
+
+Usage (from the backend directory):
+    python -m benchmarks.reconciliation_benchmark [lines]
+"""
+import io
+import sys
+import time
+import random
+from collections import Counter
+
+from bank_statement import BankStatement, InvoiceMatcher, reconcile
+
+
+def make_invoices(count, clients):
+    return [
+        {
+            "id": f"invoice-{index}",
+            "invoice_number": f"FACT2025-{index:06d}",
+            "client_id": f"client-{index % clients}",
+            "remaining_amount": round(random.uniform(50, 5000), 2)
+        }
+        for index in range(count)
+    ]
+
+
+def make_clients(count):
+    return [
+        {"id": f"client-{index}", "company_name": f"TRANSPORTS MARTIN {index} SARL", "contact_name": "Thomas Petit"}
+        for index in range(count)
+    ]
+
+
+def make_csv(invoices, lines, clients):
+    # Half the transfers quote their invoice, the other half only the client name
+    rows = ["Date opération;Libellé;Montant;Nom;Référence"]
+    for index, invoice in enumerate(invoices[:lines]):
+        label = f"VIR SEPA {invoice['invoice_number']}" if index % 2 else "VIR SEPA LOYER"
+        amount = f"{invoice['remaining_amount']:.2f}".replace(".", ",")
+        rows.append(f"15/03/2025;{label};{amount};TRANSPORTS MARTIN {index % clients};REF{index:08d}")
+    return "\n".join(rows).encode("cp1252")
+
+
+def make_camt(invoices, lines):
+    entries = "".join(
+        f"<Ntry><Amt Ccy=\"EUR\">{invoice['remaining_amount']:.2f}</Amt><CdtDbtInd>CRDT</CdtDbtInd>"
+        f"<BookgDt><Dt>2025-03-15</Dt></BookgDt><AcctSvcrRef>REF{index:08d}</AcctSvcrRef>"
+        f"<NtryDtls><TxDtls><RmtInf><Ustrd>{invoice['invoice_number']}</Ustrd></RmtInf></TxDtls></NtryDtls></Ntry>"
+        for index, invoice in enumerate(invoices[:lines])
+    )
+    return (
+        "<?xml version=\"1.0\"?><Document xmlns=\"urn:iso:std:iso:20022:tech:xsd:camt.053.001.02\">"
+        f"<BkToCstmrStmt><Stmt>{entries}</Stmt></BkToCstmrStmt></Document>"
+    ).encode()
+
+
+def run(label, data, filename, invoices, clients):
+    started = time.perf_counter()
+    lines = list(BankStatement(io.BytesIO(data), filename))
+    parsed = time.perf_counter()
+    matcher = InvoiceMatcher(invoices, clients)
+    indexed = time.perf_counter()
+    results = reconcile(lines, matcher)
+    matched = time.perf_counter()
+
+    print(f"{label}, {len(lines)} lines against {len(invoices)} open invoices")
+    print(f"  parse   {(parsed - started) * 1000:>8.1f} ms")
+    print(f"  index   {(indexed - parsed) * 1000:>8.1f} ms")
+    print(f"  match   {(matched - indexed) * 1000:>8.1f} ms")
+    print(f"  results {dict(Counter(match.reason for _, match in results))}")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(42)
+    client_count = 1000
+    invoices = make_invoices(lines * 2, client_count)
+    clients = make_clients(client_count)
+    run("CSV", make_csv(invoices, lines, client_count), "statement.csv", invoices, clients)
+    run("CAMT.053", make_camt(invoices, lines), "statement.xml", invoices, clients)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+
+def occupancy_matrix(intervals: Sequence[Tuple[int, int, int]], vehicles: int, days: int) -> np.ndarray:
+    """Vehicles x days boolean matrix from (row, first day, last day) intervals.
+
+    Day numbers are offsets from the first day of the calendar and may fall
+    outside of it, they are clipped. Overlapping intervals are fine: each
+    one adds +1 at its first day and -1 after its last day of a difference
+    matrix whose cumulative sum counts the bookings of every cell.
+    """
+    diff = np.zeros((vehicles, days + 1), dtype=np.int32)
+    if intervals:
+        rows, starts, ends = np.asarray(intervals, dtype=np.int64).T
+        starts = np.clip(starts, 0, days)
+        ends = np.clip(ends + 1, 0, days)
+        keep = starts < ends
+        np.add.at(diff, (rows[keep], starts[keep]), 1)
+        np.add.at(diff, (rows[keep], ends[keep]), -1)
+    return np.cumsum(diff[:, :days], axis=1) > 0
+
+
+def run_lengths(matrix: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """Booked ranges of each row as (first day, last day) offsets"""
+    padded = np.zeros((matrix.shape[0], matrix.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = matrix
+    edges = np.diff(padded, axis=1)
+    # argwhere walks row-major, so starts and ends pair up row by row
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+    ranges: List[List[Tuple[int, int]]] = [[] for _ in range(matrix.shape[0])]
+    for (row, start), (_, end) in zip(starts.tolist(), ends.tolist()):
+        ranges[row].append((start, end - 1))
+    return ranges
+
+
+def build_calendar(
+    vehicles: List[Dict[str, Any]], intervals: Sequence[Tuple[int, int, int]], start: date, end: date
+) -> Dict[str, Any]:
+    """Occupancy ranges and utilization of the vehicles between two dates (included).
+
+    `intervals` are (vehicle row, first day, last day) with days counted
+    from `start`.
+    """
+    days = (end - start).days + 1
+    matrix = occupancy_matrix(intervals, len(vehicles), days)
+    booked_days = matrix.sum(axis=1)
+    utilization = booked_days * 100.0 / days
+
+    rows_by_type: Dict[str, List[int]] = {}
+    for row, vehicle in enumerate(vehicles):
+        rows_by_type.setdefault(vehicle["type"], []).append(row)
+    type_stats = []
+    for vehicle_type in sorted(rows_by_type):
+        rows = np.asarray(rows_by_type[vehicle_type])
+        type_stats.append({
+            "type": vehicle_type,
+            "vehicles": len(rows),
+            "booked_days": int(booked_days[rows].sum()),
+            "utilization": round(float(utilization[rows].mean()), 2)
+        })
+
+    labels = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "days": days,
+        "utilization": round(float(utilization.mean()), 2) if len(vehicles) else 0.0,
+        "types": type_stats,
+        "vehicles": [
+            {
+                "vehicle_id": vehicle["id"],
+                "license_plate": vehicle["license_plate"],
+                "type": vehicle["type"],
+                "booked_days": int(booked),
+                "utilization": round(float(rate), 2),
+                "ranges": [[labels[first], labels[last]] for first, last in ranges]
+            }
+            for vehicle, booked, rate, ranges in zip(vehicles, booked_days, utilization, run_lengths(matrix))
+        ]
+    }
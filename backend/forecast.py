@@ -0,0 +1,83 @@
+from datetime import date
+from typing import Any, Dict, List
+import numpy as np
+
+PERIOD_CODES = {"days": 0, "weeks": 1, "months": 2, "years": 3}
+
+
+def _period_lengths(starts: np.ndarray, periods: np.ndarray, durations: np.ndarray) -> np.ndarray:
+    """Length in days of the renewal periods starting at `starts`.
+
+    Same rules as the renewal job: a single month lasts as many days as the
+    month following the start month, several months count 30 days each and
+    a year 365 days.
+    """
+    following_month = starts.astype("datetime64[M]") + 1
+    month_days = ((following_month + 1).astype("datetime64[D]") - following_month.astype("datetime64[D]")).astype(np.int64)
+    return np.select(
+        [periods == 0, periods == 1, (periods == 2) & (durations == 1), periods == 2, periods == 3],
+        [durations, durations * 7, month_days, durations * 30, durations * 365],
+        default=0
+    )
+
+
+def project_renewals(items: List[Dict[str, Any]], today: date, months: int) -> Dict[str, Any]:
+    """Project the renewal invoices of renewable items over the coming months.
+
+    `items` carry client_id, vehicle_id, end_date (date of the current
+    period end), rental_period, rental_duration, daily_rate, quantity and
+    vat_rate (percent). Every item is advanced one period at a time, all
+    items at once, until its next period starts after the horizon. Each
+    renewal is invoiced when its period starts (today for periods that
+    are already due) and its invoice lands in that month's bucket.
+    """
+    current_month = np.datetime64(today, "M")
+    horizon_end = (current_month + months).astype("datetime64[D]") - 1
+    today_day = np.datetime64(today, "D")
+
+    client_ids = sorted({item["client_id"] for item in items})
+    vehicle_ids = sorted({item["vehicle_id"] for item in items})
+    client_totals = np.zeros((len(client_ids), months, 2))
+    vehicle_totals = np.zeros((len(vehicle_ids), months, 2))
+    invoice_counts = np.zeros(months, dtype=np.int64)
+
+    if items:
+        client_rows = np.searchsorted(client_ids, [item["client_id"] for item in items])
+        vehicle_rows = np.searchsorted(vehicle_ids, [item["vehicle_id"] for item in items])
+        ends = np.array([item["end_date"] for item in items], dtype="datetime64[D]")
+        periods = np.array([PERIOD_CODES.get(item["rental_period"], -1) for item in items])
+        durations = np.array([item["rental_duration"] for item in items], dtype=np.int64)
+        daily_amounts = np.array([item["daily_rate"] * item["quantity"] for item in items], dtype=float)
+        vat_factors = 1 + np.array([item["vat_rate"] for item in items], dtype=float) / 100
+        active = (periods >= 0) & (durations > 0)
+
+        while True:
+            starts = ends + 1
+            active &= starts <= horizon_end
+            if not active.any():
+                break
+            rows = np.nonzero(active)[0]
+            lengths = _period_lengths(starts[rows], periods[rows], durations[rows])
+            issued = np.maximum(starts[rows], today_day)
+            buckets = (issued.astype("datetime64[M]") - current_month).astype(np.int64)
+            amounts = np.stack([daily_amounts[rows] * lengths, daily_amounts[rows] * lengths * vat_factors[rows]], axis=1)
+
+            np.add.at(client_totals, (client_rows[rows], buckets), amounts)
+            np.add.at(vehicle_totals, (vehicle_rows[rows], buckets), amounts)
+            np.add.at(invoice_counts, buckets, 1)
+            ends[rows] = starts[rows] + lengths - 1
+
+    def series(totals: np.ndarray) -> Dict[str, Any]:
+        return {
+            "total_ht": np.round(totals[:, 0], 2).tolist(),
+            "total_ttc": np.round(totals[:, 1], 2).tolist(),
+            "sum_ht": round(float(totals[:, 0].sum()), 2),
+            "sum_ttc": round(float(totals[:, 1].sum()), 2)
+        }
+
+    return {
+        "months": [str(current_month + offset) for offset in range(months)],
+        "totals": {**series(client_totals.sum(axis=0)), "invoices": invoice_counts.tolist()},
+        "clients": [{"client_id": client_id, **series(client_totals[row])} for row, client_id in enumerate(client_ids)],
+        "vehicles": [{"vehicle_id": vehicle_id, **series(vehicle_totals[row])} for row, vehicle_id in enumerate(vehicle_ids)]
+    }
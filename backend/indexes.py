@@ -0,0 +1,145 @@
+import logging
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _unique_id() -> IndexModel:
+    return IndexModel([("id", ASCENDING)], unique=True)
+
+
+# Index déclarés par collection, créés de façon idempotente au démarrage
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _unique_id(),
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "clients": [
+        _unique_id(),
+        IndexModel([("is_active", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+    ],
+    "vehicles": [
+        _unique_id(),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("license_plate", ASCENDING)]),
+    ],
+    "orders": [
+        _unique_id(),
+        IndexModel([("order_number", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("client_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("items.vehicle_id", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("items.is_renewable", ASCENDING)]),
+        # Only renewal orders carry one, a renewed period is never written twice
+        IndexModel(
+            [("renewal_key", ASCENDING)], unique=True,
+            partialFilterExpression={"renewal_key": {"$type": "string"}}
+        ),
+    ],
+    "invoices": [
+        _unique_id(),
+        IndexModel([("invoice_number", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("order_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("client_id", ASCENDING), ("invoice_date", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("due_date", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("overdue_bucket", ASCENDING), ("due_date", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("invoice_date", ASCENDING)]),
+        IndexModel([("items.vehicle_id", ASCENDING)]),
+    ],
+    "payments": [
+        _unique_id(),
+        IndexModel([("invoice_id", ASCENDING), ("created_at", DESCENDING)]),
+        # Only payments sent with an Idempotency-Key header carry one
+        IndexModel(
+            [("idempotency_key", ASCENDING)], unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        ),
+    ],
+    "payment_reviews": [
+        _unique_id(),
+        IndexModel([("line_id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+    ],
+    "bank_imports": [
+        _unique_id(),
+        IndexModel([("imported_at", DESCENDING)]),
+    ],
+    "accounting_entries": [
+        _unique_id(),
+        IndexModel([("entry_date", ASCENDING), ("account_code", ASCENDING)]),
+        IndexModel([("invoice_id", ASCENDING)]),
+        IndexModel([("client_id", ASCENDING), ("entry_date", ASCENDING)]),
+    ],
+    "maintenance_records": [
+        _unique_id(),
+        IndexModel([("vehicle_id", ASCENDING), ("maintenance_date", DESCENDING)]),
+        IndexModel([("maintenance_date", DESCENDING), ("id", DESCENDING)]),
+    ],
+    "documents": [
+        _unique_id(),
+    ],
+    "vehicle_documents": [
+        _unique_id(),
+        IndexModel([("vehicle_id", ASCENDING), ("uploaded_at", DESCENDING)]),
+    ],
+    "client_documents": [
+        _unique_id(),
+        IndexModel([("client_id", ASCENDING), ("uploaded_at", DESCENDING)]),
+    ],
+    "scheduler_runs": [
+        IndexModel([("job", ASCENDING), ("started_at", DESCENDING)]),
+        # Run history is kept 90 days
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=90 * 24 * 3600),
+    ],
+}
+
+
+async def ensure_indexes(db) -> Dict[str, Any]:
+    """Create missing declared indexes and report undeclared ones.
+
+    Existing indexes are left untouched, so this is safe to run on every
+    startup. A failing index (e.g. duplicates blocking a unique index) is
+    logged and does not prevent the others from being created.
+    """
+    report = {"created": [], "failed": [], "undeclared": []}
+
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+
+        for model in models:
+            name = model.document["name"]
+            if name in existing:
+                continue
+            try:
+                await collection.create_indexes([model])
+                report["created"].append(f"{collection_name}.{name}")
+                logger.info(f"Index created: {collection_name}.{name}")
+            except OperationFailure as e:
+                report["failed"].append(f"{collection_name}.{name}")
+                logger.error(f"Cannot create index {collection_name}.{name}: {e}")
+
+        declared = {model.document["name"] for model in models}
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                report["undeclared"].append(f"{collection_name}.{name}")
+                logger.warning(f"Undeclared index {collection_name}.{name}")
+
+    return report
+
+
+async def unused_indexes(db) -> List[Dict[str, Any]]:
+    """Declared indexes never used since the last mongod restart ($indexStats)"""
+    unused = []
+    for collection_name in INDEXES:
+        async for stats in db[collection_name].aggregate([{"$indexStats": {}}]):
+            if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0:
+                unused.append({
+                    "index": f"{collection_name}.{stats['name']}",
+                    "since": stats["accesses"]["since"]
+                })
+    return unused
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+
+BatchFunction = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """DataLoader-style batching of lookups by key.
+
+    Every key requested during the same event loop iteration is fetched by
+    a single call to the batch function, and results are kept for the
+    lifetime of the loader, so a request never reads the same document twice.
+    Missing keys resolve to None.
+    """
+
+    def __init__(self, batch_fn: BatchFunction):
+        self.batch_fn = batch_fn
+        self.batches = 0
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        # Pending dispatches, the event loop only keeps weak references to tasks
+        self._dispatches: Set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> Awaitable[Any]:
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(self._schedule_dispatch, loop)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """Seed the loader with a document the caller already has"""
+        if key not in self._futures:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._futures[key] = future
+
+    def _schedule_dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        task = loop.create_task(self._dispatch())
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task) -> None:
+        self._dispatches.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Batch load failed", exc_info=task.exception())
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        self.batches += 1
+        try:
+            results = await self.batch_fn(keys)
+            for key in keys:
+                future = self._futures[key]
+                if not future.done():
+                    future.set_result(results.get(key))
+        except BaseException as e:
+            # Forget failed keys so that a later load can retry them, the
+            # error is raised to every caller waiting on them
+            for key in keys:
+                future = self._futures.get(key)
+                if future is not None and not future.done():
+                    del self._futures[key]
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+
+def by_field(collection, field: str = "id", projection: Optional[Dict[str, Any]] = None) -> BatchFunction:
+    """Batch function fetching documents with a single $in query"""
+    async def batch(keys: List[Hashable]) -> Dict[Hashable, Any]:
+        documents = await collection.find({field: {"$in": keys}}, projection).to_list(length=None)
+        return {document[field]: document for document in documents}
+    return batch
+
+
+def last_invoice_by_order(collection) -> BatchFunction:
+    """Batch function returning the most recent invoice of each order"""
+    async def batch(order_ids: List[Hashable]) -> Dict[Hashable, Any]:
+        pipeline = [
+            {"$match": {"order_id": {"$in": order_ids}}},
+            {"$sort": {"order_id": 1, "created_at": -1}},
+            {"$group": {"_id": "$order_id", "invoice": {"$first": "$$ROOT"}}}
+        ]
+        groups = await collection.aggregate(pipeline).to_list(length=None)
+        return {group["_id"]: group["invoice"] for group in groups}
+    return batch
+
+
+class Loaders:
+    """Loaders of one request (or one background job run).
+
+    Must not be shared between requests: cached documents would outlive the
+    writes of other requests.
+    """
+
+    def __init__(self, db):
+        self.clients = BatchLoader(by_field(db.clients, projection={"_id": 0}))
+        self.vehicles = BatchLoader(by_field(db.vehicles, projection={"_id": 0}))
+        self.invoices = BatchLoader(by_field(db.invoices, projection={"_id": 0}))
+        self.last_invoices = BatchLoader(last_invoice_by_order(db.invoices))
+        self._db = db
+        self._settings: Optional[asyncio.Future] = None
+
+    async def settings(self) -> Dict[str, Any]:
+        """Company settings, read once per scope"""
+        if self._settings is None:
+            self._settings = asyncio.ensure_future(self._db.settings.find_one())
+        return await self._settings or {}
@@ -0,0 +1,201 @@
+"""Commandes d'administration de la base de données.
+
+Usage (depuis le répertoire backend):
+    python manage.py migrate-dates [--batch-size 500] [--restart]
+    python manage.py migrate-pdfs [--batch-size 100]
+    python manage.py ensure-indexes [--report-unused]
+"""
+import asyncio
+import base64
+import copy
+import time
+from datetime import datetime, timezone
+from typing import Optional
+import typer
+from pymongo import UpdateOne
+from server import db, client, DATE_COLLECTIONS
+from mongo_codec import codec_for
+from indexes import ensure_indexes as ensure_declared_indexes, unused_indexes
+from services.blob_store import pdf_store
+
+cli = typer.Typer(help="Abetoile Location - outils d'administration")
+
+
+@cli.callback()
+def main():
+    """Abetoile Location - outils d'administration"""
+
+
+async def _migrate_collection(name: str, model, batch_size: int, restart: bool) -> None:
+    collection = db[name]
+    codec = codec_for(model)
+    state_id = f"dates:{name}"
+
+    state = None if restart else await db.migrations.find_one({"_id": state_id})
+    if state and state.get("completed_at"):
+        typer.echo(f"{name}: déjà migrée, ignorée (--restart pour relancer)")
+        return
+
+    last_id = state["last_id"] if state else None
+    converted = state.get("converted", 0) if state else 0
+    conflicts = state.get("conflicts", 0) if state else 0
+    scanned = state.get("scanned", 0) if state else 0
+    total = await collection.estimated_document_count()
+    started = time.perf_counter()
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for document in batch:
+            decoded = codec.decode(copy.deepcopy(document))
+            changed = {key: decoded[key] for key in decoded if decoded[key] != document[key]}
+            if changed:
+                # Only overwrite fields that still hold the value we read
+                guard = {key: document[key] for key in changed}
+                operations.append(UpdateOne({"_id": document["_id"], **guard}, {"$set": changed}))
+
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            converted += result.modified_count
+            conflicts += len(operations) - result.matched_count
+
+        scanned += len(batch)
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": state_id},
+            {"$set": {
+                "last_id": last_id,
+                "scanned": scanned,
+                "converted": converted,
+                "conflicts": conflicts,
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+        rate = scanned / max(time.perf_counter() - started, 1e-6)
+        typer.echo(f"{name}: {scanned}/{total} documents, {converted} convertis ({rate:.0f} docs/s)")
+
+    await db.migrations.update_one(
+        {"_id": state_id},
+        {"$set": {"completed_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    if conflicts:
+        typer.echo(f"{name}: {conflicts} documents modifiés pendant la migration, relancez avec --restart")
+    typer.echo(f"{name}: terminé, {converted} documents convertis")
+
+
+@cli.command("migrate-dates")
+def migrate_dates(
+    batch_size: int = typer.Option(500, help="Nombre de documents par lot"),
+    collection: Optional[str] = typer.Option(None, help="Ne migrer qu'une collection"),
+    restart: bool = typer.Option(False, help="Ignorer la progression enregistrée"),
+):
+    """Convertit les dates stockées en chaînes ISO en dates BSON natives.
+
+    La migration est reprise là où elle s'est arrêtée, le serveur peut
+    rester en ligne pendant son exécution.
+    """
+    targets = DATE_COLLECTIONS
+    if collection:
+        if collection not in DATE_COLLECTIONS:
+            raise typer.BadParameter(f"Collection inconnue: {collection}")
+        targets = {collection: DATE_COLLECTIONS[collection]}
+
+    async def run():
+        for name, model in targets.items():
+            await _migrate_collection(name, model, batch_size, restart)
+
+    try:
+        asyncio.run(run())
+    finally:
+        client.close()
+    typer.echo("Une fois toutes les collections migrées, le serveur peut démarrer avec LEGACY_STRING_DATES=false")
+
+
+async def _migrate_pdfs(batch_size: int) -> None:
+    query = {"pdf_data": {"$type": "string"}}
+    total = await db.invoices.count_documents(query)
+    moved = 0
+    conflicts = 0
+    started = time.perf_counter()
+
+    while True:
+        batch = await db.invoices.find(query, {"_id": 1, "pdf_data": 1}).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for invoice in batch:
+            pdf_blob_id = pdf_store.put(base64.b64decode(invoice["pdf_data"]))
+            operations.append(UpdateOne(
+                # Skip invoices whose PDF was regenerated in the meantime
+                {"_id": invoice["_id"], "pdf_data": invoice["pdf_data"]},
+                {"$set": {"pdf_blob_id": pdf_blob_id}, "$unset": {"pdf_data": ""}}
+            ))
+
+        result = await db.invoices.bulk_write(operations, ordered=False)
+        moved += result.modified_count
+        conflicts += len(operations) - result.matched_count
+
+        rate = moved / max(time.perf_counter() - started, 1e-6)
+        typer.echo(f"invoices: {moved}/{total} PDF déplacés ({rate:.0f} PDF/s)")
+        if result.matched_count == 0:
+            break
+
+    if conflicts:
+        typer.echo(f"invoices: {conflicts} factures modifiées pendant la migration, relancez la commande")
+    typer.echo(f"invoices: terminé, {moved} PDF déplacés vers {pdf_store.root}")
+
+
+@cli.command("migrate-pdfs")
+def migrate_pdfs(
+    batch_size: int = typer.Option(100, help="Nombre de factures par lot"),
+):
+    """Déplace les PDF base64 des factures vers le stockage de fichiers.
+
+    Les factures déjà migrées ne sont plus sélectionnées, la commande peut
+    être interrompue et relancée sans risque.
+    """
+    try:
+        asyncio.run(_migrate_pdfs(batch_size))
+    finally:
+        client.close()
+
+
+@cli.command("ensure-indexes")
+def ensure_indexes(
+    report_unused: bool = typer.Option(False, help="Lister les index jamais utilisés ($indexStats)"),
+):
+    """Crée les index manquants, hors démarrage du serveur.
+
+    A utiliser sur les grosses bases avec ENSURE_INDEXES_ON_STARTUP=false.
+    """
+    async def run():
+        report = await ensure_declared_indexes(db)
+        for name in report["created"]:
+            typer.echo(f"créé: {name}")
+        for name in report["failed"]:
+            typer.echo(f"échec: {name}")
+        for name in report["undeclared"]:
+            typer.echo(f"non déclaré: {name}")
+        if report_unused:
+            for stats in await unused_indexes(db):
+                typer.echo(f"inutilisé: {stats['index']} (depuis {stats['since']})")
+        return report
+
+    try:
+        report = asyncio.run(run())
+    finally:
+        client.close()
+    if report["failed"]:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
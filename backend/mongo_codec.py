@@ -0,0 +1,157 @@
+import os
+import types
+import typing
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from pydantic import BaseModel
+
+# Tant que la migration des dates n'est pas terminée (LEGACY_STRING_DATES=true),
+# les requêtes acceptent aussi les dates stockées sous forme de chaînes ISO.
+# Désactivé par défaut : le tri des listes par date passe alors par les index.
+LEGACY_STRING_DATES = os.environ.get('LEGACY_STRING_DATES', 'false').lower() == 'true'
+
+
+def _unwrap_optional(annotation):
+    """Optional[X] -> X, leaves other annotations untouched"""
+    if typing.get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return _unwrap_optional(args[0])
+    return annotation
+
+
+def _is_model(annotation) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+class ModelCodec:
+    """Converts a Pydantic model's documents to and from their Mongo form.
+
+    The model's fields are inspected once: conversion then only touches the
+    datetime fields (including those of nested models and lists of models)
+    instead of walking or trying to parse every value of every document.
+    Datetimes are stored as native BSON dates; legacy ISO strings are still
+    decoded while older documents are being migrated.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        datetime_fields: List[str] = []
+        model_fields: List[Tuple[str, "ModelCodec"]] = []
+        model_list_fields: List[Tuple[str, "ModelCodec"]] = []
+
+        for name, field in model.model_fields.items():
+            annotation = _unwrap_optional(field.annotation)
+            if annotation is datetime:
+                datetime_fields.append(name)
+            elif _is_model(annotation):
+                model_fields.append((name, codec_for(annotation)))
+            elif typing.get_origin(annotation) in (list, List):
+                item_type = _unwrap_optional(typing.get_args(annotation)[0])
+                if _is_model(item_type):
+                    model_list_fields.append((name, codec_for(item_type)))
+
+        self.datetime_fields = tuple(datetime_fields)
+        self.model_fields = tuple(model_fields)
+        self.model_list_fields = tuple(model_list_fields)
+
+    def date_paths(self) -> List[str]:
+        """Dotted paths of every datetime field, nested ones included"""
+        paths = list(self.datetime_fields)
+        for name, codec in self.model_fields + self.model_list_fields:
+            paths.extend(f"{name}.{path}" for path in codec.date_paths())
+        return paths
+
+    def encode(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Prepare a model dict for storage, in place"""
+        for name in self.datetime_fields:
+            value = data.get(name)
+            if isinstance(value, datetime) and value.tzinfo is None:
+                data[name] = value.replace(tzinfo=timezone.utc)
+        for name, codec in self.model_fields:
+            value = data.get(name)
+            if value is not None:
+                codec.encode(value)
+        for name, codec in self.model_list_fields:
+            for item in data.get(name) or ():
+                codec.encode(item)
+        return data
+
+    def decode(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Restore datetimes of a stored document, in place"""
+        for name in self.datetime_fields:
+            value = document.get(name)
+            if isinstance(value, str):
+                document[name] = datetime.fromisoformat(value)
+        for name, codec in self.model_fields:
+            value = document.get(name)
+            if value is not None:
+                codec.decode(value)
+        for name, codec in self.model_list_fields:
+            for item in document.get(name) or ():
+                codec.decode(item)
+        return document
+
+
+@lru_cache(maxsize=None)
+def codec_for(model: Type[BaseModel]) -> ModelCodec:
+    """Return the compiled codec of a model, built on first use"""
+    return ModelCodec(model)
+
+
+def to_datetime(value) -> Optional[datetime]:
+    """Accept a BSON datetime or an ISO string, naive values are taken as UTC"""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def date_range(field: str, **bounds: datetime) -> Dict[str, Any]:
+    """Range filter on a date field, e.g. date_range("due_date", lt=today)
+
+    Matches native dates and, during the migration, legacy ISO strings.
+    """
+    native = {f"${operator}": value for operator, value in bounds.items()}
+    if not LEGACY_STRING_DATES:
+        return {field: native}
+    legacy = {f"${operator}": value.isoformat() for operator, value in bounds.items()}
+    return {"$or": [{field: native}, {field: legacy}]}
+
+
+def date_expr(field: str) -> Any:
+    """Aggregation expression of a date field, converting legacy ISO strings"""
+    return {"$toDate": f"${field}"} if LEGACY_STRING_DATES else f"${field}"
+
+
+async def unmigrated_date_collections(db, models: Dict[str, Type[BaseModel]]) -> List[str]:
+    """Collections still holding dates stored as ISO strings
+
+    Collections whose migration completed ("dates:<name>" in db.migrations)
+    are skipped; those found clean are recorded the same way so that they
+    are only scanned once.
+    """
+    migrated = {
+        state["_id"] async for state in db.migrations.find(
+            {"_id": {"$in": [f"dates:{name}" for name in models]}, "completed_at": {"$ne": None}}, {"_id": 1}
+        )
+    }
+    unmigrated = []
+    for name, model in models.items():
+        if f"dates:{name}" in migrated:
+            continue
+        paths = codec_for(model).date_paths()
+        legacy = await db[name].find_one({"$or": [{path: {"$type": "string"}} for path in paths]}, {"_id": 1})
+        if legacy:
+            unmigrated.append(name)
+        else:
+            await db.migrations.update_one(
+                {"_id": f"dates:{name}"},
+                {"$set": {"completed_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+    return unmigrated
@@ -0,0 +1,148 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bson import json_util
+from fastapi import HTTPException, Query, Response
+from mongo_codec import LEGACY_STRING_DATES, date_expr, to_datetime
+
+DEFAULT_PAGE_LIMIT = 1000
+MAX_PAGE_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Converted sort value of date fields, see _paginate_dates
+SORT_KEY = "_sort_key"
+
+
+class PageParams:
+    """Common query parameters of the paginated list endpoints"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        cursor: Optional[str] = Query(None, description="Valeur de l'en-tête X-Next-Cursor de la page précédente"),
+        sort: Optional[str] = Query(None),
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+        self.order = order
+
+
+def encode_cursor(sort_field: str, value: Any, last_id: str) -> str:
+    payload = json_util.dumps({"s": sort_field, "v": value, "id": last_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if payload["s"] != sort_field:
+            raise ValueError("cursor was issued for another sort")
+        return payload["v"], payload["id"]
+    except (ValueError, KeyError, TypeError, binascii.Error, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _and(*clauses: Dict[str, Any]) -> Dict[str, Any]:
+    clauses = [clause for clause in clauses if clause]
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def keyset_filter(field: str, direction: int, value: Any, last_id: str) -> Dict[str, Any]:
+    """Documents after (value, last_id) in (field, id) order.
+
+    Missing and null sort values sort before any other value, they are
+    matched explicitly since range operators never match null.
+    """
+    operator = "$lt" if direction == -1 else "$gt"
+    if value is None:
+        after_nulls = [] if direction == -1 else [{field: {"$ne": None}}]
+        return {"$or": [{field: None, "id": {operator: last_id}}, *after_nulls]}
+    nulls = [{field: None}] if direction == -1 else []
+    return {"$or": [
+        {field: {operator: value}},
+        {field: value, "id": {operator: last_id}},
+        *nulls
+    ]}
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    page: PageParams,
+    response: Response,
+    allowed_sorts: Iterable[str],
+    default_sort: str = "created_at",
+    projection: Optional[Dict[str, Any]] = None,
+    date_sorts: Iterable[str] = (),
+) -> List[Dict[str, Any]]:
+    """Run a keyset-paginated find on (sort field, id).
+
+    The cursor of the next page, if any, is returned in the X-Next-Cursor
+    header so that list endpoints keep returning plain arrays.
+
+    date_sorts are the sort fields holding dates: while legacy ISO strings
+    remain, range comparisons would only match one of the two BSON types,
+    so these fields are sorted on their converted value instead.
+    """
+    sort_field = page.sort or default_sort
+    if sort_field not in allowed_sorts:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported sort field. Use one of: {', '.join(sorted(allowed_sorts))}"
+        )
+
+    direction = -1 if page.order == "desc" else 1
+    cursor_value = None
+    if page.cursor:
+        cursor_value = decode_cursor(page.cursor, sort_field)
+
+    if LEGACY_STRING_DATES and sort_field in date_sorts:
+        documents = await _paginate_dates(collection, query, page, sort_field, direction, cursor_value, projection)
+    else:
+        keyset = keyset_filter(sort_field, direction, *cursor_value) if cursor_value else {}
+        cursor = collection.find(_and(query, keyset), projection)
+        cursor = cursor.sort([(sort_field, direction), ("id", direction)]).limit(page.limit + 1)
+        documents = await cursor.to_list(page.limit + 1)
+
+    if len(documents) > page.limit:
+        documents = documents[:page.limit]
+        last = documents[-1]
+        value = last.get(sort_field)
+        if sort_field in date_sorts:
+            value = to_datetime(value)
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort_field, value, last["id"])
+    return documents
+
+
+async def _paginate_dates(
+    collection,
+    query: Dict[str, Any],
+    page: PageParams,
+    sort_field: str,
+    direction: int,
+    cursor_value: Optional[Tuple[Any, str]],
+    projection: Optional[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Keyset page on a date field holding both BSON dates and ISO strings"""
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {SORT_KEY: date_expr(sort_field)}},
+    ]
+    if cursor_value:
+        value, last_id = cursor_value
+        pipeline.append({"$match": keyset_filter(SORT_KEY, direction, to_datetime(value), last_id)})
+    pipeline += [
+        {"$sort": {SORT_KEY: direction, "id": direction}},
+        {"$limit": page.limit + 1},
+        {"$unset": SORT_KEY},
+    ]
+    if projection:
+        pipeline.append({"$project": projection})
+    return await collection.aggregate(pipeline).to_list(page.limit + 1)
@@ -0,0 +1,61 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from xml.sax.saxutils import escape
+from mongo_codec import to_datetime
+
+# (bucket, last day) of the contractual payment delays, the last one is open ended
+DUE_DAYS_BUCKETS = [("on_receipt", 0), ("15_days", 15), ("30_days", 30), ("45_days", 45), ("60_days", 60), ("over_60_days", None)]
+
+# Mentions required on B2B invoices (art. L441-9, L441-10 and D441-5 du Code de commerce)
+LATE_PAYMENT_CLAUSE = (
+    "Pas d'escompte pour paiement anticipé. Tout retard de paiement entraîne de plein droit "
+    "des pénalités au taux de trois fois le taux d'intérêt légal ainsi qu'une indemnité "
+    "forfaitaire de 40 € pour frais de recouvrement."
+)
+# Wording a clause from elsewhere must carry word for word to replace the template
+LEGAL_MENTIONS = ("escompte", "trois fois le taux d'intérêt légal", "40 €", "frais de recouvrement")
+
+
+def has_legal_mentions(clause: str) -> bool:
+    """Whether a clause quotes every LEGAL_MENTIONS, whatever its spaces and apostrophes"""
+    text = re.sub(r"\s+", " ", clause.replace("\u2019", "'")).lower()
+    return all(mention.lower() in text for mention in LEGAL_MENTIONS)
+
+
+def due_days_bucket(days: int) -> str:
+    for label, last_day in DUE_DAYS_BUCKETS:
+        if last_day is None or days <= last_day:
+            return label
+    return DUE_DAYS_BUCKETS[-1][0]
+
+
+@lru_cache(maxsize=4096)
+def render_payment_terms(days: int, due_date: str, amount: float, clause: str = LATE_PAYMENT_CLAUSE) -> str:
+    """Payment terms paragraph (reportlab markup) of an invoice.
+
+    Only the clause wording may come from elsewhere: the delay, due date
+    and amount are always rendered from the invoice, the clause is escaped.
+    """
+    if due_days_bucket(days) == "on_receipt":
+        delay = "Paiement à réception de facture"
+    else:
+        delay = f"Paiement à {days} jours date de facture, au plus tard le {due_date}"
+    return f"{delay}, soit {amount:.2f} € TTC, par virement bancaire.<br/>{escape(clause)}"
+
+
+def invoice_payment_terms(invoice_data: Dict[str, Any], clauses: Optional[Dict[str, str]] = None) -> str:
+    """Payment terms of an invoice document, with the clause of its due-days
+    bucket from `clauses` when there is one that keeps the legal mentions"""
+    invoice_date = to_datetime(invoice_data.get('invoice_date'))
+    due_date = to_datetime(invoice_data.get('due_date'))
+    days = (due_date.date() - invoice_date.date()).days if invoice_date and due_date else 0
+    clause = (clauses or {}).get(due_days_bucket(days))
+    if not clause or not has_legal_mentions(clause):
+        clause = LATE_PAYMENT_CLAUSE
+    return render_payment_terms(
+        days,
+        due_date.strftime('%d/%m/%Y') if due_date else '',
+        round(invoice_data.get('total_ttc', 0), 2),
+        clause
+    )
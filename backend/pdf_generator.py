@@ -1,47 +1,131 @@
-import os
-import base64
-from datetime import datetime, timezone
+import json
+import hashlib
+from functools import lru_cache
 from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm, cm
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib.colors import HexColor
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from dotenv import load_dotenv
+from reportlab import rl_config
+from mongo_codec import to_datetime
+from payment_terms import invoice_payment_terms
 
-load_dotenv()
+# Page streams are only deflated: ASCII85 on top makes PDFs 25% larger and took a
+# quarter of the rendering time. Only this module renders PDFs, in its own processes.
+rl_config.useA85 = 0
 
-class PDFInvoiceGenerator:
-    def __init__(self):
-        self.emergent_key = os.environ.get('EMERGENT_LLM_KEY')
-        
-    async def generate_invoice_pdf(self, invoice_data, client_data, company_settings, items_details):
-        """Generate a professional PDF invoice using AI for content and reportlab for formatting"""
-        
-        # Generate invoice content using AI
-        invoice_content = await self._generate_invoice_content(
-            invoice_data, client_data, company_settings, items_details
-        )
-        
-        # Create PDF using reportlab
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer, 
-            pagesize=A4,
-            rightMargin=20*mm,
-            leftMargin=20*mm,
-            topMargin=20*mm,
-            bottomMargin=20*mm
-        )
-        
-        # Prepare content
-        story = []
+# Bump on layout changes: PDFs rendered by older templates no longer match their inputs
+PDF_TEMPLATE_VERSION = "2025.1"
+
+# Fields of each document the PDF reads, nothing else is sent to the renderer processes
+PDF_INVOICE_FIELDS = ("invoice_number", "invoice_date", "due_date", "total_ht", "total_vat", "total_ttc")
+PDF_CLIENT_FIELDS = ("company_name", "contact_name", "address", "postal_code", "city", "vat_number", "vat_rate")
+PDF_COMPANY_FIELDS = ("company_name", "company_address", "company_phone", "company_email")
+# Vehicle fields copied on the items (vehicle_brand, vehicle_model, license_plate)
+PDF_VEHICLE_FIELDS = ("brand", "model", "license_plate")
+PDF_ITEM_FIELDS = (
+    "vehicle_brand", "vehicle_model", "license_plate", "is_renewable",
+    "rental_duration", "rental_period", "quantity", "daily_rate"
+)
+
+
+def _pick(document: Dict[str, Any], fields) -> Dict[str, Any]:
+    return {field: document[field] for field in fields if document.get(field) is not None}
+
+
+def build_pdf_payload(
+    invoice_data: Dict[str, Any],
+    client_data: Dict[str, Any],
+    company_settings: Dict[str, Any],
+    items_details: List[Dict[str, Any]],
+    payment_terms: Optional[str] = None
+) -> Dict[str, Any]:
+    """Plain, picklable rendering input of an invoice PDF.
+
+    Only the fields printed on the invoice are kept (clients carry their
+    license documents), payment_terms defaults to the template terms of
+    the invoice (see payment_terms.py).
+    """
+    return {
+        "invoice": _pick(invoice_data, PDF_INVOICE_FIELDS),
+        "client": _pick(client_data, PDF_CLIENT_FIELDS),
+        "company": _pick(company_settings, PDF_COMPANY_FIELDS),
+        "items": [_pick(item, PDF_ITEM_FIELDS) for item in items_details],
+        "payment_terms": payment_terms if payment_terms is not None else invoice_payment_terms(invoice_data)
+    }
+
+
+def pdf_payload_hash(payload: Dict[str, Any]) -> str:
+    """Key of a rendering: same payload and template version, same PDF"""
+    data = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(f"{PDF_TEMPLATE_VERSION}:{data}".encode("utf-8")).hexdigest()
+
+
+def sample_pdf_payload(items: int = 1) -> Dict[str, Any]:
+    """Payload of a fictitious invoice, used to warm up renderers and in benchmarks"""
+    total_ht = 85.0 * items
+    invoice = {
+        "invoice_number": "FACT2025-000001", "invoice_date": "2025-03-01T00:00:00",
+        "due_date": "2025-03-31T00:00:00", "total_ht": total_ht,
+        "total_vat": round(total_ht * 0.2, 2), "total_ttc": round(total_ht * 1.2, 2)
+    }
+    return build_pdf_payload(
+        invoice,
+        {"company_name": "Transports Martin SARL", "contact_name": "Thomas Petit", "address": "12 rue de la Gare",
+         "postal_code": "69003", "city": "Lyon", "vat_number": "FR12345678901", "vat_rate": 20},
+        {"company_name": "AutoPro Rental", "company_address": "1 avenue des Loueurs, 75011 Paris",
+         "company_phone": "01 23 45 67 89", "company_email": "contact@autopro.fr"},
+        [
+            {"vehicle_brand": "Renault", "vehicle_model": "Master", "license_plate": f"AB-{index:03d}-CD",
+             "is_renewable": index % 2 == 0, "rental_duration": 1, "rental_period": "months",
+             "quantity": 1, "daily_rate": 85.0}
+            for index in range(items)
+        ]
+    )
+
+
+class StaticParagraph(Paragraph):
+    """Paragraph of the template, parsed once and broken into lines once per width.
+
+    Flowables keep layout state (wrap sizes, _postponed) and cannot be
+    shared between documents: each rendering takes a copy(), which reuses
+    the parsed fragments and the line breaks of the template paragraph.
+    """
+
+    def __init__(self, text, style, frags=None, layouts=None):
+        super().__init__(text, style, frags=frags)
+        self._layouts = {} if layouts is None else layouts
+
+    def breakLines(self, width):
+        key = tuple(width) if isinstance(width, (list, tuple)) else width
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = self._layouts[key] = super().breakLines(width)
+        return layout
+
+    def copy(self) -> 'StaticParagraph':
+        return StaticParagraph(self.text, self.style, frags=self.frags, layouts=self._layouts)
+
+
+class InvoiceTemplate:
+    """Parts of the invoice layout that only depend on the company settings.
+
+    Compiled once per settings version (see compiled_template) then shared
+    by the renderings: style sheet, paragraph and table styles, and the
+    title, company and footer paragraphs with their line breaks. A
+    rendering only lays out the client block, the invoice details, the
+    payment terms and the item rows.
+    """
+
+    def __init__(self, company_settings: Dict[str, Any]):
         styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
         
         # Custom styles
-        title_style = ParagraphStyle(
+        self.title_style = ParagraphStyle(
             'CustomTitle',
             parent=styles['Heading1'],
             fontSize=24,
@@ -50,7 +134,7 @@ class PDFInvoiceGenerator:
             textColor=HexColor('#2563eb')
         )
         
-        header_style = ParagraphStyle(
+        self.header_style = ParagraphStyle(
             'HeaderStyle',
             parent=styles['Normal'],
             fontSize=12,
@@ -60,16 +144,92 @@ class PDFInvoiceGenerator:
         )
         
         # Title
-        story.append(Paragraph("FACTURE", title_style))
-        story.append(Spacer(1, 20))
+        self.title = StaticParagraph("FACTURE", self.title_style)
         
-        # Company and client info
+        # Company info
         company_info = f"""
         <b>{company_settings.get('company_name', 'AutoPro Rental')}</b><br/>
         {company_settings.get('company_address', '')}<br/>
         Tél: {company_settings.get('company_phone', '')}<br/>
         Email: {company_settings.get('company_email', '')}
         """
+        self.company_block = StaticParagraph(company_info, self.normal_style)
+        
+        self.info_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ])
+        
+        # Rows are addressed from both ends, so one style fits any number of items
+        self.items_table_style = TableStyle([
+            # Header row
+            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#f3f4f6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), HexColor('#1f2937')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),  # Right align numbers
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            
+            # Data rows
+            ('FONTNAME', (0, 1), (-1, -4), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -4), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -4), [colors.white, HexColor('#f9fafb')]),
+            
+            # Total rows
+            ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -3), (-1, -1), 10),
+            ('BACKGROUND', (0, -1), (-1, -1), HexColor('#dbeafe')),
+            ('TEXTCOLOR', (0, -1), (-1, -1), HexColor('#1e40af')),
+            
+            # Borders
+            ('GRID', (0, 0), (-1, -1), 1, HexColor('#e5e7eb')),
+            ('LINEBELOW', (0, 0), (-1, 0), 2, HexColor('#374151')),
+        ])
+        
+        self.payment_terms_title = StaticParagraph("<b>Conditions de paiement:</b>", self.header_style)
+        
+        # Footer
+        footer_text = f"""
+        <i>Merci pour votre confiance.</i><br/>
+        {company_settings.get('company_name', 'AutoPro Rental')} - Spécialiste en location de véhicules
+        """
+        self.footer = StaticParagraph(footer_text, self.normal_style)
+
+
+@lru_cache(maxsize=8)
+def compiled_template(company_key: Tuple[Tuple[str, Any], ...]) -> InvoiceTemplate:
+    """Template of a settings version, company_key being the sorted company fields of the payload"""
+    return InvoiceTemplate(dict(company_key))
+
+
+class PDFInvoiceGenerator:
+    def render(self, payload: Dict[str, Any]) -> bytes:
+        """Generate a professional PDF invoice with reportlab from a
+        payload built by build_pdf_payload.
+
+        CPU bound and synchronous: the API runs it in the worker processes
+        of services/pdf_renderer.py.
+        """
+        invoice_data = payload['invoice']
+        client_data = payload['client']
+        items_details = payload['items']
+        template = compiled_template(tuple(sorted(payload['company'].items())))
+        
+        # Create PDF using reportlab
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer, 
+            pagesize=A4,
+            rightMargin=20*mm,
+            leftMargin=20*mm,
+            topMargin=20*mm,
+            bottomMargin=20*mm
+        )
+        
+        # Prepare content
+        story = [template.title.copy(), Spacer(1, 20)]
         
         client_info = f"""
         <b>FACTURÉ À:</b><br/>
@@ -82,15 +242,10 @@ class PDFInvoiceGenerator:
         
         # Create table for company and client info
         info_table = Table([
-            [Paragraph(company_info, styles['Normal']), 
-             Paragraph(client_info, styles['Normal'])]
+            [template.company_block.copy(),
+             Paragraph(client_info, template.normal_style)]
         ], colWidths=[8*cm, 8*cm])
-        
-        info_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ]))
+        info_table.setStyle(template.info_table_style)
         
         story.append(info_table)
         story.append(Spacer(1, 30))
@@ -98,11 +253,11 @@ class PDFInvoiceGenerator:
         # Invoice details
         invoice_details = f"""
         <b>Facture N°:</b> {invoice_data.get('invoice_number', '')}<br/>
-        <b>Date de facture:</b> {datetime.fromisoformat(invoice_data.get('invoice_date', '')).strftime('%d/%m/%Y') if invoice_data.get('invoice_date') else ''}<br/>
-        <b>Date d'échéance:</b> {datetime.fromisoformat(invoice_data.get('due_date', '')).strftime('%d/%m/%Y') if invoice_data.get('due_date') else ''}
+        <b>Date de facture:</b> {to_datetime(invoice_data.get('invoice_date')).strftime('%d/%m/%Y') if invoice_data.get('invoice_date') else ''}<br/>
+        <b>Date d'échéance:</b> {to_datetime(invoice_data.get('due_date')).strftime('%d/%m/%Y') if invoice_data.get('due_date') else ''}
         """
         
-        story.append(Paragraph(invoice_details, header_style))
+        story.append(Paragraph(invoice_details, template.header_style))
         story.append(Spacer(1, 20))
         
         # Items table
@@ -129,110 +284,37 @@ class PDFInvoiceGenerator:
         
         # Create items table
         items_table = Table(table_data, colWidths=[8*cm, 2*cm, 3*cm, 3*cm])
-        items_table.setStyle(TableStyle([
-            # Header row
-            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#f3f4f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), HexColor('#1f2937')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),  # Right align numbers
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            
-            # Data rows
-            ('FONTNAME', (0, 1), (-1, -4), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -4), 9),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -4), [colors.white, HexColor('#f9fafb')]),
-            
-            # Total rows
-            ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -3), (-1, -1), 10),
-            ('BACKGROUND', (0, -1), (-1, -1), HexColor('#dbeafe')),
-            ('TEXTCOLOR', (0, -1), (-1, -1), HexColor('#1e40af')),
-            
-            # Borders
-            ('GRID', (0, 0), (-1, -1), 1, HexColor('#e5e7eb')),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, HexColor('#374151')),
-        ]))
+        items_table.setStyle(template.items_table_style)
         
         story.append(items_table)
         story.append(Spacer(1, 30))
         
-        # Payment terms using AI-generated content
-        payment_terms = await self._generate_payment_terms(invoice_data, client_data)
-        story.append(Paragraph("<b>Conditions de paiement:</b>", header_style))
-        story.append(Paragraph(payment_terms, styles['Normal']))
+        # Payment terms
+        story.append(template.payment_terms_title.copy())
+        story.append(Paragraph(payload['payment_terms'], template.normal_style))
         
         # Footer
         story.append(Spacer(1, 40))
-        footer_text = f"""
-        <i>Merci pour votre confiance.</i><br/>
-        {company_settings.get('company_name', 'AutoPro Rental')} - Spécialiste en location de véhicules
-        """
-        story.append(Paragraph(footer_text, styles['Normal']))
+        story.append(template.footer.copy())
         
         # Build PDF
         doc.build(story)
         
-        # Return base64 encoded PDF
-        buffer.seek(0)
+        # Return raw PDF bytes
         pdf_data = buffer.getvalue()
         buffer.close()
         
-        return base64.b64encode(pdf_data).decode('utf-8')
-    
-    async def _generate_invoice_content(self, invoice_data, client_data, company_settings, items_details):
-        """Use AI to generate personalized invoice content"""
-        try:
-            chat = LlmChat(
-                api_key=self.emergent_key,
-                session_id=f"invoice_{invoice_data.get('id', 'default')}",
-                system_message="Vous êtes un expert comptable français spécialisé dans la location de véhicules. Générez du contenu professionnel pour les factures."
-            ).with_model("openai", "gpt-4o-mini")
-            
-            prompt = f"""
-            Générez un contenu professionnel pour une facture de location de véhicules avec ces informations:
-            
-            Client: {client_data.get('company_name', '')}
-            Véhicules loués: {len(items_details)} véhicule(s)
-            Montant total: {invoice_data.get('total_ttc', 0):.2f} €
-            
-            Générez uniquement un texte de remerciement professionnel en français (2-3 lignes maximum).
-            """
-            
-            message = UserMessage(text=prompt)
-            response = await chat.send_message(message)
-            return response.strip() if response else "Merci pour votre confiance."
-            
-        except Exception as e:
-            print(f"Erreur génération contenu AI: {e}")
-            return "Merci pour votre confiance."
-    
-    async def _generate_payment_terms(self, invoice_data, client_data):
-        """Generate payment terms using AI"""
-        try:
-            chat = LlmChat(
-                api_key=self.emergent_key,
-                session_id=f"payment_terms_{invoice_data.get('id', 'default')}",
-                system_message="Vous êtes un expert comptable français. Générez des conditions de paiement professionnelles."
-            ).with_model("openai", "gpt-4o-mini")
-            
-            due_date = datetime.fromisoformat(invoice_data.get('due_date', ''))
-            days_to_pay = (due_date - datetime.now(timezone.utc)).days
-            
-            prompt = f"""
-            Générez des conditions de paiement professionnelles en français pour:
-            - Échéance dans {days_to_pay} jours
-            - Montant: {invoice_data.get('total_ttc', 0):.2f} €
-            
-            Incluez: délai de paiement, modalités, pénalités de retard selon la loi française.
-            Maximum 4 lignes.
-            """
-            
-            message = UserMessage(text=prompt)
-            response = await chat.send_message(message)
-            return response.strip() if response else f"Paiement à {days_to_pay} jours. En cas de retard, pénalités selon la loi française."
-            
-        except Exception as e:
-            print(f"Erreur génération conditions AI: {e}")
-            return "Paiement à 30 jours. En cas de retard, pénalités de 3 fois le taux légal."
\ No newline at end of file
+        return pdf_data
+
+
+# One generator per process, rendering entry points of the worker processes
+_generator = PDFInvoiceGenerator()
+
+
+def render_invoice_pdf(payload: Dict[str, Any]) -> bytes:
+    return _generator.render(payload)
+
+
+def warm_up() -> None:
+    """Render a throwaway invoice so fonts and styles are loaded before the first request"""
+    render_invoice_pdf(sample_pdf_payload())
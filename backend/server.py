@@ -1,32 +1,56 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import Response, FileResponse
+from fastapi.responses import Response, FileResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 import jwt
-from passlib.context import CryptContext
 import asyncio
+import time
+import csv
+import calendar
+import io
+import json
 from enum import Enum
 import base64
-from pdf_generator import PDFInvoiceGenerator
+from pdf_generator import build_pdf_payload, pdf_payload_hash, PDF_CLIENT_FIELDS, PDF_COMPANY_FIELDS, PDF_VEHICLE_FIELDS
 from accounting import FrenchAccounting, AccountingEntry
+from mongo_codec import LEGACY_STRING_DATES, codec_for, to_datetime, date_range, date_expr, unmigrated_date_collections
+from pagination import PageParams, paginate, NEXT_CURSOR_HEADER
+from indexes import ensure_indexes, unused_indexes
+from loaders import Loaders
+from fleet_calendar import build_calendar
+from forecast import project_renewals
+from bank_statement import BankStatement, InvoiceMatcher, StatementError, StatementLine, reconcile
+from zip_stream import ZipStream
 from services.mailgun_service import mailgun_service, EmailRequest
 from services.insee_service import insee_service, CompanyInfo
+from services.user_cache import user_cache
+from services.dashboard_cache import dashboard_cache
+from services.password_hasher import password_hasher
+from services.pdf_renderer import pdf_renderer
+from services.sequence_service import SequenceAllocator, block_sizes_from_env
+from services.blob_store import pdf_store
+from services.booking_index import booking_index, BookingConflict, BookingLockTimeout
+from services.scheduler import scheduler, JobAlreadyRunning, JobFailed
+from services.payment_terms_service import payment_terms_service
+from payment_terms import invoice_payment_terms
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # Security
@@ -34,13 +58,14 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production'
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 # PDF and Accounting services
-pdf_generator = PDFInvoiceGenerator()
 accounting_system = FrenchAccounting()
 
+# Document numbering (orders, invoices, renewals)
+sequence_allocator = SequenceAllocator(db.counters, block_sizes_from_env())
+
 # Create the main app
 app = FastAPI(title="Abetoile Location Management", version="1.0.0")
 
@@ -179,6 +204,8 @@ class Order(BaseModel):
     deposit_vat: float = 0  # TVA sur la caution
     grand_total: float = 0  # Total TTC + caution
     status: str = "active"
+    renewed_from: Optional[str] = None  # ID de la commande d'origine pour une reconduction
+    renewal_key: Optional[str] = None  # Période reconduite, unique, voir renewal_key()
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_by: str
 
@@ -195,6 +222,7 @@ class Payment(BaseModel):
     payment_method: str  # "bank", "cash", "check", "card"
     reference: Optional[str] = None  # Référence bancaire, numéro chèque, etc.
     notes: Optional[str] = None
+    idempotency_key: Optional[str] = None  # Un même paiement n'est jamais enregistré deux fois
     created_by: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -216,9 +244,37 @@ class Invoice(BaseModel):
     amount_paid: float = 0  # Montant total payé
     remaining_amount: float = 0  # Montant restant à payer
     payment_date: Optional[datetime] = None  # Date du dernier paiement
-    pdf_data: Optional[str] = None  # Base64 encoded PDF
+    pdf_blob_id: Optional[str] = None  # Identifiant du PDF dans le stockage de fichiers
+    pdf_legacy: bool = False  # PDF encore dans pdf_data, en attente de manage.py migrate-pdfs
+    pdf_hash: Optional[str] = None  # Empreinte des données de rendu du PDF, voir pdf_payload_hash
+    pdf_stale: bool = False  # Client ou paramètres modifiés depuis la génération du PDF
+    overdue_since: Optional[datetime] = None  # Passage en retard par la tâche invoice_overdue
+    overdue_bucket: Optional[str] = None  # Tranche de jours de retard, voir OVERDUE_BUCKETS
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+# Invoice list endpoints only load the model fields, never legacy PDF payloads
+INVOICE_SUMMARY_PROJECTION = {
+    "_id": 0,
+    **{name: 1 for name in Invoice.model_fields},
+    "pdf_legacy": {"$eq": [{"$type": "$pdf_data"}, "string"]}
+}
+
+# Older invoices have no grand_total / remaining_amount, fall back to the TTC total
+INVOICE_TOTAL_EXPR = {"$ifNull": ["$grand_total", "$total_ttc"]}
+INVOICE_REMAINING_EXPR = {"$ifNull": ["$remaining_amount", INVOICE_TOTAL_EXPR]}
+
+# Unpaid invoices past their due date are flagged overdue by the invoice_overdue job,
+# drafts have not been issued to the client and are never overdue
+OVERDUE_SOURCE_STATUSES = ["sent", "partially_paid"]
+# (label, last day) of the days overdue buckets, the last one is open ended
+OVERDUE_BUCKETS = [("1-30", 30), ("31-60", 60), ("61-90", 90), ("90+", None)]
+
+def overdue_bucket(due_date: datetime, now: datetime) -> str:
+    """Bucket of an invoice due before now, with the bounds of mark_overdue_invoices"""
+    for label, last_day in OVERDUE_BUCKETS:
+        if last_day is None or due_date >= now - timedelta(days=last_day):
+            return label
+
 class Settings(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     company_name: str = "Abetoile Location"
@@ -279,11 +335,11 @@ class MaintenanceRecordCreate(BaseModel):
     supplier: Optional[str] = None
     notes: Optional[str] = None
 # Auth functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -304,40 +360,53 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = await db.users.find_one({"username": username})
+    cached_user = user_cache.get(username)
+    if cached_user is not None:
+        return cached_user
+    
+    user = await db.users.find_one({"username": username}, {"hashed_password": 0})
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
+    if not user.get('is_active', True):
+        raise HTTPException(status_code=401, detail="User is inactive")
+    
+    current_user = User(**parse_from_mongo(user, User))
+    user_cache.set(username, current_user)
+    return current_user
 
 # Helper functions
 async def generate_order_number():
-    count = await db.orders.count_documents({})
-    return f"CMD{count + 1:06d}"
+    return await sequence_allocator.next_number("orders", "CMD")
 
 async def generate_invoice_number():
-    count = await db.invoices.count_documents({})
-    return f"FACT{count + 1:06d}"
-
-def prepare_for_mongo(data):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-            elif isinstance(value, dict):
-                data[key] = prepare_for_mongo(value)
-            elif isinstance(value, list):
-                data[key] = [prepare_for_mongo(item) if isinstance(item, dict) else item for item in value]
-    return data
-
-def parse_from_mongo(item):
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if isinstance(value, str) and 'T' in value:
-                try:
-                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except:
-                    pass
-    return item
+    return await sequence_allocator.next_number("invoices", "FACT")
+
+async def generate_renewal_order_number():
+    return await sequence_allocator.next_number("renewal_orders", "REN")
+
+# Renewal orders: REN numbers, or CMD...-R<timestamp> numbers written
+# without renewed_from by the renewal job before the REN sequence
+RENEWAL_ORDER_NUMBER = r"^REN|-R\d+$"
+# Orders that start a renewal chain, renewal orders excluded
+ORIGINAL_ORDER_FILTER = {"renewed_from": None, "order_number": {"$not": {"$regex": RENEWAL_ORDER_NUMBER}}}
+
+def get_loaders() -> Loaders:
+    """Request-scoped batched document loaders"""
+    return Loaders(db)
+
+def prepare_for_mongo(data, model):
+    return codec_for(model).encode(data)
+
+def parse_from_mongo(item, model):
+    return codec_for(model).decode(item)
+
+def period_filter(field: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> dict:
+    bounds = {}
+    if start_date:
+        bounds["gte"] = start_date
+    if end_date:
+        bounds["lte"] = end_date
+    return date_range(field, **bounds) if bounds else {}
 
 # Auth endpoints
 @api_router.post("/auth/register", response_model=User)
@@ -352,22 +421,23 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     user_dict = user_data.dict()
     del user_dict['password']
     user_dict['hashed_password'] = hashed_password
     
     user = User(**user_dict)
-    user_dict = prepare_for_mongo(user.dict())
+    user_dict = prepare_for_mongo(user.dict(), User)
     user_dict['hashed_password'] = hashed_password
     
     await db.users.insert_one(user_dict)
+    user_cache.invalidate(user.username)
     return user
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_data: UserLogin):
     user = await db.users.find_one({"username": user_data.username})
-    if not user or not verify_password(user_data.password, user['hashed_password']):
+    if not user or not await verify_password(user_data.password, user['hashed_password']):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     access_token = create_access_token(data={"sub": user['username']})
@@ -377,66 +447,247 @@ async def login(user_data: UserLogin):
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+# System endpoints
+@api_router.get("/system/metrics")
+async def get_system_metrics(current_user: User = Depends(get_current_user)):
+    """In-process caches and worker pools statistics"""
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "pdf_renderer": pdf_renderer.stats(),
+        "dashboard_cache": dashboard_cache.stats(),
+        "booking_index": booking_index.stats()
+    }
+
+@api_router.get("/system/jobs")
+async def get_scheduled_jobs(current_user: User = Depends(get_current_user)):
+    """Scheduled jobs with their next run and latest runs"""
+    return await scheduler.status()
+
+async def run_scheduled_job(name: str) -> dict:
+    """Run a scheduled job now, under the same lock as its scheduled runs"""
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        run = await scheduler.run(name)
+    except JobAlreadyRunning:
+        raise HTTPException(status_code=409, detail="Job already running")
+    if run["status"] != "success":
+        raise HTTPException(status_code=500, detail=f"Error during {name}: {run['error']}")
+    return run
+
+@api_router.post("/system/jobs/{name}/run")
+async def trigger_scheduled_job(name: str, current_user: User = Depends(get_current_user)):
+    return await run_scheduled_job(name)
+
 # Client endpoints
 @api_router.post("/clients", response_model=Client)
 async def create_client(client_data: ClientCreate, current_user: User = Depends(get_current_user)):
     client = Client(**client_data.dict())
-    client_dict = prepare_for_mongo(client.dict())
+    client_dict = prepare_for_mongo(client.dict(), Client)
     await db.clients.insert_one(client_dict)
     return client
 
 @api_router.get("/clients", response_model=List[Client])
-async def get_clients(current_user: User = Depends(get_current_user)):
-    clients = await db.clients.find({"is_active": True}).to_list(1000)
-    return [Client(**parse_from_mongo(client)) for client in clients]
+async def get_clients(
+    response: Response,
+    page: PageParams = Depends(),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = {"is_active": True, **period_filter("created_at", start_date, end_date)}
+    clients = await paginate(
+        db.clients, query, page, response,
+        allowed_sorts={"created_at", "company_name", "city"},
+        date_sorts={"created_at"}
+    )
+    return [Client(**parse_from_mongo(client, Client)) for client in clients]
 
 @api_router.get("/clients/{client_id}", response_model=Client)
 async def get_client(client_id: str, current_user: User = Depends(get_current_user)):
     client = await db.clients.find_one({"id": client_id})
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    return Client(**parse_from_mongo(client))
+    return Client(**parse_from_mongo(client, Client))
 
 @api_router.put("/clients/{client_id}", response_model=Client)
 async def update_client(client_id: str, client_data: ClientCreate, current_user: User = Depends(get_current_user)):
-    update_data = prepare_for_mongo(client_data.dict())
-    result = await db.clients.update_one({"id": client_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    update_data = prepare_for_mongo(client_data.dict(), ClientCreate)
+    previous_client = await db.clients.find_one_and_update(
+        {"id": client_id}, {"$set": update_data}, projection={"_id": 0, **dict.fromkeys(PDF_CLIENT_FIELDS, 1)}
+    )
+    if previous_client is None:
         raise HTTPException(status_code=404, detail="Client not found")
+    if any(previous_client.get(field) != update_data.get(field) for field in PDF_CLIENT_FIELDS):
+        await mark_invoice_pdfs_stale({"client_id": client_id})
     
     updated_client = await db.clients.find_one({"id": client_id})
-    return Client(**parse_from_mongo(updated_client))
+    return Client(**parse_from_mongo(updated_client, Client))
 
 # Vehicle endpoints
 @api_router.post("/vehicles", response_model=Vehicle)
 async def create_vehicle(vehicle_data: VehicleCreate, current_user: User = Depends(get_current_user)):
     vehicle = Vehicle(**vehicle_data.dict())
-    vehicle_dict = prepare_for_mongo(vehicle.dict())
+    vehicle_dict = prepare_for_mongo(vehicle.dict(), Vehicle)
     await db.vehicles.insert_one(vehicle_dict)
     return vehicle
 
 @api_router.get("/vehicles", response_model=List[Vehicle])
-async def get_vehicles(current_user: User = Depends(get_current_user)):
-    vehicles = await db.vehicles.find().to_list(1000)
-    return [Vehicle(**parse_from_mongo(vehicle)) for vehicle in vehicles]
+async def get_vehicles(
+    response: Response,
+    page: PageParams = Depends(),
+    type: Optional[VehicleType] = None,
+    is_available: Optional[bool] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = {}
+    if type:
+        query["type"] = type.value
+    if is_available is not None:
+        query["is_available"] = is_available
+    vehicles = await paginate(
+        db.vehicles, query, page, response,
+        allowed_sorts={"created_at", "license_plate", "brand", "daily_rate"},
+        date_sorts={"created_at"}
+    )
+    return [Vehicle(**parse_from_mongo(vehicle, Vehicle)) for vehicle in vehicles]
+
+class BookedPeriod(BaseModel):
+    order_id: str
+    order_number: Optional[str] = None
+    start_date: date
+    end_date: date
+
+class VehicleAvailability(BaseModel):
+    vehicle_id: str
+    license_plate: str
+    brand: str
+    model: str
+    type: VehicleType
+    is_available: bool  # Flag manuel (véhicule hors service)
+    available: bool
+    bookings: List[BookedPeriod] = []
+
+@api_router.get("/vehicles/availability", response_model=List[VehicleAvailability])
+async def get_vehicles_availability(
+    start: datetime,
+    end: datetime,
+    type: Optional[VehicleType] = None,
+    available_only: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Vehicles free over [start, end], answered from the booking index"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    query = {"type": type.value} if type else {}
+    vehicles = await db.vehicles.find(query, {
+        "_id": 0, "id": 1, "license_plate": 1, "brand": 1, "model": 1, "type": 1, "is_available": 1
+    }).sort("license_plate", 1).to_list(length=None)
+    bookings = booking_index.availability((vehicle["id"] for vehicle in vehicles), start, end)
+    
+    availability = []
+    for vehicle in vehicles:
+        conflicts = bookings[vehicle["id"]]
+        available = vehicle.get("is_available", True) and not conflicts
+        if available_only and not available:
+            continue
+        availability.append(VehicleAvailability(
+            vehicle_id=vehicle["id"],
+            license_plate=vehicle["license_plate"],
+            brand=vehicle["brand"],
+            model=vehicle["model"],
+            type=vehicle["type"],
+            is_available=vehicle.get("is_available", True),
+            available=available,
+            bookings=[BookedPeriod(**conflict._asdict()) for conflict in conflicts]
+        ))
+    return availability
+
+FLEET_CALENDAR_MAX_DAYS = 366
+
+@api_router.get("/fleet/calendar")
+async def get_fleet_calendar(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    type: Optional[VehicleType] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Booked day ranges and utilization per vehicle and vehicle type.
+
+    Defaults to the current month, both dates are included.
+    """
+    today = datetime.now(timezone.utc).date()
+    start = start or today.replace(day=1)
+    if end is None:
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        end = next_month - timedelta(days=1)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if (end - start).days + 1 > FLEET_CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Calendar limited to {FLEET_CALENDAR_MAX_DAYS} days")
+    
+    query = {"type": type.value} if type else {}
+    vehicles = await db.vehicles.find(
+        query, {"_id": 0, "id": 1, "license_plate": 1, "type": 1}
+    ).sort("license_plate", 1).to_list(length=None)
+    intervals = booking_index.intervals((vehicle["id"] for vehicle in vehicles), start, end)
+    return build_calendar(vehicles, intervals, start, end)
 
 @api_router.get("/vehicles/{vehicle_id}", response_model=Vehicle)
 async def get_vehicle(vehicle_id: str, current_user: User = Depends(get_current_user)):
     vehicle = await db.vehicles.find_one({"id": vehicle_id})
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
-    return Vehicle(**parse_from_mongo(vehicle))
+    return Vehicle(**parse_from_mongo(vehicle, Vehicle))
+
+@api_router.put("/vehicles/{vehicle_id}", response_model=Vehicle)
+async def update_vehicle(vehicle_id: str, vehicle_data: VehicleCreate, current_user: User = Depends(get_current_user)):
+    update_data = prepare_for_mongo(vehicle_data.dict(), VehicleCreate)
+    previous_vehicle = await db.vehicles.find_one_and_update(
+        {"id": vehicle_id}, {"$set": update_data}, projection={"_id": 0, **dict.fromkeys(PDF_VEHICLE_FIELDS, 1)}
+    )
+    if previous_vehicle is None:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    if any(previous_vehicle.get(field) != update_data.get(field) for field in PDF_VEHICLE_FIELDS):
+        await mark_invoice_pdfs_stale({"items.vehicle_id": vehicle_id})
+    
+    updated_vehicle = await db.vehicles.find_one({"id": vehicle_id})
+    return Vehicle(**parse_from_mongo(updated_vehicle, Vehicle))
 
 # Order endpoints
+async def booking_conflict_error(conflicts: List[BookingConflict], loaders: Loaders) -> HTTPException:
+    vehicles = await loaders.vehicles.load_many(conflict.vehicle_id for conflict in conflicts)
+    periods = "; ".join(
+        f"{vehicle['license_plate'] if vehicle else conflict.vehicle_id} from {conflict.start_date} "
+        f"to {conflict.end_date} (order {conflict.order_number or conflict.order_id})"
+        for conflict, vehicle in zip(conflicts, vehicles)
+    )
+    return HTTPException(status_code=409, detail=f"Vehicle already booked: {periods}")
+
+async def reserve_vehicles(order: Order, write, loaders: Loaders) -> None:
+    """Run write() (storing the order) unless its vehicles are booked, see BookingIndex.reserve"""
+    try:
+        conflicts = await booking_index.reserve(db, order.dict(), write)
+    except BookingLockTimeout:
+        raise HTTPException(status_code=409, detail="Vehicle being booked by another request, retry")
+    if conflicts:
+        raise await booking_conflict_error(conflicts, loaders)
+
 def calculate_days_between(start_date: datetime, end_date: datetime) -> int:
     """Calculate number of days between two dates"""
     delta = end_date - start_date
     return max(1, delta.days + 1)  # Include both start and end date
 
 @api_router.post("/orders", response_model=Order)
-async def create_order(order_data: OrderCreate, current_user: User = Depends(get_current_user)):
+async def create_order(
+    order_data: OrderCreate,
+    current_user: User = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
     # Get client to calculate VAT
-    client = await db.clients.find_one({"id": order_data.client_id})
+    client = await loaders.clients.load(order_data.client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -492,17 +743,18 @@ async def create_order(order_data: OrderCreate, current_user: User = Depends(get
         created_by=current_user.id
     )
     
-    order_dict = prepare_for_mongo(order.dict())
-    await db.orders.insert_one(order_dict)
+    order_dict = prepare_for_mongo(order.dict(), Order)
+    await reserve_vehicles(order, lambda: db.orders.insert_one(order_dict), loaders)
     
     # Create initial invoice
-    await create_invoice_from_order(order, client)
+    await create_invoice_from_order(order, client, loaders)
     
     return order
 
-async def create_invoice_from_order(order: Order, client: dict):
-    invoice_number = await generate_invoice_number()
-    # Use the start date of the first item or current date
+def build_invoice(
+    order: Order, invoice_number: str, client: dict, settings: dict, vehicles: List[Optional[dict]]
+) -> Tuple[Invoice, List[AccountingEntry]]:
+    """Invoice of an order and its accounting entries, without any I/O"""
     invoice_date = datetime.now(timezone.utc)
     due_date = invoice_date + timedelta(days=30)  # Default 30 days
     
@@ -523,19 +775,10 @@ async def create_invoice_from_order(order: Order, client: dict):
         status=InvoiceStatus.DRAFT
     )
     
-    invoice_dict = prepare_for_mongo(invoice.dict())
-    await db.invoices.insert_one(invoice_dict)
-    
     # Generate accounting entries for the invoice
     try:
-        settings = await db.settings.find_one()
-        if not settings:
-            settings = {}
-        
-        # Get vehicles details for items
         items_details = []
-        for item in order.items:
-            vehicle = await db.vehicles.find_one({"id": item.vehicle_id})
+        for item, vehicle in zip(order.items, vehicles):
             if vehicle:
                 items_details.append({
                     **item.dict(),
@@ -544,30 +787,73 @@ async def create_invoice_from_order(order: Order, client: dict):
                     'license_plate': vehicle.get('license_plate', '')
                 })
         
-        # Generate accounting entries
         entries = accounting_system.generate_invoice_entries(
             invoice_data=invoice.dict(),
             client_data=client,
             items_data=items_details,
             settings=settings
         )
-        
-        # Save accounting entries to database
-        for entry in entries:
-            entry_dict = prepare_for_mongo(entry.dict())
-            await db.accounting_entries.insert_one(entry_dict)
-            
     except Exception as e:
         print(f"Erreur génération écritures comptables: {e}")
         # Continue even if accounting fails
+        entries = []
+    
+    return invoice, entries
+
+async def create_invoice_from_order(order: Order, client: dict, loaders: Loaders):
+    invoice_number = await generate_invoice_number()
+    # Settings and vehicles details for items, the vehicles in a single query
+    settings, vehicles = await asyncio.gather(
+        loaders.settings(),
+        loaders.vehicles.load_many(item.vehicle_id for item in order.items)
+    )
+    invoice, entries = build_invoice(order, invoice_number, client, settings, vehicles)
+    
+    invoice_dict = prepare_for_mongo(invoice.dict(), Invoice)
+    await db.invoices.insert_one(invoice_dict)
+    dashboard_cache.invalidate()
+    
+    # Save accounting entries to database
+    if entries:
+        try:
+            await db.accounting_entries.insert_many(
+                [prepare_for_mongo(entry.dict(), AccountingEntry) for entry in entries]
+            )
+        except Exception as e:
+            print(f"Erreur génération écritures comptables: {e}")
 
 @api_router.get("/orders", response_model=List[Order])
-async def get_orders(current_user: User = Depends(get_current_user)):
-    orders = await db.orders.find().to_list(1000)
-    return [Order(**parse_from_mongo(order)) for order in orders]
+async def get_orders(
+    response: Response,
+    page: PageParams = Depends(),
+    status: Optional[str] = None,
+    client_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = period_filter("created_at", start_date, end_date)
+    if status:
+        query["status"] = status
+    if client_id:
+        query["client_id"] = client_id
+    if vehicle_id:
+        query["items.vehicle_id"] = vehicle_id
+    orders = await paginate(
+        db.orders, query, page, response,
+        allowed_sorts={"created_at", "order_number", "grand_total"},
+        date_sorts={"created_at"}
+    )
+    return [Order(**parse_from_mongo(order, Order)) for order in orders]
 
 @api_router.put("/orders/{order_id}", response_model=Order)
-async def update_order(order_id: str, order_data: OrderCreate, current_user: User = Depends(get_current_user)):
+async def update_order(
+    order_id: str,
+    order_data: OrderCreate,
+    current_user: User = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
     existing_order = await db.orders.find_one({"id": order_id})
     if not existing_order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -626,15 +912,30 @@ async def update_order(order_id: str, order_data: OrderCreate, current_user: Use
         deposit_vat=deposit_vat,
         grand_total=grand_total,
         status=existing_order['status'],
-        created_at=datetime.fromisoformat(existing_order['created_at']),
+        renewed_from=existing_order.get('renewed_from'),
+        renewal_key=existing_order.get('renewal_key'),
+        created_at=to_datetime(existing_order['created_at']),
         created_by=existing_order['created_by']
     )
     
-    order_dict = prepare_for_mongo(updated_order.dict())
-    await db.orders.replace_one({"id": order_id}, order_dict)
+    order_dict = prepare_for_mongo(updated_order.dict(), Order)
+    await reserve_vehicles(updated_order, lambda: db.orders.replace_one({"id": order_id}, order_dict), loaders)
     
     return updated_order
 
+@api_router.put("/orders/{order_id}/cancel", response_model=Order)
+async def cancel_order(order_id: str, current_user: User = Depends(get_current_user)):
+    """Annuler une commande, ses véhicules redeviennent disponibles"""
+    order = await db.orders.find_one_and_update(
+        {"id": order_id}, {"$set": {"status": "cancelled"}},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    booking_index.unregister(order_id)
+    dashboard_cache.invalidate()
+    return Order(**parse_from_mongo(order, Order))
+
 class OrderRenewalUpdate(BaseModel):
     is_renewable: bool
     rental_period: Optional[str] = None
@@ -683,18 +984,54 @@ async def update_order_renewal_settings(
 
 # Invoice endpoints
 @api_router.get("/invoices", response_model=List[Invoice])
-async def get_invoices(current_user: User = Depends(get_current_user)):
-    invoices = await db.invoices.find().to_list(1000)
-    return [Invoice(**parse_from_mongo(invoice)) for invoice in invoices]
+async def get_invoices(
+    response: Response,
+    page: PageParams = Depends(),
+    status: Optional[InvoiceStatus] = None,
+    client_id: Optional[str] = None,
+    order_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = period_filter("invoice_date", start_date, end_date)
+    if status:
+        query["status"] = status.value
+    if client_id:
+        query["client_id"] = client_id
+    if order_id:
+        query["order_id"] = order_id
+    if vehicle_id:
+        query["items.vehicle_id"] = vehicle_id
+    invoices = await paginate(
+        db.invoices, query, page, response,
+        allowed_sorts={"created_at", "invoice_date", "due_date", "invoice_number", "grand_total"},
+        projection=INVOICE_SUMMARY_PROJECTION,
+        date_sorts={"created_at", "invoice_date", "due_date"}
+    )
+    return [Invoice(**parse_from_mongo(invoice, Invoice)) for invoice in invoices]
 
 @api_router.get("/invoices/overdue", response_model=List[Invoice])
-async def get_overdue_invoices(current_user: User = Depends(get_current_user)):
-    today = datetime.now(timezone.utc)
-    invoices = await db.invoices.find({
-        "due_date": {"$lt": today.isoformat()},
-        "status": {"$in": ["sent", "overdue"]}
-    }).to_list(1000)
-    return [Invoice(**parse_from_mongo(invoice)) for invoice in invoices]
+async def get_overdue_invoices(
+    response: Response,
+    page: PageParams = Depends(),
+    bucket: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = {"status": "overdue"}
+    if bucket:
+        if bucket not in {label for label, _ in OVERDUE_BUCKETS}:
+            raise HTTPException(status_code=400, detail=f"Unknown overdue bucket: {bucket}")
+        query["overdue_bucket"] = bucket
+    invoices = await paginate(
+        db.invoices, query, page, response,
+        allowed_sorts={"due_date", "created_at", "grand_total"},
+        default_sort="due_date",
+        projection=INVOICE_SUMMARY_PROJECTION,
+        date_sorts={"due_date", "created_at"}
+    )
+    return [Invoice(**parse_from_mongo(invoice, Invoice)) for invoice in invoices]
 
 @api_router.put("/invoices/{invoice_id}/mark-paid")
 async def mark_invoice_paid_legacy(invoice_id: str, current_user: User = Depends(get_current_user)):
@@ -712,10 +1049,11 @@ async def mark_invoice_paid_legacy(invoice_id: str, current_user: User = Depends
     payment_date = datetime.now(timezone.utc)
     result = await db.invoices.update_one(
         {"id": invoice_id},
-        {"$set": {"status": "paid", "payment_date": payment_date.isoformat()}}
+        {"$set": {"status": "paid", "payment_date": payment_date}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    dashboard_cache.invalidate()
     
     # Generate accounting entries for payment
     try:
@@ -732,7 +1070,7 @@ async def mark_invoice_paid_legacy(invoice_id: str, current_user: User = Depends
         
         # Save accounting entries to database
         for entry in payment_entries:
-            entry_dict = prepare_for_mongo(entry.dict())
+            entry_dict = prepare_for_mongo(entry.dict(), AccountingEntry)
             await db.accounting_entries.insert_one(entry_dict)
         
     except Exception as e:
@@ -747,31 +1085,88 @@ class PaymentCreate(BaseModel):
     reference: Optional[str] = None
     notes: Optional[str] = None
 
-@api_router.post("/invoices/{invoice_id}/payments", response_model=Payment)
-async def add_payment(
-    invoice_id: str,
-    payment_data: PaymentCreate,
-    current_user: User = Depends(get_current_user)
-):
-    # Get invoice
-    invoice = await db.invoices.find_one({"id": invoice_id})
-    if not invoice:
-        raise HTTPException(status_code=404, detail="Invoice not found")
-    
-    # Validate payment amount
-    current_paid = invoice.get('amount_paid', 0)
+# Half a cent, absorbs the float rounding of accumulated amounts
+PAYMENT_TOLERANCE = 0.005
+INVOICE_BALANCE_PROJECTION = {
+    "_id": 0, "id": 1, "status": 1, "grand_total": 1, "total_ttc": 1, "amount_paid": 1, "due_date": 1,
+    "overdue_since": 1
+}
+
+def invoice_balance_update(invoice: dict) -> UpdateOne:
+    """Derive the remaining amount and status from amount_paid.
+
+    An unpaid invoice past its due date goes overdue right away, as the
+    invoice_overdue job would, instead of waiting for its next run;
+    drafts without payments stay drafts.
+    The update only matches the amount_paid value it was computed from:
+    when payments race, the request that produced the current value is
+    the one that writes them.
+    """
     total_amount = invoice.get('grand_total', invoice.get('total_ttc', 0))
+    amount_paid = invoice.get('amount_paid', 0)
+    update_data = {"remaining_amount": round(total_amount - amount_paid, 2)}
+    update = {"$set": update_data}
+    now = datetime.now(timezone.utc)
+    due_date = to_datetime(invoice.get("due_date"))
+    # A payment means the invoice reached the client
+    issued = invoice.get("status", "draft") != "draft" or amount_paid > PAYMENT_TOLERANCE
+    
+    if total_amount - amount_paid <= PAYMENT_TOLERANCE:
+        update_data["status"] = "paid"
+        update["$unset"] = {"overdue_bucket": ""}
+    elif issued and (invoice.get("overdue_since") or (due_date and due_date < now)):
+        # Still past due, a partial payment does not end the delay
+        update_data["status"] = "overdue"
+        if not invoice.get("overdue_since"):
+            update_data["overdue_since"] = now
+        if due_date:
+            update_data["overdue_bucket"] = overdue_bucket(due_date, now)
+    elif amount_paid > PAYMENT_TOLERANCE:
+        update_data["status"] = "partially_paid"
+    else:
+        update_data["status"] = "draft"
+    if amount_paid <= PAYMENT_TOLERANCE:
+        update_data["payment_date"] = None
     
+    return UpdateOne({"id": invoice["id"], "amount_paid": amount_paid}, update)
+
+def payment_fits(amount: float) -> dict:
+    """Filter matching invoices whose remaining balance can take the amount"""
+    return {"$expr": {"$lte": [
+        {"$add": [{"$ifNull": ["$amount_paid", 0]}, amount]},
+        {"$add": [INVOICE_TOTAL_EXPR, PAYMENT_TOLERANCE]}
+    ]}}
+
+async def sync_invoice_balance(invoice: dict) -> None:
+    await db.invoices.bulk_write([invoice_balance_update(invoice)])
+
+def replayed_payment(existing: dict, invoice_id: str) -> Payment:
+    if existing["invoice_id"] != invoice_id:
+        raise HTTPException(status_code=409, detail="Idempotency key already used for another invoice")
+    return Payment(**parse_from_mongo(existing, Payment))
+
+async def record_payment(
+    invoice_id: str,
+    payment_data: PaymentCreate,
+    created_by: str,
+    idempotency_key: Optional[str] = None
+) -> Payment:
+    """Record a payment and apply it to its invoice atomically.
+
+    The invoice is updated with a single find_one_and_update whose filter
+    refuses overpayments, so concurrent payments can neither be lost nor
+    exceed the invoice total. A payment whose idempotency key was already
+    recorded is returned as is.
+    """
     if payment_data.amount <= 0:
         raise HTTPException(status_code=400, detail="Payment amount must be positive")
     
-    if current_paid + payment_data.amount > total_amount:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Payment amount exceeds remaining balance. Remaining: {total_amount - current_paid:.2f}€"
-        )
+    if idempotency_key:
+        existing = await db.payments.find_one({"idempotency_key": idempotency_key}, {"_id": 0})
+        if existing:
+            return replayed_payment(existing, invoice_id)
     
-    # Create payment record
+    # Create payment record, the unique idempotency key index rejects replays racing with this one
     payment = Payment(
         invoice_id=invoice_id,
         amount=payment_data.amount,
@@ -779,41 +1174,64 @@ async def add_payment(
         payment_method=payment_data.payment_method,
         reference=payment_data.reference,
         notes=payment_data.notes,
-        created_by=current_user.id
+        idempotency_key=idempotency_key,
+        created_by=created_by
     )
-    
-    payment_dict = prepare_for_mongo(payment.dict())
-    await db.payments.insert_one(payment_dict)
-    
-    # Update invoice
-    new_amount_paid = current_paid + payment_data.amount
-    new_remaining = total_amount - new_amount_paid
-    
-    update_data = {
-        "amount_paid": new_amount_paid,
-        "remaining_amount": new_remaining,
-        "payment_date": payment_data.payment_date.isoformat()
-    }
-    
-    # Update status based on remaining amount
-    if new_remaining <= 0:
-        update_data["status"] = "paid"
-    elif new_amount_paid > 0:
-        update_data["status"] = "partially_paid"
-    
-    await db.invoices.update_one(
-        {"id": invoice_id},
-        {"$set": update_data}
+    for attempt in range(2):
+        try:
+            await db.payments.insert_one(prepare_for_mongo(payment.dict(), Payment))
+            break
+        except DuplicateKeyError:
+            existing = await db.payments.find_one({"idempotency_key": idempotency_key}, {"_id": 0})
+            if existing:
+                return replayed_payment(existing, invoice_id)
+            # The racing payment got refused and removed in between, the key is free again
+    else:
+        raise HTTPException(status_code=409, detail="A payment with this idempotency key is being recorded")
+    
+    # Update invoice unless the payment exceeds the remaining balance
+    invoice = await db.invoices.find_one_and_update(
+        {"id": invoice_id, **payment_fits(payment_data.amount)},
+        {"$inc": {"amount_paid": payment_data.amount}, "$max": {"payment_date": payment.payment_date}},
+        projection=INVOICE_BALANCE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
+    if invoice is None:
+        await db.payments.delete_one({"id": payment.id})
+        current = await db.invoices.find_one({"id": invoice_id}, INVOICE_BALANCE_PROJECTION)
+        if not current:
+            raise HTTPException(status_code=404, detail="Invoice not found")
+        remaining = current.get('grand_total', current.get('total_ttc', 0)) - current.get('amount_paid', 0)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Payment amount exceeds remaining balance. Remaining: {remaining:.2f}€"
+        )
     
+    await sync_invoice_balance(invoice)
+    dashboard_cache.invalidate()
     return payment
 
+@api_router.post("/invoices/{invoice_id}/payments", response_model=Payment)
+async def add_payment(
+    invoice_id: str,
+    payment_data: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    return await record_payment(invoice_id, payment_data, current_user.id, idempotency_key)
+
 @api_router.get("/invoices/{invoice_id}/payments", response_model=List[Payment])
 async def get_invoice_payments(
     invoice_id: str, 
+    response: Response,
+    page: PageParams = Depends(),
     current_user: User = Depends(get_current_user)
 ):
-    payments = await db.payments.find({"invoice_id": invoice_id}).to_list(length=None)
+    payments = await paginate(
+        db.payments, {"invoice_id": invoice_id}, page, response,
+        allowed_sorts={"created_at", "payment_date", "amount"},
+        date_sorts={"created_at", "payment_date"}
+    )
     return [Payment(**payment) for payment in payments]
 
 @api_router.delete("/payments/{payment_id}")
@@ -821,43 +1239,21 @@ async def delete_payment(
     payment_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    # Get payment
-    payment = await db.payments.find_one({"id": payment_id})
+    # Deleting the payment is the guard: only the request that removed it
+    # reverts it, a concurrent delete cannot revert it twice
+    payment = await db.payments.find_one_and_delete({"id": payment_id})
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
-    
-    # Get invoice
-    invoice = await db.invoices.find_one({"id": payment["invoice_id"]})
-    if not invoice:
-        raise HTTPException(status_code=404, detail="Invoice not found")
-    
-    # Update invoice amounts
-    current_paid = invoice.get('amount_paid', 0)
-    total_amount = invoice.get('grand_total', invoice.get('total_ttc', 0))
-    
-    new_amount_paid = max(0, current_paid - payment["amount"])
-    new_remaining = total_amount - new_amount_paid
-    
-    update_data = {
-        "amount_paid": new_amount_paid,
-        "remaining_amount": new_remaining
-    }
-    
-    # Update status
-    if new_remaining >= total_amount:
-        update_data["status"] = "draft"
-        update_data["payment_date"] = None
-    elif new_amount_paid > 0:
-        update_data["status"] = "partially_paid"
-    else:
-        update_data["status"] = "sent"
-    
-    # Delete payment and update invoice
-    await db.payments.delete_one({"id": payment_id})
-    await db.invoices.update_one(
+    invoice = await db.invoices.find_one_and_update(
         {"id": payment["invoice_id"]},
-        {"$set": update_data}
+        {"$inc": {"amount_paid": -payment["amount"]}},
+        projection=INVOICE_BALANCE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
+    # The invoice may have been deleted meanwhile, nothing is left to revert
+    if invoice:
+        await sync_invoice_balance(invoice)
+    dashboard_cache.invalidate()
     
     return {"message": "Payment deleted successfully"}
 
@@ -884,32 +1280,289 @@ async def mark_invoice_paid(
             payment_method="bank",
             notes="Full payment (legacy endpoint)"
         )
-        await add_payment(invoice_id, payment_data, current_user)
+        await record_payment(invoice_id, payment_data, current_user.id)
     
     return {"message": "Invoice marked as paid"}
 
-# PDF Generation endpoints
-@api_router.post("/invoices/{invoice_id}/generate-pdf")
-async def generate_invoice_pdf(invoice_id: str, current_user: User = Depends(get_current_user)):
-    # Get invoice
-    invoice = await db.invoices.find_one({"id": invoice_id})
-    if not invoice:
-        raise HTTPException(status_code=404, detail="Invoice not found")
-    
-    # Get client
-    client = await db.clients.find_one({"id": invoice['client_id']})
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
+# Bank statement import
+BANK_IMPORT_BATCH_SIZE = int(os.environ.get('BANK_IMPORT_BATCH_SIZE', '500'))
+
+class PaymentReview(BaseModel):
+    """Statement line that could not be matched to an invoice with certainty"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    import_id: str
+    line_id: str
+    booking_date: datetime
+    amount: float
+    label: str = ""
+    counterparty: str = ""
+    bank_reference: Optional[str] = None
+    reason: str  # exceeds_remaining, several_invoices, several_candidates, amount_only, no_candidate
+    candidate_invoice_ids: List[str] = []
+    status: str = "pending"  # pending, matched, dismissed
+    payment_id: Optional[str] = None
+    resolved_by: Optional[str] = None
+    resolved_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class PaymentReviewResolve(BaseModel):
+    invoice_id: Optional[str] = None  # None dismisses the line
+
+def bank_payment(line: StatementLine, invoice_id: str, amount: float, position: int, created_by: str) -> Payment:
+    # The first allocation of a line carries the line id, so a statement imported twice is detected
+    suffix = f"/{position}" if position else ""
+    return Payment(
+        invoice_id=invoice_id,
+        amount=amount,
+        payment_date=datetime.combine(line.booking_date, datetime.min.time(), tzinfo=timezone.utc),
+        payment_method="bank",
+        reference=line.bank_reference,
+        notes=line.label or None,
+        idempotency_key=f"bank:{line.line_id}{suffix}",
+        created_by=created_by
+    )
+
+def payment_review(import_id: str, line: StatementLine, line_id: str, amount: float, reason: str, candidates: List[str]) -> dict:
+    review = PaymentReview(
+        import_id=import_id,
+        line_id=line_id,
+        booking_date=datetime.combine(line.booking_date, datetime.min.time(), tzinfo=timezone.utc),
+        amount=amount,
+        label=line.label,
+        counterparty=line.counterparty,
+        bank_reference=line.bank_reference,
+        reason=reason,
+        candidate_invoice_ids=candidates
+    )
+    return prepare_for_mongo(review.dict(), PaymentReview)
+
+async def load_invoice_matcher() -> InvoiceMatcher:
+    invoices, clients = await asyncio.gather(
+        db.invoices.aggregate([
+            {"$match": {"status": {"$nin": ["paid", "cancelled"]}}},
+            {"$project": {
+                "_id": 0, "id": 1, "invoice_number": 1, "client_id": 1,
+                "remaining_amount": {"$subtract": [INVOICE_TOTAL_EXPR, {"$ifNull": ["$amount_paid", 0]}]}
+            }}
+        ]).to_list(None),
+        db.clients.find({}, {"_id": 0, "id": 1, "company_name": 1, "contact_name": 1}).to_list(None)
+    )
+    return InvoiceMatcher(invoices, clients)
+
+async def imported_line_ids(line_ids: List[str]) -> set:
+    """Lines of earlier imports, paid or waiting in the review queue"""
+    imported = set()
+    for start in range(0, len(line_ids), BANK_IMPORT_BATCH_SIZE):
+        batch = line_ids[start:start + BANK_IMPORT_BATCH_SIZE]
+        payments, reviews = await asyncio.gather(
+            db.payments.find(
+                {"idempotency_key": {"$in": [f"bank:{line_id}" for line_id in batch]}},
+                {"_id": 0, "idempotency_key": 1}
+            ).to_list(None),
+            db.payment_reviews.find({"line_id": {"$in": batch}}, {"_id": 0, "line_id": 1}).to_list(None)
+        )
+        imported.update(payment["idempotency_key"][len("bank:"):] for payment in payments)
+        imported.update(review["line_id"] for review in reviews)
+    return imported
+
+async def apply_bank_payments(import_id: str, payments: List[Payment]) -> Tuple[List[Payment], List[Payment]]:
+    """Write a batch of payments and apply them to their invoices in bulk.
+
+    Each invoice gets the sum of its payments with the same overpayment
+    guard as record_payment. Invoices that took them are tagged with the
+    import id, which tells them apart from those whose balance changed in
+    the meantime: the payments of the latter are removed and returned as
+    rejected. Payments already recorded (idempotency key) are dropped.
+    """
+    try:
+        await db.payments.insert_many(
+            [prepare_for_mongo(payment.dict(), Payment) for payment in payments], ordered=False
+        )
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        if any(error["code"] != 11000 for error in errors):
+            raise
+        duplicated = {error["index"] for error in errors}
+        payments = [payment for index, payment in enumerate(payments) if index not in duplicated]
+    
+    by_invoice: Dict[str, List[Payment]] = {}
+    for payment in payments:
+        by_invoice.setdefault(payment.invoice_id, []).append(payment)
+    if not by_invoice:
+        return [], []
+    
+    await db.invoices.bulk_write([
+        UpdateOne(
+            {"id": invoice_id, **payment_fits(sum(payment.amount for payment in invoice_payments))},
+            {
+                "$inc": {"amount_paid": sum(payment.amount for payment in invoice_payments)},
+                "$max": {"payment_date": max(payment.payment_date for payment in invoice_payments)},
+                "$addToSet": {"bank_imports": import_id}
+            }
+        )
+        for invoice_id, invoice_payments in by_invoice.items()
+    ], ordered=False)
+    
+    invoices = await db.invoices.find(
+        {"id": {"$in": list(by_invoice)}}, {**INVOICE_BALANCE_PROJECTION, "bank_imports": 1}
+    ).to_list(None)
+    applied = [invoice for invoice in invoices if import_id in (invoice.get("bank_imports") or [])]
+    if applied:
+        await db.invoices.bulk_write([invoice_balance_update(invoice) for invoice in applied], ordered=False)
+    
+    applied_ids = {invoice["id"] for invoice in applied}
+    rejected = [payment for payment in payments if payment.invoice_id not in applied_ids]
+    if rejected:
+        await db.payments.delete_many({"id": {"$in": [payment.id for payment in rejected]}})
+    return [payment for payment in payments if payment.invoice_id in applied_ids], rejected
+
+@api_router.post("/payments/import")
+async def import_bank_statement(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """Reconcile a CSV or CAMT.053 bank statement with the open invoices.
+
+    Credit lines quoting an invoice number, or whose amount is the balance
+    of a single open invoice of the client named on the line, become
+    payments; the other ones go to the review queue. Lines of a statement
+    already imported are skipped.
+    """
+    started = time.perf_counter()
+    statement = BankStatement(file.file, file.filename)
+    try:
+        # Parsing and matching are CPU bound, keep them off the event loop
+        lines, matcher = await asyncio.gather(asyncio.to_thread(list, statement), load_invoice_matcher())
+    except StatementError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    imported = await imported_line_ids([line.line_id for line in lines])
+    results = await asyncio.to_thread(reconcile, [line for line in lines if line.line_id not in imported], matcher)
+    
+    import_id = str(uuid.uuid4())
+    lines_by_key: Dict[str, StatementLine] = {}
+    payments_by_invoice: Dict[str, List[Payment]] = {}
+    reviews = []
+    for line, match in results:
+        for position, (invoice_id, amount) in enumerate(match.allocations):
+            payment = bank_payment(line, invoice_id, amount, position, current_user.id)
+            lines_by_key[payment.idempotency_key] = line
+            payments_by_invoice.setdefault(invoice_id, []).append(payment)
+        if not match.allocations:
+            reviews.append(payment_review(import_id, line, line.line_id, line.amount, match.reason, match.candidates))
+    
+    applied_payments = []
+    invoice_ids = list(payments_by_invoice)
+    for start in range(0, len(invoice_ids), BANK_IMPORT_BATCH_SIZE):
+        batch = [payment for invoice_id in invoice_ids[start:start + BANK_IMPORT_BATCH_SIZE]
+                 for payment in payments_by_invoice[invoice_id]]
+        applied, rejected = await apply_bank_payments(import_id, batch)
+        applied_payments.extend(applied)
+        reviews.extend(
+            payment_review(
+                import_id, lines_by_key[payment.idempotency_key], payment.idempotency_key[len("bank:"):],
+                payment.amount, "exceeds_remaining", [payment.invoice_id]
+            )
+            for payment in rejected
+        )
+    if applied_payments:
+        dashboard_cache.invalidate()
     
-    # Get company settings
-    settings = await db.settings.find_one()
-    if not settings:
-        settings = {}
+    if reviews:
+        try:
+            await db.payment_reviews.insert_many(reviews, ordered=False)
+        except BulkWriteError as e:
+            # Lines queued by a concurrent import of the same statement
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+    
+    summary = {
+        "id": import_id,
+        "filename": file.filename,
+        "imported_by": current_user.id,
+        "imported_at": datetime.now(timezone.utc),
+        "lines": len(lines),
+        "credits": len(results),
+        "already_imported": len(imported),
+        "invalid_rows": statement.invalid_rows,
+        "payments": len(applied_payments),
+        "amount_matched": round(sum(payment.amount for payment in applied_payments), 2),
+        "review": len(reviews),
+        "duration_ms": round((time.perf_counter() - started) * 1000)
+    }
+    await db.bank_imports.insert_one(dict(summary))
+    logger.info(
+        f"Bank statement {file.filename}: {summary['payments']} payments, "
+        f"{summary['review']} lines to review in {summary['duration_ms']} ms"
+    )
+    return summary
+
+@api_router.get("/payments/reviews", response_model=List[PaymentReview])
+async def get_payment_reviews(
+    response: Response,
+    page: PageParams = Depends(),
+    status: str = "pending",
+    import_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = {"status": status}
+    if import_id:
+        query["import_id"] = import_id
+    reviews = await paginate(
+        db.payment_reviews, query, page, response,
+        allowed_sorts={"created_at", "booking_date", "amount"}
+    )
+    return [PaymentReview(**parse_from_mongo(review, PaymentReview)) for review in reviews]
+
+@api_router.post("/payments/reviews/{review_id}/resolve", response_model=PaymentReview)
+async def resolve_payment_review(
+    review_id: str,
+    resolution: PaymentReviewResolve,
+    current_user: User = Depends(get_current_user)
+):
+    """Book a queued line on the chosen invoice, or dismiss it"""
+    review = await db.payment_reviews.find_one({"id": review_id}, {"_id": 0})
+    if not review:
+        raise HTTPException(status_code=404, detail="Payment review not found")
+    if review["status"] != "pending":
+        raise HTTPException(status_code=409, detail="Payment review already resolved")
+    
+    update_data = {"resolved_by": current_user.id, "resolved_at": datetime.now(timezone.utc)}
+    if resolution.invoice_id:
+        payment = await record_payment(
+            resolution.invoice_id,
+            PaymentCreate(
+                amount=review["amount"],
+                payment_date=review["booking_date"],
+                payment_method="bank",
+                reference=review.get("bank_reference"),
+                notes=review.get("label") or None
+            ),
+            current_user.id,
+            idempotency_key=f"bank:{review['line_id']}"
+        )
+        update_data.update(status="matched", payment_id=payment.id)
+    else:
+        update_data["status"] = "dismissed"
     
-    # Get vehicles details for items
+    review = await db.payment_reviews.find_one_and_update(
+        {"id": review_id, "status": "pending"},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not review:
+        raise HTTPException(status_code=409, detail="Payment review already resolved")
+    return PaymentReview(**parse_from_mongo(review, PaymentReview))
+
+# PDF Generation endpoints
+def invoice_pdf_payload(
+    invoice: dict, client: dict, settings: dict, vehicles: Dict[str, dict], clauses: Dict[str, str]
+) -> dict:
+    """Rendering payload of an invoice, vehicles by id"""
     items_details = []
     for item in invoice['items']:
-        vehicle = await db.vehicles.find_one({"id": item['vehicle_id']})
+        vehicle = vehicles.get(item['vehicle_id'])
         if vehicle:
             item_detail = {
                 **item,
@@ -918,66 +1571,342 @@ async def generate_invoice_pdf(invoice_id: str, current_user: User = Depends(get
                 'license_plate': vehicle.get('license_plate', '')
             }
             items_details.append(item_detail)
+    return build_pdf_payload(invoice, client, settings, items_details, invoice_payment_terms(invoice, clauses))
+
+async def cached_invoice_pdf(invoice: dict, pdf_hash: str) -> Optional[bytes]:
+    """Stored PDF of the invoice if it was rendered from the same inputs"""
+    if invoice.get('pdf_hash') != pdf_hash or not invoice.get('pdf_blob_id'):
+        return None
+    return await asyncio.to_thread(pdf_store.get, invoice['pdf_blob_id'])
+
+async def mark_invoice_pdfs_stale(query: dict) -> None:
+    """Flag the generated PDFs of the matching invoices as out of date"""
+    await db.invoices.update_many(
+        {**query, "pdf_blob_id": {"$ne": None}, "pdf_stale": {"$ne": True}}, {"$set": {"pdf_stale": True}}
+    )
+
+@api_router.post("/invoices/{invoice_id}/generate-pdf")
+async def generate_invoice_pdf(
+    invoice_id: str,
+    current_user: User = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    # Get invoice
+    invoice = await loaders.invoices.load(invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    # Get client, company settings and vehicles details concurrently
+    client, settings, vehicles = await asyncio.gather(
+        loaders.clients.load(invoice['client_id']),
+        loaders.settings(),
+        loaders.vehicles.load_many(item['vehicle_id'] for item in invoice['items'])
+    )
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
     
     try:
-        # Generate PDF
-        pdf_data = await pdf_generator.generate_invoice_pdf(
-            invoice_data=invoice,
-            client_data=client,
-            company_settings=settings,
-            items_details=items_details
+        # Generate PDF in a worker process
+        payload = invoice_pdf_payload(
+            invoice, client, settings,
+            {vehicle['id']: vehicle for vehicle in vehicles if vehicle},
+            await payment_terms_service.clauses(db)
         )
-        
-        # Save PDF to invoice
+        pdf_hash = pdf_payload_hash(payload)
+        pdf_bytes = await cached_invoice_pdf(invoice, pdf_hash)
+        cached = pdf_bytes is not None
+        if cached:
+            pdf_blob_id = invoice['pdf_blob_id']
+        else:
+            pdf_bytes = await pdf_renderer.render(payload)
+            # Store the PDF outside of the invoice document
+            pdf_blob_id = await asyncio.to_thread(pdf_store.put, pdf_bytes)
         await db.invoices.update_one(
             {"id": invoice_id},
-            {"$set": {"pdf_data": pdf_data, "status": "sent"}}
+            {"$set": {"pdf_blob_id": pdf_blob_id, "pdf_hash": pdf_hash, "pdf_stale": False}, "$unset": {"pdf_data": ""}}
         )
+        # Only a draft becomes sent, paid or overdue invoices keep their status
+        await db.invoices.update_one({"id": invoice_id, "status": "draft"}, {"$set": {"status": "sent"}})
+        dashboard_cache.invalidate()
         
         return {
             "message": "PDF generated successfully",
-            "pdf_data": pdf_data
+            "pdf_blob_id": pdf_blob_id,
+            "cached": cached,
+            "pdf_data": base64.b64encode(pdf_bytes).decode('utf-8')
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Erreur génération PDF: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
+# Batch PDF generation
+PDF_BATCH_MAX_INVOICES = int(os.environ.get('PDF_BATCH_MAX_INVOICES', '1000'))
+PDF_BATCH_WRITE_SIZE = 100
+
+class InvoicePdfBatch(BaseModel):
+    invoice_ids: Optional[List[str]] = None
+    start_date: Optional[datetime] = None  # invoice_date period
+    end_date: Optional[datetime] = None
+    client_id: Optional[str] = None
+    status: Optional[InvoiceStatus] = None
+
+async def save_invoice_pdfs(pdfs: Dict[str, dict]) -> None:
+    """Attach generated PDFs (pdf_blob_id and pdf_hash by invoice id) to their invoices, drafts become sent"""
+    if not pdfs:
+        return
+    await db.invoices.bulk_write([
+        UpdateOne({"id": invoice_id}, {"$set": {**pdf, "pdf_stale": False}, "$unset": {"pdf_data": ""}})
+        for invoice_id, pdf in pdfs.items()
+    ], ordered=False)
+    await db.invoices.update_many(
+        {"id": {"$in": list(pdfs)}, "status": "draft"}, {"$set": {"status": "sent"}}
+    )
+    dashboard_cache.invalidate()
+
+@api_router.post("/invoices/pdf-batch")
+async def generate_invoice_pdf_batch(batch: InvoicePdfBatch, current_user: User = Depends(get_current_user)):
+    """Generate the PDFs of the selected invoices, streamed back as a ZIP archive.
+
+    Invoices are selected by ids and/or by period, client and status, and
+    everything the PDFs need is read upfront in one query per collection.
+    Renderings run on the PDF worker processes a few at a time, in invoice
+    number order, and each PDF is sent as soon as it is ready. Failures do
+    not stop the batch, they are listed in the manifest.json entry that
+    closes the archive.
+    """
+    query = period_filter("invoice_date", batch.start_date, batch.end_date)
+    if batch.invoice_ids is not None:
+        query["id"] = {"$in": batch.invoice_ids}
+    if batch.client_id:
+        query["client_id"] = batch.client_id
+    if batch.status:
+        query["status"] = batch.status.value
+    if not query:
+        raise HTTPException(status_code=400, detail="Select invoices by ids, period, client or status")
+    
+    invoices = await db.invoices.find(query, {"_id": 0, "pdf_data": 0}).sort("invoice_number", 1).to_list(
+        length=PDF_BATCH_MAX_INVOICES + 1
+    )
+    if not invoices:
+        raise HTTPException(status_code=404, detail="No invoice matches the selection")
+    if len(invoices) > PDF_BATCH_MAX_INVOICES:
+        raise HTTPException(
+            status_code=400, detail=f"More than {PDF_BATCH_MAX_INVOICES} invoices selected, narrow the selection"
+        )
+    
+    client_ids = list({invoice['client_id'] for invoice in invoices})
+    vehicle_ids = list({item['vehicle_id'] for invoice in invoices for item in invoice['items']})
+    clients, vehicles, settings, clauses = await asyncio.gather(
+        db.clients.find(
+            {"id": {"$in": client_ids}}, {"_id": 0, "id": 1, **dict.fromkeys(PDF_CLIENT_FIELDS, 1)}
+        ).to_list(length=None),
+        db.vehicles.find(
+            {"id": {"$in": vehicle_ids}}, {"_id": 0, "id": 1, **dict.fromkeys(PDF_VEHICLE_FIELDS, 1)}
+        ).to_list(length=None),
+        db.settings.find_one({}, {"_id": 0}),
+        payment_terms_service.clauses(db)
+    )
+    clients_by_id = {client['id']: client for client in clients}
+    vehicles_by_id = {vehicle['id']: vehicle for vehicle in vehicles}
+    selected_ids = {invoice['id'] for invoice in invoices}
+    not_found = [
+        {"invoice_id": invoice_id, "invoice_number": None, "error": "Invoice not found"}
+        for invoice_id in dict.fromkeys(batch.invoice_ids or []) if invoice_id not in selected_ids
+    ]
+    
+    async def render(invoice: dict) -> Tuple[bytes, dict, bool]:
+        """PDF bytes, pdf_blob_id and pdf_hash, and whether the stored PDF was reused"""
+        client = clients_by_id.get(invoice['client_id'])
+        if not client:
+            raise ValueError("Client not found")
+        payload = invoice_pdf_payload(invoice, client, settings or {}, vehicles_by_id, clauses)
+        pdf_hash = pdf_payload_hash(payload)
+        pdf_bytes = await cached_invoice_pdf(invoice, pdf_hash)
+        if pdf_bytes is not None:
+            return pdf_bytes, {"pdf_blob_id": invoice['pdf_blob_id'], "pdf_hash": pdf_hash}, True
+        pdf_bytes = await pdf_renderer.render(payload)
+        pdf_blob_id = await asyncio.to_thread(pdf_store.put, pdf_bytes)
+        return pdf_bytes, {"pdf_blob_id": pdf_blob_id, "pdf_hash": pdf_hash}, False
+    
+    async def archive():
+        stream = ZipStream()
+        # Enough renderings in flight to keep every worker busy
+        window = max(1, pdf_renderer.max_workers) * 2
+        in_flight = []
+        manifest = {"generated": [], "failed": list(not_found)}
+        pdfs = {}
+        
+        def entry(invoice: dict, rendering: asyncio.Future) -> bytes:
+            summary = {"invoice_id": invoice['id'], "invoice_number": invoice.get('invoice_number')}
+            try:
+                pdf_bytes, pdfs[invoice['id']], cached = rendering.result()
+            except Exception as e:
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.warning(f"PDF of invoice {invoice['id']} not generated: {error}")
+                manifest["failed"].append({**summary, "error": error})
+                return b""
+            filename = f"{(invoice.get('invoice_number') or invoice['id']).replace('/', '-')}.pdf"
+            manifest["generated"].append({**summary, "file": filename, "cached": cached})
+            return stream.add(filename, pdf_bytes)
+        
+        try:
+            for invoice in invoices:
+                in_flight.append((invoice, asyncio.ensure_future(render(invoice))))
+                if len(in_flight) < window:
+                    continue
+                invoice, rendering = in_flight.pop(0)
+                await asyncio.wait([rendering])
+                yield entry(invoice, rendering)
+                if len(pdfs) >= PDF_BATCH_WRITE_SIZE:
+                    await save_invoice_pdfs(pdfs)
+                    pdfs.clear()
+            for invoice, rendering in in_flight:
+                await asyncio.wait([rendering])
+                yield entry(invoice, rendering)
+            in_flight = []
+            await save_invoice_pdfs(pdfs)
+            pdfs.clear()
+            
+            manifest = {
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "invoices": len(invoices),
+                **manifest
+            }
+            yield stream.add("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+            yield stream.close()
+        finally:
+            # Client gone: drop the renderings not started yet, keep the PDFs already sent
+            for _, rendering in in_flight:
+                rendering.cancel()
+            if pdfs:
+                await asyncio.shield(save_invoice_pdfs(pdfs))
+    
+    return StreamingResponse(
+        archive(),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=factures_{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.zip",
+            "X-Invoice-Count": str(len(invoices))
+        }
+    )
+
+def byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) of a single "bytes=" range, None to send the whole file"""
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    first, _, last = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
 @api_router.get("/invoices/{invoice_id}/download-pdf")
-async def download_invoice_pdf(invoice_id: str, current_user: User = Depends(get_current_user)):
-    invoice = await db.invoices.find_one({"id": invoice_id})
+async def download_invoice_pdf(
+    invoice_id: str,
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Stored PDF of an invoice, the blob id (hash of the bytes) is its ETag"""
+    invoice = await db.invoices.find_one(
+        {"id": invoice_id}, {"_id": 0, "invoice_number": 1, "pdf_blob_id": 1, "pdf_data": 1, "pdf_stale": 1}
+    )
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
-    if not invoice.get('pdf_data'):
-        raise HTTPException(status_code=404, detail="PDF not generated yet")
+    pdf_blob_id = invoice.get('pdf_blob_id')
+    if not pdf_blob_id and invoice.get('pdf_data'):
+        # Not migrated yet (python manage.py migrate-pdfs): move it to the store once
+        pdf_blob_id = await asyncio.to_thread(pdf_store.put, base64.b64decode(invoice['pdf_data']))
+        await db.invoices.update_one(
+            {"id": invoice_id, "pdf_data": invoice['pdf_data']},
+            {"$set": {"pdf_blob_id": pdf_blob_id}, "$unset": {"pdf_data": ""}}
+        )
     
-    pdf_bytes = base64.b64decode(invoice['pdf_data'])
+    if not pdf_blob_id or not await asyncio.to_thread(pdf_store.exists, pdf_blob_id):
+        raise HTTPException(status_code=404, detail="PDF not generated yet")
     
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename=facture_{invoice['invoice_number']}.pdf"
-        }
-    )
+    etag = f'"{pdf_blob_id}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+        "X-PDF-Stale": "true" if invoice.get('pdf_stale') else "false",
+        "Content-Disposition": f"attachment; filename=facture_{invoice['invoice_number']}.pdf"
+    }
+    if if_none_match and (if_none_match.strip() == "*" or etag in [
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ]):
+        return Response(status_code=304, headers=headers)
+    
+    size = await asyncio.to_thread(pdf_store.size, pdf_blob_id)
+    byte_span = byte_range(range_header, size) if not if_range or if_range.strip() == etag else None
+    if byte_span:
+        start, end = byte_span
+        return Response(
+            content=await asyncio.to_thread(pdf_store.read, pdf_blob_id, start, end - start + 1),
+            status_code=206,
+            media_type="application/pdf",
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"}
+        )
+    return FileResponse(pdf_store.path(pdf_blob_id), media_type="application/pdf", headers=headers)
 
 # Accounting endpoints
 @api_router.get("/accounting/entries")
 async def get_accounting_entries(
+    response: Response,
+    page: PageParams = Depends(),
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    account_code: Optional[str] = None,
+    client_id: Optional[str] = None,
+    invoice_id: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    query = {}
-    if start_date and end_date:
-        query["entry_date"] = {
-            "$gte": start_date,
-            "$lte": end_date
-        }
-    
-    entries = await db.accounting_entries.find(query).to_list(1000)
-    return [AccountingEntry(**parse_from_mongo(entry)) for entry in entries]
+    try:
+        query = period_filter("entry_date", to_datetime(start_date), to_datetime(end_date))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    if account_code:
+        query["account_code"] = account_code
+    if client_id:
+        query["client_id"] = client_id
+    if invoice_id:
+        query["invoice_id"] = invoice_id
+    
+    entries = await paginate(
+        db.accounting_entries, query, page, response,
+        allowed_sorts={"entry_date", "account_code"},
+        default_sort="entry_date",
+        date_sorts={"entry_date"}
+    )
+    return [AccountingEntry(**parse_from_mongo(entry, AccountingEntry)) for entry in entries]
+
+def accounting_summary_pipeline(start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    """Debit, credit and entry count of each account over the period"""
+    return [
+        # Period selected on the (entry_date, account_code) index
+        {"$match": date_range("entry_date", gte=start_date, lte=end_date)},
+        {"$group": {
+            "_id": "$account_code",
+            "account_name": {"$first": "$account_name"},
+            "total_debit": {"$sum": "$debit"},
+            "total_credit": {"$sum": "$credit"},
+            "entries_count": {"$sum": 1}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
 
 @api_router.get("/accounting/summary")
 async def get_accounting_summary(
@@ -985,31 +1914,60 @@ async def get_accounting_summary(
     end_date: str,
     current_user: User = Depends(get_current_user)
 ):
+    """Same summary as FrenchAccounting.get_journal_entries_summary, computed by MongoDB"""
     try:
-        start_dt = datetime.fromisoformat(start_date)
-        end_dt = datetime.fromisoformat(end_date)
-        
-        # Get entries from database
-        entries = await db.accounting_entries.find({
-            "entry_date": {
-                "$gte": start_dt.isoformat(),
-                "$lte": end_dt.isoformat()
-            }
-        }).to_list(1000)
+        start_dt = to_datetime(start_date)
+        end_dt = to_datetime(end_date)
         
-        # Convert to AccountingEntry objects
-        accounting_entries = [AccountingEntry(**parse_from_mongo(entry)) for entry in entries]
+        groups = await db.accounting_entries.aggregate(accounting_summary_pipeline(start_dt, end_dt)).to_list(length=None)
         
-        # Set entries in accounting system
-        accounting_system.entries = accounting_entries
-        
-        # Generate summary
-        summary = accounting_system.get_journal_entries_summary(start_dt, end_dt)
-        return summary
+        total_debit = sum(group["total_debit"] for group in groups)
+        total_credit = sum(group["total_credit"] for group in groups)
+        return {
+            'period': {
+                'start_date': start_dt.isoformat(),
+                'end_date': end_dt.isoformat()
+            },
+            'summary': {
+                'total_entries': sum(group["entries_count"] for group in groups),
+                'total_debit': round(total_debit, 2),
+                'total_credit': round(total_credit, 2),
+                'is_balanced': abs(total_debit - total_credit) < 0.01
+            },
+            'accounts': {
+                group["_id"]: {
+                    'account_name': group["account_name"],
+                    'total_debit': round(group["total_debit"], 2),
+                    'total_credit': round(group["total_credit"], 2),
+                    'balance': round(group["total_debit"] - group["total_credit"], 2),
+                    'entries_count': group["entries_count"]
+                }
+                for group in groups
+            }
+        }
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error generating accounting summary: {str(e)}")
 
+# Entries converted and written per chunk of the streamed exports
+ACCOUNTING_EXPORT_BATCH_SIZE = int(os.environ.get('ACCOUNTING_EXPORT_BATCH_SIZE', '500'))
+
+async def accounting_export_chunks(export, start_dt: datetime, end_dt: datetime):
+    """Stream an export of the period's entries in date order, one chunk per batch"""
+    cursor = db.accounting_entries.find(
+        date_range("entry_date", gte=start_dt, lte=end_dt), {"_id": 0}
+    ).sort([("entry_date", 1), ("account_code", 1)]).batch_size(ACCOUNTING_EXPORT_BATCH_SIZE)
+    entries = []
+    include_headers = True
+    async for entry in cursor:
+        entries.append(AccountingEntry(**parse_from_mongo(entry, AccountingEntry)))
+        if len(entries) == ACCOUNTING_EXPORT_BATCH_SIZE:
+            yield export(entries, include_headers=include_headers)
+            include_headers = False
+            entries = []
+    if entries or include_headers:
+        yield export(entries, include_headers=include_headers)
+
 @api_router.get("/accounting/export/csv")
 async def export_accounting_csv(
     start_date: str,
@@ -1017,33 +1975,24 @@ async def export_accounting_csv(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        start_dt = datetime.fromisoformat(start_date)
-        end_dt = datetime.fromisoformat(end_date)
-        
-        # Get entries from database
-        entries = await db.accounting_entries.find({
-            "entry_date": {
-                "$gte": start_dt.isoformat(),
-                "$lte": end_dt.isoformat()
-            }
-        }).to_list(1000)
-        
-        # Convert to AccountingEntry objects
-        accounting_entries = [AccountingEntry(**parse_from_mongo(entry)) for entry in entries]
-        
-        # Generate CSV
-        csv_data = accounting_system.export_to_csv(accounting_entries)
-        
-        return Response(
-            content=csv_data,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=comptabilite_{start_date}_{end_date}.csv"
-            }
-        )
-        
-    except Exception as e:
+        start_dt = to_datetime(start_date)
+        end_dt = to_datetime(end_date)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Error exporting CSV: {str(e)}")
+    
+    return StreamingResponse(
+        accounting_export_chunks(accounting_system.export_to_csv, start_dt, end_dt),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename=comptabilite_{start_date}_{end_date}.csv"
+        }
+    )
+
+ACCOUNTING_EXPORT_FORMATS = {
+    'ciel': (accounting_system.export_to_ciel, "txt"),
+    'sage': (accounting_system.export_to_sage, "csv"),
+    'cegid': (accounting_system.export_to_cegid, "csv"),
+}
 
 @api_router.get("/accounting/export/{format}")
 async def export_accounting_format(
@@ -1052,105 +2001,228 @@ async def export_accounting_format(
     end_date: str,
     current_user: User = Depends(get_current_user)
 ):
-    if format not in ['ciel', 'sage', 'cegid']:
+    if format not in ACCOUNTING_EXPORT_FORMATS:
         raise HTTPException(status_code=400, detail="Format not supported. Use: ciel, sage, or cegid")
     
     try:
-        start_dt = datetime.fromisoformat(start_date)
-        end_dt = datetime.fromisoformat(end_date)
-        
-        # Get entries from database
-        entries = await db.accounting_entries.find({
-            "entry_date": {
-                "$gte": start_dt.isoformat(),
-                "$lte": end_dt.isoformat()
-            }
-        }).to_list(1000)
-        
-        # Convert to AccountingEntry objects
-        accounting_entries = [AccountingEntry(**parse_from_mongo(entry)) for entry in entries]
-        
-        # Generate export based on format
-        if format == 'ciel':
-            export_data = accounting_system.export_to_ciel(accounting_entries)
-            filename = f"comptabilite_ciel_{start_date}_{end_date}.txt"
-        elif format == 'sage':
-            export_data = accounting_system.export_to_sage(accounting_entries)
-            filename = f"comptabilite_sage_{start_date}_{end_date}.csv"
-        elif format == 'cegid':
-            export_data = accounting_system.export_to_cegid(accounting_entries)
-            filename = f"comptabilite_cegid_{start_date}_{end_date}.csv"
-        
-        return Response(
-            content=export_data,
+        start_dt = to_datetime(start_date)
+        end_dt = to_datetime(end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error exporting {format}: {str(e)}")
+    
+    export, extension = ACCOUNTING_EXPORT_FORMATS[format]
+    return StreamingResponse(
+        accounting_export_chunks(export, start_dt, end_dt),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename=comptabilite_{format}_{start_date}_{end_date}.{extension}"
+        }
+    )
+
+# Receivables aging report
+AGING_BUCKETS = ["not_due"] + [label for label, _ in OVERDUE_BUCKETS]
+# $bucket boundaries on days overdue, the last bucket is $bucket's default
+AGING_BOUNDARIES = [float("-inf"), 1] + [last_day + 1 for _, last_day in OVERDUE_BUCKETS if last_day is not None]
+AGING_CSV_HEADERS = ["Client", "Non échu", "1-30 jours", "31-60 jours", "61-90 jours", "Plus de 90 jours", "Total", "Factures"]
+
+def aging_pipeline(as_of: datetime, client_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Open balances with their days overdue at the as-of date.
+
+    Invoices without a due date are due on their invoice date.
+    """
+    match = {"status": {"$nin": ["paid", "cancelled"]}, **date_range("invoice_date", lte=as_of)}
+    if client_id:
+        match["client_id"] = client_id
+    due_date = {"$ifNull": [date_expr("due_date"), date_expr("invoice_date")]}
+    return [
+        {"$match": match},
+        {"$project": {
+            "_id": 0,
+            "client_id": 1,
+            "remaining": INVOICE_REMAINING_EXPR,
+            "days": {"$ceil": {"$divide": [{"$subtract": [as_of, due_date]}, 24 * 3600 * 1000]}}
+        }},
+        {"$match": {"remaining": {"$gt": PAYMENT_TOLERANCE}}}
+    ]
+
+def aging_bucket_sums() -> Dict[str, Any]:
+    """$group accumulators summing the remaining amounts of each bucket"""
+    sums = {"not_due": {"$sum": {"$cond": [{"$lte": ["$days", 0]}, "$remaining", 0]}}}
+    first_day = 1
+    for label, last_day in OVERDUE_BUCKETS:
+        bounds = [{"$gte": ["$days", first_day]}]
+        if last_day is not None:
+            bounds.append({"$lte": ["$days", last_day]})
+        sums[label] = {"$sum": {"$cond": [{"$and": bounds}, "$remaining", 0]}}
+        first_day = (last_day or 0) + 1
+    return sums
+
+def aging_row(group: Dict[str, Any], client_names: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "client_id": group["_id"],
+        "company_name": client_names.get(group["_id"], ""),
+        **{label: round(group[label], 2) for label in AGING_BUCKETS},
+        "total": round(group["total"], 2),
+        "invoices": group["invoices"]
+    }
+
+@api_router.get("/reports/aging")
+async def get_aging_report(
+    as_of: Optional[datetime] = None,
+    client_id: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|csv)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Aged balance of the open invoices per client, largest balances first.
+
+    Invoices issued after the as-of date (default now) are left out and
+    the remaining amounts are the current ones, the as-of date sets the
+    day the delays are counted from.
+    """
+    as_of = to_datetime(as_of) if as_of else datetime.now(timezone.utc)
+    by_client = [
+        {"$group": {
+            "_id": "$client_id",
+            **aging_bucket_sums(),
+            "total": {"$sum": "$remaining"},
+            "invoices": {"$sum": 1}
+        }},
+        {"$sort": {"total": -1, "_id": 1}}
+    ]
+    clients = await db.clients.find(
+        {"id": client_id} if client_id else {}, {"_id": 0, "id": 1, "company_name": 1}
+    ).to_list(length=None)
+    client_names = {client["id"]: client["company_name"] for client in clients}
+    
+    if format == "csv":
+        async def rows():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=';')
+            totals = dict.fromkeys(AGING_BUCKETS + ["total", "invoices"], 0)
+            
+            def flush() -> str:
+                data = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                return data
+            
+            writer.writerow(AGING_CSV_HEADERS)
+            yield flush()
+            async for group in db.invoices.aggregate(aging_pipeline(as_of, client_id) + by_client):
+                row = aging_row(group, client_names)
+                for key in totals:
+                    totals[key] += row[key]
+                writer.writerow(
+                    [row["company_name"] or row["client_id"]]
+                    + [f"{row[key]:.2f}" for key in AGING_BUCKETS + ["total"]]
+                    + [row["invoices"]]
+                )
+                yield flush()
+            writer.writerow(["Total"] + [f"{totals[key]:.2f}" for key in AGING_BUCKETS + ["total"]] + [totals["invoices"]])
+            yield flush()
+        
+        return StreamingResponse(
+            rows(),
             media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
+            headers={"Content-Disposition": f"attachment; filename=balance_agee_{as_of:%Y-%m-%d}.csv"}
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error exporting {format}: {str(e)}")
+    
+    # One pass for both the client rows and the bucket totals
+    report = await db.invoices.aggregate(aging_pipeline(as_of, client_id) + [{"$facet": {
+        "clients": by_client,
+        "totals": [{"$bucket": {
+            "groupBy": "$days",
+            "boundaries": AGING_BOUNDARIES,
+            "default": AGING_BUCKETS[-1],
+            "output": {"amount": {"$sum": "$remaining"}, "invoices": {"$sum": 1}}
+        }}]
+    }}]).to_list(1)
+    facets = report[0] if report else {"clients": [], "totals": []}
+    
+    # $bucket ids are the lower boundaries, then the default bucket
+    labels = dict(zip(AGING_BOUNDARIES[:-1] + [AGING_BUCKETS[-1]], AGING_BUCKETS))
+    totals = {label: {"amount": 0.0, "invoices": 0} for label in AGING_BUCKETS}
+    for bucket in facets["totals"]:
+        totals[labels[bucket["_id"]]] = {"amount": round(bucket["amount"], 2), "invoices": bucket["invoices"]}
+    
+    return {
+        "as_of": as_of,
+        "buckets": AGING_BUCKETS,
+        "totals": {
+            **totals,
+            "total": round(sum(bucket["amount"] for bucket in totals.values()), 2),
+            "invoices": sum(bucket["invoices"] for bucket in totals.values())
+        },
+        "clients": [aging_row(group, client_names) for group in facets["clients"]]
+    }
 
 # Dashboard endpoint
-@api_router.get("/dashboard")
-async def get_dashboard(current_user: User = Depends(get_current_user)):
-    # Get counts
-    clients_count = await db.clients.count_documents({})
-    vehicles_count = await db.vehicles.count_documents({})
-    orders_count = await db.orders.count_documents({})
-    invoices_count = await db.invoices.count_documents({})
-    
-    # Get current month and year dates
+DASHBOARD_OVERDUE_LIMIT = int(os.environ.get('DASHBOARD_OVERDUE_LIMIT', '10'))
+
+
+async def compute_dashboard() -> dict:
     today = datetime.now(timezone.utc)
     current_month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     current_year_start = today.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # Calculate monthly revenue (current month)
-    monthly_invoices = await db.invoices.find({
-        "status": "paid",
-        "invoice_date": {
-            "$gte": current_month_start.isoformat(),
-            "$lt": today.isoformat()
-        }
-    }).to_list(length=None)
-    
-    monthly_revenue = sum(invoice.get('grand_total', invoice.get('total_ttc', 0)) for invoice in monthly_invoices)
-    
-    # Calculate yearly revenue (current year)
-    yearly_invoices = await db.invoices.find({
-        "status": "paid", 
-        "invoice_date": {
-            "$gte": current_year_start.isoformat(),
-            "$lt": today.isoformat()
-        }
-    }).to_list(length=None)
-    
-    yearly_revenue = sum(invoice.get('grand_total', invoice.get('total_ttc', 0)) for invoice in yearly_invoices)
-    
-    # Get recent orders
-    recent_orders = await db.orders.find().sort("created_at", -1).limit(5).to_list(length=None)
-    
-    # Get overdue invoices
-    overdue_invoices = await db.invoices.find({
-        "status": {"$ne": "paid"},
-        "due_date": {"$lt": today.isoformat()}
-    }).to_list(length=None)
-    
+    overdue_filter = {"status": "overdue"}
+
+    # All invoice figures in a single round trip, over the summary fields only
+    # (legacy invoices still carry their PDF in pdf_data)
+    invoice_pipeline = [{"$project": INVOICE_SUMMARY_PROJECTION}, {"$facet": {
+        "monthly_revenue": [
+            {"$match": {"status": "paid", **date_range("invoice_date", gte=current_month_start, lt=today)}},
+            {"$group": {"_id": None, "amount": {"$sum": INVOICE_TOTAL_EXPR}}}
+        ],
+        "yearly_revenue": [
+            {"$match": {"status": "paid", **date_range("invoice_date", gte=current_year_start, lt=today)}},
+            {"$group": {"_id": None, "amount": {"$sum": INVOICE_TOTAL_EXPR}}}
+        ],
+        "overdue_totals": [
+            {"$match": overdue_filter},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "amount": {"$sum": INVOICE_REMAINING_EXPR}}}
+        ],
+        "overdue_invoices": [
+            {"$match": overdue_filter},
+            {"$sort": {"due_date": 1}},
+            {"$limit": DASHBOARD_OVERDUE_LIMIT}
+        ]
+    }}]
+
+    # Collection counts come from metadata instead of scanning the collections
+    clients_count, vehicles_count, orders_count, invoices_count, invoice_facets, recent_orders = await asyncio.gather(
+        db.clients.estimated_document_count(),
+        db.vehicles.estimated_document_count(),
+        db.orders.estimated_document_count(),
+        db.invoices.estimated_document_count(),
+        db.invoices.aggregate(invoice_pipeline).to_list(1),
+        db.orders.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
+    )
+    facets = invoice_facets[0]
+
+    def first(facet: str, key: str, default=0):
+        return facets[facet][0][key] if facets[facet] else default
+
     return {
         "stats": {
             "clients": clients_count,
             "vehicles": vehicles_count,
             "orders": orders_count,
             "invoices": invoices_count,
-            "overdue_invoices": len(overdue_invoices),
-            "monthly_revenue": monthly_revenue,
-            "yearly_revenue": yearly_revenue
+            "overdue_invoices": first("overdue_totals", "count"),
+            "overdue_amount": first("overdue_totals", "amount"),
+            "monthly_revenue": first("monthly_revenue", "amount"),
+            "yearly_revenue": first("yearly_revenue", "amount")
         },
-        "recent_orders": [Order(**parse_from_mongo(order)) for order in recent_orders],
-        "overdue_invoices": [Invoice(**parse_from_mongo(invoice)) for invoice in overdue_invoices]
+        "recent_orders": [Order(**parse_from_mongo(order, Order)) for order in recent_orders],
+        "overdue_invoices": [
+            Invoice(**parse_from_mongo(invoice, Invoice)) for invoice in facets["overdue_invoices"]
+        ]
     }
 
+@api_router.get("/dashboard")
+async def get_dashboard(current_user: User = Depends(get_current_user)):
+    return await dashboard_cache.get_or_compute(compute_dashboard)
+
 # Document management models
 class VehicleDocument(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -1183,15 +2255,19 @@ async def get_settings(current_user: User = Depends(get_current_user)):
     if not settings:
         # Create default settings
         default_settings = Settings()
-        settings_dict = prepare_for_mongo(default_settings.dict())
+        settings_dict = prepare_for_mongo(default_settings.dict(), Settings)
         await db.settings.insert_one(settings_dict)
         return default_settings
     return Settings(**settings)
 
 @api_router.put("/settings", response_model=Settings)
 async def update_settings(settings_data: Settings, current_user: User = Depends(get_current_user)):
-    settings_dict = prepare_for_mongo(settings_data.dict())
-    await db.settings.replace_one({}, settings_dict, upsert=True)
+    settings_dict = prepare_for_mongo(settings_data.dict(), Settings)
+    previous_settings = await db.settings.find_one_and_replace(
+        {}, settings_dict, projection={"_id": 0, **dict.fromkeys(PDF_COMPANY_FIELDS, 1)}, upsert=True
+    )
+    if any((previous_settings or {}).get(field) != settings_dict.get(field) for field in PDF_COMPANY_FIELDS):
+        await mark_invoice_pdfs_stale({})
     return settings_data
 
 # INSEE/Business validation endpoints
@@ -1354,9 +2430,9 @@ async def send_invoice_notification(
         invoice_data = {
             'invoice_number': invoice['invoice_number'],
             'client_name': client['company_name'],
-            'invoice_date': invoice['invoice_date'],
+            'invoice_date': to_datetime(invoice['invoice_date']).strftime('%d/%m/%Y'),
             'total_ttc': invoice['total_ttc'],
-            'due_date': invoice['due_date']
+            'due_date': to_datetime(invoice['due_date']).strftime('%d/%m/%Y')
         }
         
         # Send email
@@ -1395,7 +2471,7 @@ async def send_payment_reminder(
         
         # Calculate days overdue
         from datetime import datetime
-        due_date = datetime.fromisoformat(invoice['due_date'].replace('Z', '+00:00'))
+        due_date = to_datetime(invoice['due_date'])
         days_overdue = max(0, (datetime.now(timezone.utc) - due_date).days)
         
         # Prepare reminder data for email
@@ -1403,7 +2479,7 @@ async def send_payment_reminder(
             'invoice_number': invoice['invoice_number'],
             'client_name': client['company_name'],
             'amount_due': invoice['total_ttc'],
-            'due_date': invoice['due_date'],
+            'due_date': due_date.strftime('%d/%m/%Y'),
             'days_overdue': days_overdue,
             'urgency_level': request.urgency_level
         }
@@ -1422,9 +2498,19 @@ async def send_payment_reminder(
 
 # Vehicle Document management endpoints
 @api_router.get("/vehicles/{vehicle_id}/documents", response_model=List[VehicleDocument])
-async def get_vehicle_documents(vehicle_id: str, current_user: User = Depends(get_current_user)):
-    documents = await db.vehicle_documents.find({"vehicle_id": vehicle_id}).to_list(length=None)
-    return [VehicleDocument(**parse_from_mongo(doc)) for doc in documents]
+async def get_vehicle_documents(
+    vehicle_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: User = Depends(get_current_user)
+):
+    documents = await paginate(
+        db.vehicle_documents, {"vehicle_id": vehicle_id}, page, response,
+        allowed_sorts={"uploaded_at", "label"},
+        default_sort="uploaded_at",
+        date_sorts={"uploaded_at"}
+    )
+    return [VehicleDocument(**parse_from_mongo(doc, VehicleDocument)) for doc in documents]
 
 @api_router.post("/vehicles/{vehicle_id}/documents/upload")
 async def upload_vehicle_document(
@@ -1476,7 +2562,7 @@ async def upload_vehicle_document(
             mime_type=file.content_type
         )
         
-        document_dict = prepare_for_mongo(document.dict())
+        document_dict = prepare_for_mongo(document.dict(), VehicleDocument)
         await db.vehicle_documents.insert_one(document_dict)
         
         return document
@@ -1593,7 +2679,7 @@ async def update_vehicle_document(
         "vehicle_id": vehicle_id
     })
     
-    return VehicleDocument(**parse_from_mongo(updated_document))
+    return VehicleDocument(**parse_from_mongo(updated_document, VehicleDocument))
 
 @api_router.delete("/vehicles/{vehicle_id}/documents/{document_id}")
 async def delete_vehicle_document(
@@ -1628,9 +2714,19 @@ async def delete_vehicle_document(
 
 # Client Document management endpoints
 @api_router.get("/clients/{client_id}/documents", response_model=List[ClientDocument])
-async def get_client_documents(client_id: str, current_user: User = Depends(get_current_user)):
-    documents = await db.client_documents.find({"client_id": client_id}).to_list(length=None)
-    return [ClientDocument(**parse_from_mongo(doc)) for doc in documents]
+async def get_client_documents(
+    client_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: User = Depends(get_current_user)
+):
+    documents = await paginate(
+        db.client_documents, {"client_id": client_id}, page, response,
+        allowed_sorts={"uploaded_at", "label"},
+        default_sort="uploaded_at",
+        date_sorts={"uploaded_at"}
+    )
+    return [ClientDocument(**parse_from_mongo(doc, ClientDocument)) for doc in documents]
 
 @api_router.post("/clients/{client_id}/documents/upload")
 async def upload_client_document(
@@ -1682,7 +2778,7 @@ async def upload_client_document(
             mime_type=file.content_type
         )
         
-        document_dict = prepare_for_mongo(document.dict())
+        document_dict = prepare_for_mongo(document.dict(), ClientDocument)
         await db.client_documents.insert_one(document_dict)
         
         return document
@@ -1799,7 +2895,7 @@ async def update_client_document(
         "client_id": client_id
     })
     
-    return ClientDocument(**parse_from_mongo(updated_document))
+    return ClientDocument(**parse_from_mongo(updated_document, ClientDocument))
 
 @api_router.delete("/clients/{client_id}/documents/{document_id}")
 async def delete_client_document(
@@ -1836,11 +2932,58 @@ async def delete_client_document(
 @api_router.post("/orders/renew")
 async def trigger_order_renewal(current_user: User = Depends(get_current_user)):
     """Manually trigger order renewal process"""
-    try:
-        await renew_orders()
-        return {"message": "Order renewal process completed successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error during renewal: {str(e)}")
+    run = await run_scheduled_job("order_renewal")
+    return {"message": "Order renewal process completed successfully", "stats": run["result"]}
+
+# Forecast endpoints
+@api_router.get("/forecast/renewals")
+async def get_renewals_forecast(
+    months: int = Query(12, ge=1, le=36),
+    current_user: User = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Expected renewal invoices per month, per client and per vehicle.
+
+    Projects the renewable items of active orders assuming every invoice
+    gets paid; nothing is written. Renewal orders are not projected on
+    their own, their original order carries the renewal chain.
+    """
+    orders = await db.orders.find({
+        "status": "active",
+        "items.is_renewable": True,
+        **ORIGINAL_ORDER_FILTER
+    }, {"_id": 0, "client_id": 1, "items": 1}).to_list(length=None)
+    
+    clients = await loaders.clients.load_many({order["client_id"] for order in orders})
+    vat_rates = {client["id"]: client.get("vat_rate", 20.0) for client in clients if client}
+    
+    items = []
+    for order in orders:
+        if order["client_id"] not in vat_rates:
+            continue
+        for item in order["items"]:
+            if item.get("is_renewable") and item.get("rental_period") and item.get("rental_duration") and item.get("end_date"):
+                items.append({
+                    "client_id": order["client_id"],
+                    "vehicle_id": item["vehicle_id"],
+                    "end_date": to_datetime(item["end_date"]).date(),
+                    "rental_period": RentalPeriod(item["rental_period"]).value,
+                    "rental_duration": item["rental_duration"],
+                    "daily_rate": item["daily_rate"],
+                    "quantity": item.get("quantity", 1),
+                    "vat_rate": vat_rates[order["client_id"]]
+                })
+    
+    forecast = project_renewals(items, datetime.now(timezone.utc).date(), months)
+    
+    # Display names
+    clients_by_id = {client["id"]: client for client in clients if client}
+    vehicles = await loaders.vehicles.load_many(vehicle["vehicle_id"] for vehicle in forecast["vehicles"])
+    for client_forecast in forecast["clients"]:
+        client_forecast["company_name"] = clients_by_id[client_forecast["client_id"]].get("company_name")
+    for vehicle_forecast, vehicle in zip(forecast["vehicles"], vehicles):
+        vehicle_forecast["license_plate"] = vehicle["license_plate"] if vehicle else None
+    return forecast
 
 # Maintenance endpoints
 @api_router.post("/maintenance", response_model=MaintenanceRecord)
@@ -1872,23 +3015,35 @@ async def create_maintenance_record(
         created_by=current_user.id
     )
     
-    maintenance_dict = prepare_for_mongo(maintenance_record.dict())
+    maintenance_dict = prepare_for_mongo(maintenance_record.dict(), MaintenanceRecord)
     await db.maintenance_records.insert_one(maintenance_dict)
     
     return maintenance_record
 
 @api_router.get("/maintenance", response_model=List[MaintenanceRecord])
 async def get_maintenance_records(
+    response: Response,
+    page: PageParams = Depends(),
     vehicle_id: Optional[str] = None,
+    maintenance_type: Optional[MaintenanceType] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     current_user: User = Depends(get_current_user)
 ):
     """Récupérer les enregistrements de maintenance"""
-    query = {}
+    query = period_filter("maintenance_date", start_date, end_date)
     if vehicle_id:
         query["vehicle_id"] = vehicle_id
-    
-    records = await db.maintenance_records.find(query).sort("maintenance_date", -1).to_list(length=None)
-    return [MaintenanceRecord(**parse_from_mongo(record)) for record in records]
+    if maintenance_type:
+        query["maintenance_type"] = maintenance_type.value
+    
+    records = await paginate(
+        db.maintenance_records, query, page, response,
+        allowed_sorts={"maintenance_date", "created_at", "amount_ttc"},
+        default_sort="maintenance_date",
+        date_sorts={"maintenance_date", "created_at"}
+    )
+    return [MaintenanceRecord(**parse_from_mongo(record, MaintenanceRecord)) for record in records]
 
 @api_router.get("/maintenance/{record_id}", response_model=MaintenanceRecord)
 async def get_maintenance_record(
@@ -1900,7 +3055,7 @@ async def get_maintenance_record(
     if not record:
         raise HTTPException(status_code=404, detail="Maintenance record not found")
     
-    return MaintenanceRecord(**parse_from_mongo(record))
+    return MaintenanceRecord(**parse_from_mongo(record, MaintenanceRecord))
 
 @api_router.put("/maintenance/{record_id}", response_model=MaintenanceRecord)
 async def update_maintenance_record(
@@ -1935,11 +3090,11 @@ async def update_maintenance_record(
         supplier=maintenance_data.supplier,
         documents=existing_record.get('documents', []),  # Conserver les documents existants
         notes=maintenance_data.notes,
-        created_at=datetime.fromisoformat(existing_record['created_at']),
+        created_at=to_datetime(existing_record['created_at']),
         created_by=existing_record['created_by']
     )
     
-    maintenance_dict = prepare_for_mongo(updated_record.dict())
+    maintenance_dict = prepare_for_mongo(updated_record.dict(), MaintenanceRecord)
     await db.maintenance_records.replace_one({"id": record_id}, maintenance_dict)
     
     return updated_record
@@ -2012,7 +3167,7 @@ async def upload_maintenance_document(
         f.write(content)
     
     # Sauvegarder le document en base
-    document_dict = prepare_for_mongo(document.dict())
+    document_dict = prepare_for_mongo(document.dict(), Document)
     await db.documents.insert_one(document_dict)
     
     # Ajouter le document à l'enregistrement de maintenance
@@ -2038,7 +3193,7 @@ async def get_maintenance_documents(
         return []
     
     documents = await db.documents.find({"id": {"$in": doc_ids}}).to_list(length=None)
-    return [Document(**parse_from_mongo(doc)) for doc in documents]
+    return [Document(**parse_from_mongo(doc, Document)) for doc in documents]
 
 @api_router.get("/documents/{document_id}/download")
 async def download_maintenance_document(
@@ -2098,6 +3253,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Logging
@@ -2107,121 +3263,444 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def renew_orders():
-    """Renew eligible orders automatically with dynamic day calculation"""
-    try:
-        today = datetime.now(timezone.utc)
-        
-        # Find orders that need renewal
-        renewable_orders = await db.orders.find({
-            "status": "active",
-            "items.is_renewable": True
-        }).to_list(length=None)
-        
-        for order_data in renewable_orders:
-            order = Order(**order_data)
+# Order renewal engine
+RENEWAL_BATCH_SIZE = int(os.environ.get('RENEWAL_BATCH_SIZE', '200'))
+RENEWAL_CONCURRENCY = int(os.environ.get('RENEWAL_CONCURRENCY', '4'))
+
+def next_rental_period(item: OrderItem) -> Optional[Tuple[datetime, datetime]]:
+    """Dates of the period following the current one of a renewable item"""
+    # Calculate next renewal date based on end_date + renewal period
+    current_end_date = to_datetime(item.end_date)
+    new_start_date = current_end_date + timedelta(days=1)
+    
+    if item.rental_period == RentalPeriod.DAYS:
+        new_end_date = new_start_date + timedelta(days=item.rental_duration - 1)
+    elif item.rental_period == RentalPeriod.WEEKS:
+        new_end_date = new_start_date + timedelta(weeks=item.rental_duration) - timedelta(days=1)
+    elif item.rental_period == RentalPeriod.MONTHS:
+        # For monthly, calculate the actual days in the next period
+        if item.rental_duration == 1:
+            # As many days as the month following the start month, whatever the start day
+            year, month = divmod(new_start_date.year * 12 + new_start_date.month, 12)
+            days_in_month = calendar.monthrange(year, month + 1)[1]
             
-            for item in order.items:
-                if item.is_renewable and item.rental_period and item.rental_duration:
-                    # Calculate next renewal date based on end_date + renewal period
-                    current_end_date = item.end_date
-                    
-                    # Calculate new period dates
-                    if item.rental_period == RentalPeriod.DAYS:
-                        new_start_date = current_end_date + timedelta(days=1)
-                        new_end_date = new_start_date + timedelta(days=item.rental_duration - 1)
-                    elif item.rental_period == RentalPeriod.WEEKS:
-                        new_start_date = current_end_date + timedelta(days=1)
-                        new_end_date = new_start_date + timedelta(weeks=item.rental_duration) - timedelta(days=1)
-                    elif item.rental_period == RentalPeriod.MONTHS:
-                        new_start_date = current_end_date + timedelta(days=1)
-                        # For monthly, calculate the actual days in the next period
-                        if item.rental_duration == 1:
-                            # Next month
-                            if new_start_date.month == 12:
-                                next_month = new_start_date.replace(year=new_start_date.year + 1, month=1)
-                            else:
-                                next_month = new_start_date.replace(month=new_start_date.month + 1)
-                            
-                            # Calculate days in the month
-                            if next_month.month == 12:
-                                days_in_month = (next_month.replace(year=next_month.year + 1, month=1) - next_month).days
-                            else:
-                                days_in_month = (next_month.replace(month=next_month.month + 1) - next_month).days
-                            
-                            new_end_date = new_start_date + timedelta(days=days_in_month - 1)
-                        else:
-                            # Multiple months - approximate with 30 days per month
-                            new_end_date = new_start_date + timedelta(days=item.rental_duration * 30 - 1)
-                    elif item.rental_period == RentalPeriod.YEARS:
-                        new_start_date = current_end_date + timedelta(days=1)
-                        new_end_date = new_start_date + timedelta(days=item.rental_duration * 365 - 1)
-                    else:
-                        continue
-                    
+            new_end_date = new_start_date + timedelta(days=days_in_month - 1)
+        else:
+            # Multiple months - approximate with 30 days per month
+            new_end_date = new_start_date + timedelta(days=item.rental_duration * 30 - 1)
+    elif item.rental_period == RentalPeriod.YEARS:
+        new_end_date = new_start_date + timedelta(days=item.rental_duration * 365 - 1)
+    else:
+        return None
+    
+    return new_start_date, new_end_date
+
+def renewal_key(order_id: str, position: int, new_start_date: datetime) -> str:
+    """Identifies the renewal of an order item for one period"""
+    return f"{order_id}/{position}/{new_start_date.date().isoformat()}"
+
+def build_renewal_order(
+    order: Order, item: OrderItem, new_start_date: datetime, new_end_date: datetime,
+    client: dict, order_number: str, key: str
+) -> Order:
+    """Renewal order of one item for its next period, amount recalculated"""
+    days = calculate_days_between(new_start_date, new_end_date)
+    item_total_ht = item.daily_rate * item.quantity * days
+    
+    renewed_item = OrderItem(
+        vehicle_id=item.vehicle_id,
+        quantity=item.quantity,
+        daily_rate=item.daily_rate,
+        total_days=days,
+        is_renewable=item.is_renewable,
+        rental_period=item.rental_period,
+        rental_duration=item.rental_duration,
+        start_date=new_start_date,
+        end_date=new_end_date,
+        item_total_ht=item_total_ht
+    )
+    
+    vat_rate = client['vat_rate'] / 100
+    return Order(
+        client_id=order.client_id,
+        order_number=order_number,
+        items=[renewed_item],
+        deposit_amount=0,  # No deposit on renewals
+        total_ht=item_total_ht,
+        total_vat=item_total_ht * vat_rate,
+        total_ttc=item_total_ht * (1 + vat_rate),
+        deposit_vat=0,
+        grand_total=item_total_ht * (1 + vat_rate),
+        renewed_from=order.id,
+        renewal_key=key,
+        created_by="system"
+    )
+
+def _failed_writes(error: BulkWriteError) -> set:
+    """Positions of the operations of a bulk write that did not apply"""
+    return {write_error["index"] for write_error in error.details["writeErrors"]}
+
+async def _renew_batch(documents: List[dict], today: datetime, stats: Dict[str, Any]) -> None:
+    """Renew the due items of a batch of orders.
+
+    Each renewal (one item, one period) is written in three steps: its
+    renewal order, its invoice, then the extension of the original item.
+    Renewal orders carry a unique renewal_key and the extension only
+    applies if the item end date is still the one read, so a batch that
+    failed halfway can be run again: renewals already written are reused
+    instead of billed twice. Invoice numbers are only allocated for
+    renewal orders actually written, right before their invoices.
+    """
+    # Stored end dates, before decoding, for the guarded extensions
+    stored_end_dates = [[item.get('end_date') for item in document.get('items') or ()] for document in documents]
+    orders = [Order(**parse_from_mongo(document, Order)) for document in documents]
+    
+    # Clients, last invoices and vehicles of the whole batch in three queries
+    loaders = Loaders(db)
+    vehicle_ids = list({item.vehicle_id for order in orders for item in order.items})
+    clients, last_invoices, vehicles, settings = await asyncio.gather(
+        loaders.clients.load_many(order.client_id for order in orders),
+        loaders.last_invoices.load_many(order.id for order in orders),
+        loaders.vehicles.load_many(vehicle_ids),
+        loaders.settings()
+    )
+    vehicles_by_id = dict(zip(vehicle_ids, vehicles))
+    
+    renewals = []  # (key, order, client, item position, item, new start date, new end date, stored end date)
+    for order, client, last_invoice, end_dates in zip(orders, clients, last_invoices, stored_end_dates):
+        try:
+            periods = []
+            for position, item in enumerate(order.items):
+                if item.is_renewable and item.rental_period and item.rental_duration and item.end_date:
+                    period = next_rental_period(item)
                     # Check if it's time to renew (renewal date has passed)
-                    if new_start_date.date() <= today.date():
-                        # Check if last invoice was paid
-                        last_invoice = await db.invoices.find_one(
-                            {"order_id": order.id},
-                            sort=[("created_at", -1)]
-                        )
-                        
-                        if last_invoice and last_invoice.get('status') == 'paid':
-                            # Create new order item with updated dates and recalculated amount
-                            days = calculate_days_between(new_start_date, new_end_date)
-                            item_total_ht = item.daily_rate * item.quantity * days
-                            
-                            renewed_item = OrderItem(
-                                vehicle_id=item.vehicle_id,
-                                quantity=item.quantity,
-                                daily_rate=item.daily_rate,
-                                total_days=days,
-                                is_renewable=item.is_renewable,
-                                rental_period=item.rental_period,
-                                rental_duration=item.rental_duration,
-                                start_date=new_start_date,
-                                end_date=new_end_date,
-                                item_total_ht=item_total_ht
-                            )
-                            
-                            # Update order with new item dates and totals
-                            client = await db.clients.find_one({"id": order.client_id})
-                            if client:
-                                vat_rate = client['vat_rate'] / 100
-                                
-                                # Create renewal order
-                                renewal_order = Order(
-                                    client_id=order.client_id,
-                                    order_number=f"{order.order_number}-R{int(today.timestamp())}",
-                                    items=[renewed_item],
-                                    deposit_amount=0,  # No deposit on renewals
-                                    total_ht=item_total_ht,
-                                    total_vat=item_total_ht * vat_rate,
-                                    total_ttc=item_total_ht * (1 + vat_rate),
-                                    deposit_vat=0,
-                                    grand_total=item_total_ht * (1 + vat_rate),
-                                    created_by="system"
-                                )
-                                
-                                # Save renewal order
-                                renewal_dict = prepare_for_mongo(renewal_order.dict())
-                                await db.orders.insert_one(renewal_dict)
-                                
-                                # Create invoice for renewal
-                                await create_invoice_from_order(renewal_order, client)
-                                
-                                # Update original order item end dates
-                                await db.orders.update_one(
-                                    {"id": order.id, "items.vehicle_id": item.vehicle_id},
-                                    {"$set": {"items.$.end_date": new_end_date.isoformat()}}
-                                )
-                                
-                                print(f"Order {order.order_number} renewed successfully with {days} days")
-                    
+                    if period and period[0].date() <= today.date():
+                        periods.append((position, item, *period, end_dates[position]))
+        except Exception as e:
+            logger.error(f"Renewal of order {order.order_number} failed: {e}")
+            stats["failed"] += 1
+            continue
+        # Only renew when the last invoice was paid
+        if not periods or not client or not last_invoice or last_invoice.get('status') != 'paid':
+            stats["skipped"] += 1
+            continue
+        renewals.extend((renewal_key(order.id, period[0], period[2]), order, client, *period) for period in periods)
+    
+    if not renewals:
+        return
+    
+    renewal_orders: Dict[str, Order] = {}
+    failed = set()  # keys of the renewals not completed
+    try:
+        # Renewal orders and invoices left by an earlier, interrupted run
+        keys = [renewal[0] for renewal in renewals]
+        async for document in db.orders.find({"renewal_key": {"$in": keys}}, {"_id": 0}):
+            renewal_orders[document['renewal_key']] = Order(**parse_from_mongo(document, Order))
+        invoiced = set(await db.invoices.distinct(
+            "order_id", {"order_id": {"$in": [renewal_order.id for renewal_order in renewal_orders.values()]}}
+        ))
+        
+        # 1. Renewal orders
+        missing = [renewal for renewal in renewals if renewal[0] not in renewal_orders]
+        order_numbers = await sequence_allocator.next_numbers("renewal_orders", "REN", len(missing))
+        new_orders = [
+            build_renewal_order(order, item, new_start_date, new_end_date, client, order_number, key)
+            for (key, order, client, _, item, new_start_date, new_end_date, _), order_number
+            in zip(missing, order_numbers)
+        ]
+        if new_orders:
+            try:
+                await db.orders.insert_many(
+                    [prepare_for_mongo(renewal_order.dict(), Order) for renewal_order in new_orders], ordered=False
+                )
+            except BulkWriteError as e:
+                logger.error(f"Renewal orders not written: {e.details['writeErrors'][:3]}")
+                failed.update(new_orders[index].renewal_key for index in _failed_writes(e))
+            renewal_orders.update(
+                (renewal_order.renewal_key, renewal_order) for renewal_order in new_orders
+                if renewal_order.renewal_key not in failed
+            )
+        
+        # 2. Invoices, numbers allocated for the written renewal orders only
+        to_invoice = [
+            renewal for renewal in renewals
+            if renewal[0] in renewal_orders and renewal_orders[renewal[0]].id not in invoiced
+        ]
+        invoice_numbers = await sequence_allocator.next_numbers("invoices", "FACT", len(to_invoice))
+        invoices, entries = [], []
+        for (key, _, client, _, item, _, _, _), invoice_number in zip(to_invoice, invoice_numbers):
+            invoice, invoice_entries = build_invoice(
+                renewal_orders[key], invoice_number, client, settings, [vehicles_by_id.get(item.vehicle_id)]
+            )
+            invoices.append(prepare_for_mongo(invoice.dict(), Invoice))
+            entries.append([prepare_for_mongo(entry.dict(), AccountingEntry) for entry in invoice_entries])
+        if invoices:
+            try:
+                await db.invoices.insert_many(invoices, ordered=False)
+            except BulkWriteError as e:
+                lost = ", ".join(invoices[index]['invoice_number'] for index in sorted(_failed_writes(e)))
+                logger.error(f"Renewal invoices not written, numbers {lost} unused: {e.details['writeErrors'][:3]}")
+                failed.update(to_invoice[index][0] for index in _failed_writes(e))
+            invoiced.update(renewal_orders[renewal[0]].id for renewal in to_invoice if renewal[0] not in failed)
+            written_entries = [
+                entry for renewal, invoice_entries in zip(to_invoice, entries) if renewal[0] not in failed
+                for entry in invoice_entries
+            ]
+            if written_entries:
+                try:
+                    await db.accounting_entries.insert_many(written_entries, ordered=False)
+                except Exception as e:
+                    # The invoices stand, their entries have to be generated again
+                    logger.error(f"Accounting entries of renewal invoices not written: {e}")
+                    stats["entries_failed"] += len({entry["invoice_id"] for entry in written_entries})
+        
+        # 3. Extensions of the original items, guarded on the end date read
+        completed = []
+        for renewal in renewals:
+            if renewal[0] in renewal_orders and renewal_orders[renewal[0]].id in invoiced:
+                completed.append(renewal)
+            else:
+                failed.add(renewal[0])
+        extensions = [
+            UpdateOne(
+                {"id": order.id, f"items.{position}.end_date": stored_end_date},
+                {"$set": {f"items.{position}.end_date": new_end_date}}
+            )
+            for _, order, _, position, _, _, new_end_date, stored_end_date in completed
+        ]
+        if extensions:
+            try:
+                await db.orders.bulk_write(extensions, ordered=False)
+            except BulkWriteError as e:
+                logger.error(f"Renewed items not extended: {e.details['writeErrors'][:3]}")
+                failed.update(completed[index][0] for index in _failed_writes(e))
     except Exception as e:
-        print(f"Error in order renewal: {e}")
+        logger.error(f"Renewal of {len(renewals)} items failed: {e}")
+        failed.update(renewal[0] for renewal in renewals)
+    finally:
+        dashboard_cache.invalidate()
+    
+    renewed_orders = {}
+    for key, order, _, _, item, _, new_end_date, _ in renewals:
+        if key not in failed:
+            item.end_date = new_end_date
+            renewed_orders[order.id] = order
+            booking_index.register(renewal_orders[key].dict())
+    for order in renewed_orders.values():
+        booking_index.register(order.dict())
+    stats["renewed"] += len(renewals) - len(failed)
+    stats["failed"] += len({order.id for key, order, *_ in renewals if key in failed})
+
+async def renew_orders() -> Dict[str, Any]:
+    """Renew eligible orders automatically with dynamic day calculation.
+
+    Renewable orders are streamed from a cursor and processed in batches,
+    at most RENEWAL_CONCURRENCY at a time. Returns the run statistics:
+    scanned orders, renewed items (one renewal order and invoice each),
+    skipped orders (nothing due, last invoice unpaid or client missing),
+    failed orders, invoices written without their accounting entries and
+    duration. Renewal orders are not renewed themselves, their original
+    order carries the renewal chain.
+    """
+    started = time.perf_counter()
+    today = datetime.now(timezone.utc)
+    stats = {"scanned": 0, "renewed": 0, "skipped": 0, "failed": 0, "entries_failed": 0}
+    semaphore = asyncio.Semaphore(RENEWAL_CONCURRENCY)
+    tasks = []
+    
+    async def process(batch: List[dict]) -> None:
+        try:
+            await _renew_batch(batch, today, stats)
+        except Exception as e:
+            logger.error(f"Renewal batch of {len(batch)} orders failed: {e}")
+            stats["failed"] += len(batch)
+        finally:
+            semaphore.release()
+    
+    async def dispatch(batch: List[dict]) -> None:
+        # Wait for a free slot so that reading never runs far ahead of writing
+        await semaphore.acquire()
+        stats["scanned"] += len(batch)
+        tasks.append(asyncio.create_task(process(batch)))
+    
+    batch = []
+    cursor = db.orders.find({
+        "status": "active",
+        "items.is_renewable": True,
+        **ORIGINAL_ORDER_FILTER
+    }, {"_id": 0}).batch_size(RENEWAL_BATCH_SIZE)
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) == RENEWAL_BATCH_SIZE:
+            await dispatch(batch)
+            batch = []
+    if batch:
+        await dispatch(batch)
+    await asyncio.gather(*tasks)
+    
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000)
+    logger.info(
+        f"Order renewal: {stats['scanned']} scanned, {stats['renewed']} renewed, "
+        f"{stats['skipped']} skipped, {stats['failed']} failed in {stats['duration_ms']} ms"
+    )
+    if stats["entries_failed"]:
+        logger.error(f"Order renewal: {stats['entries_failed']} invoices without accounting entries")
+    if stats["failed"] and not stats["renewed"]:
+        raise JobFailed(f"All {stats['failed']} due orders failed to renew", stats)
+    return stats
+
+VEHICLE_EXPIRY_WARNING_DAYS = int(os.environ.get('VEHICLE_EXPIRY_WARNING_DAYS', '30'))
+
+async def check_vehicle_expiries() -> Dict[str, Any]:
+    """Vehicles whose technical control or insurance expires soon or has expired"""
+    limit = datetime.now(timezone.utc) + timedelta(days=VEHICLE_EXPIRY_WARNING_DAYS)
+    result = {}
+    for field in ("technical_control_expiry", "insurance_expiry"):
+        vehicles = await db.vehicles.find(
+            date_range(field, lt=limit), {"_id": 0, "license_plate": 1, field: 1}
+        ).to_list(length=None)
+        for vehicle in vehicles:
+            logger.warning(f"Vehicle {vehicle['license_plate']}: {field} on {to_datetime(vehicle[field]):%d/%m/%Y}")
+        result[field] = [vehicle["license_plate"] for vehicle in vehicles]
+    return result
+
+async def mark_overdue_invoices() -> Dict[str, Any]:
+    """Flag unpaid invoices past their due date and refresh their overdue bucket.
+
+    Invoices keep the date they first became overdue, a payment deleted
+    after they were paid puts them back overdue without resetting it.
+    Bucket updates only touch the invoices that changed bucket.
+    """
+    now = datetime.now(timezone.utc)
+    past_due = {"status": {"$in": OVERDUE_SOURCE_STATUSES}, **date_range("due_date", lt=now)}
+    flagged = await db.invoices.update_many(
+        {**past_due, "overdue_since": None},
+        {"$set": {"status": "overdue", "overdue_since": now}}
+    )
+    reflagged = await db.invoices.update_many(
+        {**past_due, "overdue_since": {"$ne": None}},
+        {"$set": {"status": "overdue"}}
+    )
+    
+    bucket_changes = 0
+    first_day = 0
+    for label, last_day in OVERDUE_BUCKETS:
+        bounds = {"lt": now - timedelta(days=first_day)}
+        if last_day is not None:
+            bounds["gte"] = now - timedelta(days=last_day)
+        result = await db.invoices.update_many(
+            {"status": "overdue", "overdue_bucket": {"$ne": label}, **date_range("due_date", **bounds)},
+            {"$set": {"overdue_bucket": label}}
+        )
+        bucket_changes += result.modified_count
+        first_day = last_day
+    
+    if flagged.modified_count or reflagged.modified_count:
+        dashboard_cache.invalidate()
+    return {
+        "flagged": flagged.modified_count + reflagged.modified_count,
+        "bucket_changes": bucket_changes
+    }
+
+# Periodic jobs, see services/scheduler.py
+scheduler.add_job("order_renewal", os.environ.get('RENEWAL_CRON', '0 6 * * *'), renew_orders, lease_seconds=1800)
+scheduler.add_job("invoice_overdue", os.environ.get('OVERDUE_CRON', '5 0 * * *'), mark_overdue_invoices)
+async def refresh_payment_terms() -> Dict[str, Any]:
+    result = await payment_terms_service.refresh(db)
+    # The clause is part of the PDF inputs
+    if result.get("changed"):
+        await mark_invoice_pdfs_stale({})
+    return result
+
+scheduler.add_job("payment_terms", os.environ.get('PAYMENT_TERMS_CRON', '0 3 * * 1'), refresh_payment_terms)
+scheduler.add_job("vehicle_expiries", os.environ.get('VEHICLE_EXPIRY_CRON', '0 7 * * 1'), check_vehicle_expiries)
+
+# Collections whose dates are stored as native BSON dates (manage.py migrate-dates)
+DATE_COLLECTIONS = {
+    "users": User,
+    "clients": Client,
+    "vehicles": Vehicle,
+    "orders": Order,
+    "invoices": Invoice,
+    "payments": Payment,
+    "accounting_entries": AccountingEntry,
+    "maintenance_records": MaintenanceRecord,
+    "documents": Document,
+    "vehicle_documents": VehicleDocument,
+    "client_documents": ClientDocument,
+}
+
+@app.on_event("startup")
+async def check_date_migration():
+    # Without the legacy mode string dates would silently drop out of date filters and sorts
+    if LEGACY_STRING_DATES:
+        return
+    unmigrated = await unmigrated_date_collections(db, DATE_COLLECTIONS)
+    if unmigrated:
+        raise RuntimeError(
+            f"Dates stored as strings in {', '.join(unmigrated)}: "
+            "run 'python manage.py migrate-dates' or set LEGACY_STRING_DATES=true"
+        )
+
+@app.on_event("startup")
+async def ensure_database_indexes():
+    if os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() != 'true':
+        return
+    try:
+        report = await ensure_indexes(db)
+        logger.info(
+            f"Indexes: {len(report['created'])} created, {len(report['failed'])} failed, "
+            f"{len(report['undeclared'])} undeclared"
+        )
+        for stats in await unused_indexes(db):
+            logger.info(f"Index {stats['index']} unused since {stats['since']}")
+    except Exception as e:
+        logger.error(f"Index provisioning failed: {e}")
+
+@app.on_event("startup")
+async def build_booking_index():
+    await booking_index.rebuild(db)
+    booking_index.start_refresh(db)
+
+@app.on_event("startup")
+async def start_scheduler():
+    scheduler.start(db)
+
+# Jobs started in the background, referenced until they are done
+background_jobs: Set[asyncio.Task] = set()
+
+def start_job(name: str) -> None:
+    """Run a job now without holding up the caller, unless it is already running"""
+    async def run():
+        try:
+            await scheduler.run(name)
+        except JobAlreadyRunning:
+            pass
+    task = asyncio.create_task(run())
+    background_jobs.add(task)
+    task.add_done_callback(background_jobs.discard)
+
+@app.on_event("startup")
+async def start_overdue_invoices():
+    # Catch up on the slots missed while no worker was up, or with the scheduler disabled
+    start_job("invoice_overdue")
+
+@app.on_event("startup")
+async def start_payment_terms():
+    # LLM wording just enabled: generate it now instead of waiting for the next slot
+    if payment_terms_service.enabled and not await payment_terms_service.clauses(db):
+        start_job("payment_terms")
+
+@app.on_event("startup")
+async def start_pdf_renderer():
+    await pdf_renderer.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await scheduler.stop()
+    for task in background_jobs:
+        task.cancel()
+    await booking_index.stop_refresh()
+    client.close()
+    password_hasher.shutdown()
+    pdf_renderer.shutdown()
\ No newline at end of file
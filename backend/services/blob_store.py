@@ -0,0 +1,67 @@
+import os
+import hashlib
+import logging
+import tempfile
+from typing import Optional
+
+
+class BlobStore:
+    """Content-addressed file store.
+
+    Blobs are named after the SHA-256 of their content and sharded by the
+    first two hex digits, so identical content is stored only once and a
+    blob id never points to different bytes.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.logger = logging.getLogger(__name__)
+
+    def path(self, blob_id: str) -> str:
+        if len(blob_id) != 64 or any(c not in "0123456789abcdef" for c in blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id}")
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def put(self, data: bytes) -> str:
+        """Store bytes and return their blob id"""
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self.path(blob_id)
+        if os.path.exists(path):
+            return blob_id
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file then rename, readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return blob_id
+
+    def get(self, blob_id: str) -> Optional[bytes]:
+        try:
+            with open(self.path(blob_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def read(self, blob_id: str, start: int, length: int) -> bytes:
+        """Part of a blob, for range requests"""
+        with open(self.path(blob_id), "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def exists(self, blob_id: str) -> bool:
+        return os.path.exists(self.path(blob_id))
+
+    def size(self, blob_id: str) -> int:
+        return os.path.getsize(self.path(blob_id))
+
+
+# Instance globale du stockage des factures PDF
+pdf_store = BlobStore(os.environ.get('PDF_STORAGE_DIR', '/app/documents/invoices'))
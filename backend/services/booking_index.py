@@ -0,0 +1,311 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from bisect import bisect_right
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from mongo_codec import to_datetime
+
+# Orders with these statuses no longer hold their vehicles
+RELEASED_ORDER_STATUSES = {"cancelled"}
+
+# Order fields the index reads
+ORDER_PROJECTION = {
+    "_id": 0, "id": 1, "order_number": 1, "status": 1, "renewed_from": 1,
+    "items.vehicle_id": 1, "items.start_date": 1, "items.end_date": 1
+}
+
+
+class Booking(NamedTuple):
+    start: int  # date ordinal, both bounds included like the billed days
+    end: int
+    order_id: str
+
+
+class BookingLockTimeout(Exception):
+    """A vehicle stayed locked by another booking for too long"""
+
+
+class BookingConflict(NamedTuple):
+    vehicle_id: str
+    order_id: str
+    order_number: Optional[str]
+    start_date: date
+    end_date: date
+
+
+class _VehicleBookings:
+    """Bookings of one vehicle sorted by start, with the running maximum of
+    their ends so that an overlap query stops as soon as no earlier booking
+    can reach the queried start."""
+
+    __slots__ = ("bookings", "max_ends")
+
+    def __init__(self):
+        self.bookings: List[Booking] = []
+        self.max_ends: List[int] = []
+
+    def _refresh(self, position: int = 0) -> None:
+        del self.max_ends[position:]
+        running = self.max_ends[-1] if self.max_ends else None
+        for booking in self.bookings[position:]:
+            running = booking.end if running is None else max(running, booking.end)
+            self.max_ends.append(running)
+
+    def add(self, booking: Booking) -> None:
+        position = bisect_right(self.bookings, booking)
+        self.bookings.insert(position, booking)
+        # Bookings mostly arrive in chronological order, only the tail is refreshed
+        self._refresh(position)
+
+    def remove_order(self, order_id: str) -> None:
+        self.bookings = [booking for booking in self.bookings if booking.order_id != order_id]
+        self._refresh()
+
+    def overlapping(self, start: int, end: int) -> Iterable[Booking]:
+        position = bisect_right(self.bookings, (end, float("inf")))
+        for i in range(position - 1, -1, -1):
+            if self.max_ends[i] < start:
+                break
+            if self.bookings[i].end >= start:
+                yield self.bookings[i]
+
+
+def _day(value) -> Optional[int]:
+    value = to_datetime(value)
+    return value.date().toordinal() if value is not None else None
+
+
+class BookingIndex:
+    """In-memory per-vehicle index of the booked periods of orders.
+
+    Rebuilt from orders.items at startup and every few minutes, and kept up
+    to date by the order endpoints and the renewal job, so availability
+    checks never scan the orders collection. An order and its renewals
+    (renewed_from chain) form one rental and never conflict with each other.
+
+    Reads may lag behind the bookings made by other workers until the next
+    refresh, but reservations do not rely on the index: they lock the
+    vehicles in the booking_locks collection and check the orders stored in
+    MongoDB, so two workers can never book the same period.
+    """
+
+    def __init__(self):
+        self._vehicles: Dict[str, _VehicleBookings] = {}
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self.refresh_seconds = float(os.environ.get('BOOKING_INDEX_REFRESH_SECONDS', '300'))
+        self.lock_seconds = float(os.environ.get('BOOKING_LOCK_SECONDS', '30'))
+        self.lock_wait_seconds = float(os.environ.get('BOOKING_LOCK_WAIT_SECONDS', '10'))
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+
+    async def rebuild(self, db) -> int:
+        started = time.perf_counter()
+        fresh = BookingIndex()
+        async for order in db.orders.find({}, ORDER_PROJECTION):
+            fresh.register(order)
+        # Swap at once, reads never see a half-built index
+        self._vehicles, self._orders = fresh._vehicles, fresh._orders
+        self.logger.info(
+            f"Booking index rebuilt: {len(self._orders)} orders in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return len(self._orders)
+
+    def start_refresh(self, db) -> None:
+        """Rebuild the index periodically to pick up other workers' bookings"""
+        if self.refresh_seconds > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(db))
+
+    async def stop_refresh(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    async def _refresh_loop(self, db) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.rebuild(db)
+            except Exception as e:
+                self.logger.error(f"Booking index refresh failed: {e}")
+
+    def _root(self, order: Dict[str, Any]) -> str:
+        """First order of the renewal chain the order belongs to"""
+        root, parent = order["id"], order.get("renewed_from")
+        while parent is not None:
+            root = parent
+            parent = self._orders[parent]["renewed_from"] if parent in self._orders else None
+        return root
+
+    def _bookings(self, order: Dict[str, Any]) -> List[Tuple[str, Booking]]:
+        bookings = []
+        for item in order.get("items") or ():
+            start, end = _day(item.get("start_date")), _day(item.get("end_date"))
+            if start is not None and end is not None:
+                bookings.append((item["vehicle_id"], Booking(start, end, order["id"])))
+        return bookings
+
+    def register(self, order: Dict[str, Any]) -> None:
+        """Add or replace the bookings of an order (Mongo document or model dict)"""
+        self.unregister(order["id"])
+        if order.get("status") in RELEASED_ORDER_STATUSES:
+            return
+        bookings = self._bookings(order)
+        self._orders[order["id"]] = {
+            "renewed_from": order.get("renewed_from"),
+            "order_number": order.get("order_number"),
+            "vehicles": {vehicle_id for vehicle_id, _ in bookings}
+        }
+        for vehicle_id, booking in bookings:
+            self._vehicles.setdefault(vehicle_id, _VehicleBookings()).add(booking)
+
+    def unregister(self, order_id: str) -> None:
+        registered = self._orders.pop(order_id, None)
+        if registered:
+            for vehicle_id in registered["vehicles"]:
+                self._vehicles[vehicle_id].remove_order(order_id)
+
+    def vehicle_conflicts(
+        self, vehicle_id: str, start: int, end: int, root: Optional[str] = None
+    ) -> List[BookingConflict]:
+        vehicle = self._vehicles.get(vehicle_id)
+        if vehicle is None:
+            return []
+        conflicts = []
+        for booking in vehicle.overlapping(start, end):
+            registered = self._orders[booking.order_id]
+            if root is not None and self._root({"id": booking.order_id, **registered}) == root:
+                continue
+            conflicts.append(BookingConflict(
+                vehicle_id, booking.order_id, registered["order_number"],
+                date.fromordinal(booking.start), date.fromordinal(booking.end)
+            ))
+        # overlapping() walks backwards, return the bookings chronologically
+        conflicts.reverse()
+        return conflicts
+
+    def conflicts(self, order: Dict[str, Any]) -> List[BookingConflict]:
+        """Bookings of other rentals overlapping the items of an order"""
+        root = self._root(order)
+        conflicts = []
+        bookings = self._bookings(order)
+        for i, (vehicle_id, booking) in enumerate(bookings):
+            conflicts.extend(self.vehicle_conflicts(vehicle_id, booking.start, booking.end, root))
+            # The same vehicle twice in the order for overlapping periods
+            for other_vehicle_id, other in bookings[:i]:
+                if other_vehicle_id == vehicle_id and other.start <= booking.end and booking.start <= other.end:
+                    conflicts.append(BookingConflict(
+                        vehicle_id, order["id"], order.get("order_number"),
+                        date.fromordinal(other.start), date.fromordinal(other.end)
+                    ))
+        return conflicts
+
+    @asynccontextmanager
+    async def _locked(self, db, vehicle_ids: List[str]) -> AsyncIterator[None]:
+        """Hold the booking lease of every vehicle.
+
+        All the leases are requested in one bulk write; when one of them is
+        held by another booking, those taken are released and the whole set
+        is tried again, so two orders sharing vehicles cannot deadlock.
+        """
+        owner = str(uuid.uuid4())
+        deadline = time.monotonic() + self.lock_wait_seconds
+        delay = 0.01
+        locked = []
+        try:
+            while vehicle_ids:
+                now = datetime.now(timezone.utc)
+                try:
+                    await db.booking_locks.bulk_write([
+                        UpdateOne(
+                            {"_id": vehicle_id, "expires_at": {"$lte": now}},
+                            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=self.lock_seconds)}},
+                            upsert=True
+                        )
+                        for vehicle_id in vehicle_ids
+                    ], ordered=False)
+                    locked = vehicle_ids
+                    break
+                except BulkWriteError as e:
+                    errors = e.details["writeErrors"]
+                    if any(error["code"] != 11000 for error in errors):
+                        raise
+                # Some are held by other bookings: give back the others and wait
+                held = {error["index"] for error in errors}
+                await db.booking_locks.delete_many({
+                    "_id": {"$in": [vehicle_id for i, vehicle_id in enumerate(vehicle_ids) if i not in held]},
+                    "owner": owner
+                })
+                if time.monotonic() > deadline:
+                    raise BookingLockTimeout(vehicle_ids[min(held)])
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+            yield
+        finally:
+            if locked:
+                await db.booking_locks.delete_many({"_id": {"$in": locked}, "owner": owner})
+
+    async def reserve(
+        self, db, order: Dict[str, Any], write: Callable[[], Awaitable[Any]]
+    ) -> List[BookingConflict]:
+        """Write the order unless it conflicts, returns the conflicts.
+
+        The order's vehicles stay locked from the check until the write
+        (write() inserts or replaces the order) is done, and the check runs
+        against the orders stored in MongoDB, so concurrent requests on any
+        worker cannot book the same period. Raises BookingLockTimeout if a
+        vehicle stays locked longer than BOOKING_LOCK_WAIT_SECONDS.
+        """
+        vehicle_ids = list({vehicle_id for vehicle_id, _ in self._bookings(order)})
+        async with self._locked(db, vehicle_ids):
+            stored = BookingIndex()
+            if vehicle_ids:
+                async for other in db.orders.find({
+                    "items.vehicle_id": {"$in": vehicle_ids},
+                    "id": {"$ne": order["id"]},
+                    "status": {"$nin": list(RELEASED_ORDER_STATUSES)}
+                }, ORDER_PROJECTION):
+                    stored.register(other)
+            conflicts = stored.conflicts(order)
+            if conflicts:
+                return conflicts
+            await write()
+        self.register(order)
+        return []
+
+    def availability(
+        self, vehicle_ids: Iterable[str], start_date: datetime, end_date: datetime
+    ) -> Dict[str, List[BookingConflict]]:
+        start, end = _day(start_date), _day(end_date)
+        return {vehicle_id: self.vehicle_conflicts(vehicle_id, start, end) for vehicle_id in vehicle_ids}
+
+    def intervals(self, vehicle_ids: Iterable[str], start_date: date, end_date: date) -> List[Tuple[int, int, int]]:
+        """(vehicle position, first day, last day) of the bookings overlapping
+        the period, days counted from start_date"""
+        origin, end = start_date.toordinal(), end_date.toordinal()
+        intervals = []
+        for row, vehicle_id in enumerate(vehicle_ids):
+            vehicle = self._vehicles.get(vehicle_id)
+            if vehicle is not None:
+                intervals.extend(
+                    (row, booking.start - origin, booking.end - origin)
+                    for booking in vehicle.overlapping(origin, end)
+                )
+        return intervals
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'orders': len(self._orders),
+            'vehicles': len(self._vehicles),
+            'bookings': sum(len(vehicle.bookings) for vehicle in self._vehicles.values())
+        }
+
+
+# Instance globale du service
+booking_index = BookingIndex()
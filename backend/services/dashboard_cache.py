@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class DashboardCache:
+    """Short-lived in-process cache of the dashboard payload.
+
+    The dashboard is the same for every user, so a single entry is kept.
+    Invoice and payment writes invalidate it; a generation counter makes
+    sure a payload computed before an invalidation is never stored after it.
+    """
+
+    def __init__(self):
+        self.ttl_seconds = float(os.environ.get('DASHBOARD_CACHE_TTL_SECONDS', '30'))
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._entry: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self) -> Optional[Any]:
+        """Return the cached payload or None if absent or expired"""
+        with self._lock:
+            if not self.enabled or self._entry is None or self._entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entry[1]
+
+    def set(self, payload: Any, generation: int) -> None:
+        """Store a payload computed while `generation` was current"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._entry = (time.monotonic() + self.ttl_seconds, payload)
+
+    async def get_or_compute(self, compute: Callable) -> Any:
+        payload = self.get()
+        if payload is None:
+            generation = self.generation
+            payload = await compute()
+            self.set(payload, generation)
+        return payload
+
+    def invalidate(self) -> None:
+        """Drop the payload after an invoice or payment write"""
+        with self._lock:
+            self._generation += 1
+            if self._entry is not None:
+                self._entry = None
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'cached': self._entry is not None,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations
+        }
+
+
+# Instance globale du service
+dashboard_cache = DashboardCache()
@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing on a dedicated bounded thread pool.
+
+    bcrypt releases the GIL, so a small pool keeps login bursts off the
+    event loop. Requests beyond the queue limit are rejected with a 503
+    instead of piling up behind each other.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+        self.max_pending = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '32'))
+        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="password-hash"
+        )
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {
+            'hash': deque(maxlen=512),
+            'verify': deque(maxlen=512)
+        }
+        self._counts = {'hash': 0, 'verify': 0}
+        self.logger = logging.getLogger(__name__)
+
+    async def hash(self, password: str) -> str:
+        return await self._run('hash', self.pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run('verify', self.pwd_context.verify, plain_password, hashed_password)
+
+    async def _run(self, operation: str, func: Callable, *args) -> Any:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                self.logger.warning(f"Password hashing queue full ({self.pending} pending), rejecting request")
+                raise HTTPException(
+                    status_code=503,
+                    detail="Authentication service busy, please retry",
+                    headers={"Retry-After": "1"}
+                )
+            self.pending += 1
+
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.pending -= 1
+                self._counts[operation] += 1
+                self._latencies[operation].append(elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        result = {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'rejected': self.rejected
+        }
+        with self._lock:
+            for operation, samples in self._latencies.items():
+                ordered = sorted(samples)
+                result[operation] = {
+                    'count': self._counts[operation],
+                    'avg_ms': round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+                    'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1], 2) if ordered else 0.0,
+                    'max_ms': round(ordered[-1], 2) if ordered else 0.0
+                }
+        return result
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+# Instance globale du service
+password_hasher = PasswordHasher()
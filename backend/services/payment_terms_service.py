@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict
+from payment_terms import DUE_DAYS_BUCKETS, LATE_PAYMENT_CLAUSE, has_legal_mentions
+
+
+class PaymentTermsService:
+    """Optional LLM wording of the late payment clause of invoices.
+
+    The texts are generated ahead of time, one per due-days bucket, by the
+    payment_terms job and stored in the payment_terms collection. PDF
+    rendering only reads them (reloaded every few minutes) and falls back
+    to the template clause, so it never waits on the network. Enabled by
+    PAYMENT_TERMS_LLM=true with EMERGENT_LLM_KEY set.
+    """
+
+    def __init__(self):
+        self.api_key = os.environ.get('EMERGENT_LLM_KEY')
+        self.enabled = os.environ.get('PAYMENT_TERMS_LLM', 'false').lower() == 'true' and bool(self.api_key)
+        self.reload_seconds = float(os.environ.get('PAYMENT_TERMS_RELOAD_SECONDS', '300'))
+        self._clauses: Dict[str, str] = {}
+        self._loaded_at = None
+        self.logger = logging.getLogger(__name__)
+
+    async def clauses(self, db) -> Dict[str, str]:
+        """Generated clauses by due-days bucket, empty when disabled"""
+        if not self.enabled:
+            return {}
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_seconds:
+            self._loaded_at = time.monotonic()
+            documents = await db.payment_terms.find({}, {"_id": 1, "clause": 1}).to_list(length=None)
+            self._clauses = {document["_id"]: document["clause"] for document in documents}
+        return self._clauses
+
+    async def _generate(self, bucket: str) -> str:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=f"payment_terms_{bucket}",
+            system_message="Vous êtes un expert comptable français. Rédigez des conditions de paiement professionnelles."
+        ).with_model("openai", "gpt-4o-mini")
+        prompt = f"""
+        Reformulez en français, de façon professionnelle et en 3 lignes maximum, la clause suivante
+        d'une facture de location de véhicules payable {bucket.replace('_', ' ')} :
+
+        {LATE_PAYMENT_CLAUSE}
+
+        Conservez toutes les mentions légales (taux des pénalités, indemnité de 40 €, absence d'escompte).
+        Ne mentionnez ni montant, ni date, ni délai de paiement.
+        """
+        response = await chat.send_message(UserMessage(text=prompt))
+        return (response or "").strip()
+
+    async def refresh(self, db) -> Dict[str, Any]:
+        """Generate the clause of every bucket, keeping the previous text on failure.
+
+        Buckets whose wording differs from the previous one are listed in
+        changed, their invoice PDFs are out of date.
+        """
+        if not self.enabled:
+            return {"enabled": False}
+        generated, changed, failed = [], [], []
+        for bucket, _ in DUE_DAYS_BUCKETS:
+            try:
+                clause = await self._generate(bucket)
+                # Keep only texts that still carry the mandatory mentions
+                if not clause or len(clause) > 600 or not has_legal_mentions(clause):
+                    raise ValueError(f"unusable text: {clause[:80]!r}")
+                previous = await db.payment_terms.find_one_and_replace(
+                    {"_id": bucket},
+                    {"clause": clause, "model": "gpt-4o-mini", "generated_at": datetime.now(timezone.utc)},
+                    projection={"clause": 1},
+                    upsert=True
+                )
+                generated.append(bucket)
+                if not previous or previous.get("clause") != clause:
+                    changed.append(bucket)
+            except Exception as e:
+                self.logger.warning(f"Payment terms for {bucket} not generated: {e}")
+                failed.append(bucket)
+        self._loaded_at = None
+        return {"enabled": True, "generated": generated, "changed": changed, "failed": failed}
+
+
+# Instance globale du service
+payment_terms_service = PaymentTermsService()
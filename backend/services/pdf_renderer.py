@@ -0,0 +1,113 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+from pdf_generator import render_invoice_pdf, warm_up
+
+
+class PdfRenderer:
+    """Renders invoice PDFs on a pool of worker processes.
+
+    reportlab is pure Python and holds the GIL, so rendering on the event
+    loop (or on a thread) stalls every other request. Workers receive the
+    plain payload of pdf_generator.build_pdf_payload and send back the PDF
+    bytes. Requests beyond the queue limit are rejected with a 503 that
+    reports the queue depth.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.environ.get('PDF_RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self.max_pending = int(os.environ.get('PDF_RENDER_MAX_QUEUE', '64'))
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.rejected = 0
+        self.rendered = 0
+        self.failed = 0
+        self.restarts = 0
+        self._latencies = deque(maxlen=512)
+        self.logger = logging.getLogger(__name__)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            # spawn: forking the API process would copy its event loop and Mongo client
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self.executor
+
+    async def start(self) -> None:
+        """Start the workers and render a first invoice in each of them"""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        await asyncio.gather(*(loop.run_in_executor(pool, warm_up) for _ in range(self.max_workers)))
+        self.logger.info(f"PDF renderer: {self.max_workers} workers ready in {time.perf_counter() - started:.2f}s")
+
+    def queue_depth(self) -> int:
+        """Renderings waiting for a free worker"""
+        return max(0, self.pending - self.max_workers)
+
+    async def render(self, payload: Dict[str, Any]) -> bytes:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            self.logger.warning(f"PDF rendering queue full ({self.queue_depth()} queued), rejecting request")
+            raise HTTPException(
+                status_code=503,
+                detail=f"PDF rendering busy ({self.queue_depth()} queued), please retry",
+                headers={"Retry-After": "2", "X-Queue-Depth": str(self.queue_depth())}
+            )
+        self.pending += 1
+
+        started = time.perf_counter()
+        pool = self._pool()
+        try:
+            loop = asyncio.get_running_loop()
+            pdf_bytes = await loop.run_in_executor(pool, render_invoice_pdf, payload)
+            self.rendered += 1
+            self._latencies.append((time.perf_counter() - started) * 1000)
+            return pdf_bytes
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory): start a new pool for the next requests
+            self.failed += 1
+            if self.executor is pool:
+                self.restarts += 1
+                self.executor = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'queue_depth': self.queue_depth(),
+            'rejected': self.rejected,
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'restarts': self.restarts,
+            'avg_ms': round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1], 2) if ordered else 0.0,
+            'max_ms': round(ordered[-1], 2) if ordered else 0.0
+        }
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Instance globale du service
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,257 @@
+import os
+import time
+import random
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional
+from zoneinfo import ZoneInfo
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+class CronSchedule:
+    """Standard 5-field cron expression: minute hour day-of-month month day-of-week.
+
+    Fields accept *, lists (1,15), ranges (1-5) and steps (*/10, 8-18/2);
+    day of week goes from 0 (Sunday) to 6. As in cron, when both day fields
+    are restricted a day matches if either of them does.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression: {expression}")
+        self.expression = expression
+        self.minutes = self._parse(fields[0], 0, 59)
+        self.hours = self._parse(fields[1], 0, 23)
+        self.days = self._parse(fields[2], 1, 31)
+        self.months = self._parse(fields[3], 1, 12)
+        self.weekdays = self._parse(fields[4], 0, 6)
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> FrozenSet[int]:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_value = part.split("/")
+                step = int(step_value)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = map(int, part.split("-"))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"Invalid cron field: {field}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_matches = moment.day in self.days
+        weekday_matches = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_matches and weekday_matches
+        return day_matches or weekday_matches
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after a naive wall-clock time"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression}")
+
+
+class Job:
+    def __init__(
+        self, name: str, cron: str, func: Callable[[], Awaitable[Any]],
+        jitter_seconds: float, lease_seconds: float
+    ):
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.func = func
+        self.jitter_seconds = jitter_seconds
+        self.lease_seconds = lease_seconds
+
+
+class JobAlreadyRunning(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    """Raised by a job that ran to the end without doing its work, the run
+    is recorded as failed along with the job's result"""
+
+    def __init__(self, message: str, result: Any = None):
+        super().__init__(message)
+        self.result = result
+
+
+class Scheduler:
+    """In-process cron scheduler safe to run on several workers or nodes.
+
+    Every worker schedules every job, but a run first takes the job's lease
+    in the scheduler_locks collection: the lease is granted for one slot
+    (the cron time being run) and only if it is not held, so a slot runs
+    once whatever the number of workers. The lease is extended while the
+    job runs and expires on its own if the worker dies. Each run is
+    recorded in scheduler_runs. Runs are delayed by a random jitter to
+    spread the load of jobs sharing a slot. Manual runs take the lease
+    without claiming a slot, so they never skip the next scheduled run.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+        self.timezone = ZoneInfo(os.environ.get('SCHEDULER_TIMEZONE', 'Europe/Paris'))
+        self.default_jitter = float(os.environ.get('SCHEDULER_JITTER_SECONDS', '300'))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs: Dict[str, Job] = {}
+        self.db = None
+        self._tasks: List[asyncio.Task] = []
+        self.logger = logging.getLogger(__name__)
+
+    def add_job(
+        self, name: str, cron: str, func: Callable[[], Awaitable[Any]],
+        jitter_seconds: Optional[float] = None, lease_seconds: float = 600
+    ) -> None:
+        jitter = self.default_jitter if jitter_seconds is None else jitter_seconds
+        self.jobs[name] = Job(name, cron, func, jitter, lease_seconds)
+
+    def start(self, db) -> None:
+        self.db = db
+        if not self.enabled:
+            self.logger.info("Scheduler disabled (SCHEDULER_ENABLED=false)")
+            return
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job)))
+        self.logger.info(f"Scheduler started with {len(self.jobs)} jobs as {self.owner}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def next_slot(self, job: Job) -> datetime:
+        now = datetime.now(self.timezone).replace(tzinfo=None)
+        return job.schedule.next_after(now).replace(tzinfo=self.timezone)
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            slot = self.next_slot(job)
+            delay = (slot - datetime.now(self.timezone)).total_seconds()
+            await asyncio.sleep(max(0.0, delay) + random.uniform(0, job.jitter_seconds))
+            try:
+                await self.run(job.name, slot)
+            except JobAlreadyRunning:
+                self.logger.info(f"Job {job.name} at {slot} already taken by another worker")
+            except Exception as e:
+                self.logger.error(f"Job {job.name} at {slot} could not run: {e}")
+
+    async def _acquire(self, job: Job, slot: Optional[datetime]) -> bool:
+        """Take the job's lease for a slot, or for a manual run if slot is None"""
+        now = datetime.now(timezone.utc)
+        query = {"_id": job.name, "expires_at": {"$lte": now}}
+        lease = {
+            "owner": self.owner,
+            "acquired_at": now,
+            "expires_at": now + timedelta(seconds=job.lease_seconds)
+        }
+        if slot is None:
+            update = {"$set": lease, "$setOnInsert": {"slot": datetime.min.replace(tzinfo=timezone.utc)}}
+        else:
+            query["slot"] = {"$lt": slot}
+            update = {"$set": {**lease, "slot": slot}}
+        try:
+            lock = await self.db.scheduler_locks.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The lock exists and is held, or this slot already ran
+            return False
+        return lock is not None
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(job.lease_seconds / 3)
+            await self.db.scheduler_locks.update_one(
+                {"_id": job.name, "owner": self.owner},
+                {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=job.lease_seconds)}}
+            )
+
+    async def run(self, name: str, slot: Optional[datetime] = None) -> Dict[str, Any]:
+        """Run a job for a slot (now for manual runs) and record the run.
+
+        Raises JobAlreadyRunning if the lease is held or the slot already ran.
+        """
+        job = self.jobs[name]
+        if not await self._acquire(job, slot):
+            raise JobAlreadyRunning(name)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.perf_counter()
+        run = {
+            "job": name,
+            "owner": self.owner,
+            "slot": slot or datetime.now(self.timezone),
+            "manual": slot is None,
+            "started_at": datetime.now(timezone.utc)
+        }
+        try:
+            run["result"] = await job.func()
+            run["status"] = "success"
+        except JobFailed as e:
+            self.logger.error(f"Job {name} failed: {e}")
+            run["status"] = "failed"
+            run["error"] = str(e)
+            run["result"] = e.result
+        except Exception as e:
+            self.logger.exception(f"Job {name} failed")
+            run["status"] = "failed"
+            run["error"] = str(e)
+        finally:
+            heartbeat.cancel()
+            run["finished_at"] = datetime.now(timezone.utc)
+            run["duration_ms"] = round((time.perf_counter() - started) * 1000)
+            await self.db.scheduler_runs.insert_one(dict(run))
+            await self.db.scheduler_locks.update_one(
+                {"_id": name, "owner": self.owner},
+                {"$set": {"expires_at": run["finished_at"]}}
+            )
+        self.logger.info(f"Job {name} {run['status']} in {run['duration_ms']} ms")
+        return run
+
+    async def status(self, history: int = 10) -> List[Dict[str, Any]]:
+        """Jobs with their next slot and latest runs"""
+        jobs = []
+        for job in self.jobs.values():
+            runs = await self.db.scheduler_runs.find(
+                {"job": job.name}, {"_id": 0}
+            ).sort("started_at", -1).limit(history).to_list(history)
+            jobs.append({
+                "name": job.name,
+                "cron": job.schedule.expression,
+                "jitter_seconds": job.jitter_seconds,
+                "next_slot": self.next_slot(job),
+                "runs": runs
+            })
+        return jobs
+
+
+# Instance globale du service
+scheduler = Scheduler()
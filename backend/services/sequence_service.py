@@ -0,0 +1,76 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from pymongo import ReturnDocument
+
+
+class SequenceAllocator:
+    """Allocates document numbers from a Mongo counters collection.
+
+    Each series gets one counter per year, incremented atomically with
+    find_one_and_update($inc), so numbering is O(1) and never hands out
+    the same number twice across requests, workers or nodes.
+
+    Series listed in ``block_sizes`` reserve numbers in blocks to save
+    round trips; unused numbers of a block are lost when the process
+    stops, so gapless series (invoices) must keep a block size of 1.
+    """
+
+    def __init__(self, collection, block_sizes: Optional[Dict[str, int]] = None):
+        self.collection = collection
+        self.block_sizes = block_sizes or {}
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.logger = logging.getLogger(__name__)
+
+    async def next_value(self, series: str, year: int) -> int:
+        key = f"{series}-{year}"
+        block_size = max(1, self.block_sizes.get(series, 1))
+        if block_size == 1:
+            return await self._reserve(key, 1)
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            current, last = self._blocks.get(key, (0, -1))
+            if current > last:
+                last = await self._reserve(key, block_size)
+                current = last - block_size + 1
+            self._blocks[key] = (current + 1, last)
+            return current
+
+    async def next_number(self, series: str, prefix: str, date: Optional[datetime] = None) -> str:
+        """Return the next formatted number, e.g. FACT2025-000042"""
+        year = (date or datetime.now(timezone.utc)).year
+        value = await self.next_value(series, year)
+        return f"{prefix}{year}-{value:06d}"
+
+    async def next_numbers(
+        self, series: str, prefix: str, count: int, date: Optional[datetime] = None
+    ) -> List[str]:
+        """Reserve ``count`` consecutive numbers in a single round trip.
+
+        Meant for bulk inserts: the caller must use every number returned.
+        """
+        if count <= 0:
+            return []
+        year = (date or datetime.now(timezone.utc)).year
+        last = await self._reserve(f"{series}-{year}", count)
+        return [f"{prefix}{year}-{value:06d}" for value in range(last - count + 1, last + 1)]
+
+    async def _reserve(self, key: str, count: int) -> int:
+        """Atomically reserve ``count`` values and return the last one"""
+        counter = await self.collection.find_one_and_update(
+            {"_id": key},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+
+def block_sizes_from_env() -> Dict[str, int]:
+    block_size = int(os.environ.get('SEQUENCE_BLOCK_SIZE', '1'))
+    # Invoice numbers must stay gapless (numérotation continue), never pre-allocate them
+    return {"orders": block_size, "renewal_orders": block_size, "invoices": 1}
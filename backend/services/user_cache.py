@@ -0,0 +1,91 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class UserPrincipalCache:
+    """In-process LRU cache of authenticated users with a TTL.
+
+    Entries are keyed by username so that a user can be invalidated as soon
+    as their record changes, whatever token they authenticated with.
+    """
+
+    def __init__(self):
+        self.ttl_seconds = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+        self.max_size = int(os.environ.get('USER_CACHE_MAX_SIZE', '1024'))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, username: str) -> Optional[Any]:
+        """Return the cached user or None if absent or expired"""
+        if not self.enabled:
+            self.misses += 1
+            return None
+
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[username]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return user
+
+    def set(self, username: str, user: Any) -> None:
+        """Store a user, evicting the least recently used entries when full"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, username: str) -> None:
+        """Drop a user so the next request reloads it from the database"""
+        with self._lock:
+            if self._entries.pop(username, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+
+# Instance globale du service
+user_cache = UserPrincipalCache()
@@ -0,0 +1,39 @@
+import zipfile
+from typing import List
+
+
+class ZipStream:
+    """ZIP archive built on the fly.
+
+    zipfile writes to this object as to an unseekable file (local headers
+    followed by data descriptors), and every add() hands back the archive
+    bytes written so far, so a streamed response never holds more than the
+    entry being added.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._chunks: List[bytes] = []
+        self._zip = zipfile.ZipFile(self, mode="w", compression=compression)
+
+    # File protocol used by zipfile, no tell()/seek() on purpose
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def _drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+    def add(self, name: str, data: bytes) -> bytes:
+        """Add an entry and return the bytes to send"""
+        self._zip.writestr(name, data)
+        return self._drain()
+
+    def close(self) -> bytes:
+        """Write the central directory and return the last bytes to send"""
+        self._zip.close()
+        return self._drain()
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { Calendar, Download, FileText, TrendingUp, Calculator } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -28,7 +29,7 @@ const AccountingDashboard = () => {
             end_date: dateRange.end_date
           }
         }),
-        axios.get(`${API}/accounting/entries`, {
+        getAllPages(`${API}/accounting/entries`, {
           params: {
             start_date: dateRange.start_date,
             end_date: dateRange.end_date
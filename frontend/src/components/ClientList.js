@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { Plus, Edit, Eye, Search } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -17,7 +17,7 @@ const ClientList = () => {
 
   const fetchClients = async () => {
     try {
-      const response = await axios.get(`${API}/clients`);
+      const response = await getAllPages(`${API}/clients`);
       setClients(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des clients:', error);
@@ -17,24 +17,16 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchDashboardData();
-    fetchOverdueInvoices();
   }, []);
 
   const fetchDashboardData = async () => {
     try {
       const response = await axios.get(`${API}/dashboard`);
       setDashboardData(response.data);
+      // Les factures en retard les plus anciennes sont incluses dans la réponse
+      setOverdueInvoices(response.data.overdue_invoices || []);
     } catch (error) {
       console.error('Erreur lors du chargement du tableau de bord:', error);
-    }
-  };
-
-  const fetchOverdueInvoices = async () => {
-    try {
-      const response = await axios.get(`${API}/invoices/overdue`);
-      setOverdueInvoices(response.data);
-    } catch (error) {
-      console.error('Erreur lors du chargement des factures impayées:', error);
     } finally {
       setLoading(false);
     }
@@ -58,10 +50,11 @@ const Dashboard = () => {
       </div>
 
       {/* Alertes factures impayées */}
-      {dashboardData.overdue_invoices > 0 && (
+      {dashboardData.stats?.overdue_invoices > 0 && (
         <div className="alert alert-warning">
           <AlertTriangle className="inline mr-2" size={20} />
-          <strong>Attention !</strong> Vous avez {dashboardData.overdue_invoices} facture(s) en retard de paiement.
+          <strong>Attention !</strong> Vous avez {dashboardData.stats.overdue_invoices} facture(s) en retard de paiement
+          ({dashboardData.stats.overdue_amount.toFixed(2)} € restant dus).
         </div>
       )}
 
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { Search, Receipt, Download, CheckCircle, AlertTriangle, FileText, Loader, CreditCard } from 'lucide-react';
 import InvoicePayments from './InvoicePayments';
 
@@ -23,8 +24,8 @@ const InvoiceList = () => {
   const fetchData = async () => {
     try {
       const [invoicesRes, clientsRes] = await Promise.all([
-        axios.get(`${API}/invoices`),
-        axios.get(`${API}/clients`)
+        getAllPages(`${API}/invoices`),
+        getAllPages(`${API}/clients`)
       ]);
       
       setInvoices(invoicesRes.data);
@@ -63,10 +64,8 @@ const InvoiceList = () => {
     return classes[status] || 'status-info';
   };
 
-  const isOverdue = (invoice) => {
-    if (invoice.status === 'paid' || invoice.status === 'cancelled') return false;
-    return new Date(invoice.due_date) < new Date();
-  };
+  // Flagged every night by the backend invoice_overdue job
+  const isOverdue = (invoice) => invoice.status === 'overdue';
 
   const markAsPaid = async (invoiceId) => {
     try {
@@ -297,7 +296,7 @@ const InvoiceList = () => {
                         </span>
                       </td>
                       <td>
-                        {invoice.pdf_data ? (
+                        {invoice.pdf_blob_id || invoice.pdf_legacy ? (
                           <button
                             onClick={() => downloadPdf(invoice.id)}
                             className="btn btn-sm btn-secondary"
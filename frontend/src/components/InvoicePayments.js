@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { CreditCard, Plus, Trash2, Calendar, DollarSign, FileText, AlertCircle, CheckCircle } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -29,7 +30,7 @@ const InvoicePayments = ({ invoice, onPaymentUpdate }) => {
   const loadPayments = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API}/invoices/${invoice.id}/payments`);
+      const response = await getAllPages(`${API}/invoices/${invoice.id}/payments`);
       setPayments(response.data);
     } catch (error) {
       console.error('Erreur chargement paiements:', error);
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { 
   Save, 
   ArrowLeft, 
@@ -51,7 +52,7 @@ const MaintenanceForm = () => {
 
   const fetchVehicles = async () => {
     try {
-      const response = await axios.get(`${API}/vehicles`);
+      const response = await getAllPages(`${API}/vehicles`);
       setVehicles(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des véhicules:', error);
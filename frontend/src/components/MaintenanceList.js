@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { 
   Plus, 
   Search, 
@@ -36,8 +37,8 @@ const MaintenanceList = () => {
     try {
       setLoading(true);
       const [maintenanceResponse, vehiclesResponse] = await Promise.all([
-        axios.get(`${API}/maintenance`),
-        axios.get(`${API}/vehicles`)
+        getAllPages(`${API}/maintenance`),
+        getAllPages(`${API}/vehicles`)
       ]);
       
       setMaintenanceRecords(maintenanceResponse.data);
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { Save, ArrowLeft, Plus, Trash2, Calendar } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -38,8 +39,8 @@ const OrderForm = () => {
   const fetchData = async () => {
     try {
       const [clientsRes, vehiclesRes] = await Promise.all([
-        axios.get(`${API}/clients`),
-        axios.get(`${API}/vehicles`)
+        getAllPages(`${API}/clients`),
+        getAllPages(`${API}/vehicles`)
       ]);
       
       setClients(clientsRes.data);
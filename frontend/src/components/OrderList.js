@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { Plus, Eye, Search, FileText, Calendar } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -23,9 +24,9 @@ const OrderList = () => {
   const fetchData = async () => {
     try {
       const [ordersRes, clientsRes, vehiclesRes] = await Promise.all([
-        axios.get(`${API}/orders`),
-        axios.get(`${API}/clients`),
-        axios.get(`${API}/vehicles`)
+        getAllPages(`${API}/orders`),
+        getAllPages(`${API}/clients`),
+        getAllPages(`${API}/vehicles`)
       ]);
       
       setOrders(ordersRes.data);
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { getAllPages } from '../lib/pagination';
 import { Upload, FileText, Eye, Download, Trash2, Edit, Plus, X } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -25,7 +26,7 @@ const VehicleDocuments = ({ vehicleId, onDocumentUpdate }) => {
   const fetchDocuments = async () => {
     setLoading(true);
     try {
-      const response = await axios.get(`${API}/vehicles/${vehicleId}/documents`);
+      const response = await getAllPages(`${API}/vehicles/${vehicleId}/documents`);
       setDocuments(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des documents:', error);
@@ -0,0 +1,20 @@
+import axios from 'axios';
+
+// Les listes de l'API sont paginées : la page suivante est désignée par
+// l'en-tête X-Next-Cursor, absent sur la dernière page.
+const NEXT_CURSOR_HEADER = 'x-next-cursor';
+
+// GET d'une liste complète en suivant les curseurs, même forme qu'une réponse axios
+export async function getAllPages(url, config = {}) {
+  const data = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, {
+      ...config,
+      params: { ...config.params, ...(cursor ? { cursor } : {}) }
+    });
+    data.push(...response.data);
+    cursor = response.headers[NEXT_CURSOR_HEADER];
+  } while (cursor);
+  return { data };
+}
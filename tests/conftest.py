@@ -0,0 +1,121 @@
+"""Runs the API in-process against a real MongoDB server (MONGO_URL, default
+mongodb://localhost:27017) in a throwaway database; the tests are skipped
+when no server is reachable.
+"""
+import os
+import sys
+import tempfile
+import uuid
+from collections import Counter
+import pytest
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = f"test_{uuid.uuid4().hex[:8]}"
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Records (command, collection) of every command sent to the server"""
+
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        if event.database_name == DB_NAME:
+            collection = event.command.get(event.command_name)
+            self.commands[(event.command_name, collection if isinstance(collection, str) else None)] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.commands.clear()
+
+    @property
+    def total(self):
+        return sum(self.commands.values())
+
+
+# Global listeners only apply to clients created afterwards, i.e. the server's
+recorder = CommandRecorder()
+monitoring.register(recorder)
+
+
+@pytest.fixture(scope="session")
+def server():
+    try:
+        MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000).admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {MONGO_URL}")
+    os.environ["MONGO_URL"] = MONGO_URL
+    os.environ["DB_NAME"] = DB_NAME
+    os.environ["SCHEDULER_ENABLED"] = "false"
+    # Some tests store legacy ISO string dates
+    os.environ.setdefault("LEGACY_STRING_DATES", "true")
+    os.environ["PDF_STORAGE_DIR"] = tempfile.mkdtemp(prefix="test_pdfs_")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+    import server
+    yield server
+    MongoClient(MONGO_URL).drop_database(DB_NAME)
+
+
+@pytest.fixture(scope="session")
+def api(server):
+    from fastapi.testclient import TestClient
+    with TestClient(server.app) as client:
+        client.post("/api/auth/register", json={
+            "username": "tester", "email": "tester@example.fr",
+            "password": "secret", "full_name": "Test User"
+        })
+        token = client.post("/api/auth/login", json={"username": "tester", "password": "secret"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+@pytest.fixture
+def commands():
+    recorder.reset()
+    return recorder
+
+
+@pytest.fixture(scope="session")
+def database(server):
+    """Test database, for data the API does not create"""
+    return MongoClient(MONGO_URL)[DB_NAME]
+
+
+@pytest.fixture(scope="session")
+def client_id(api):
+    return api.post("/api/clients", json={
+        "company_name": "Transports Test", "contact_name": "Test", "email": "client@example.fr",
+        "phone": "0102030405", "address": "1 rue du Test", "city": "Paris", "postal_code": "75001"
+    }).json()["id"]
+
+
+@pytest.fixture(scope="session")
+def create_vehicle(api):
+    def create(license_plate):
+        return api.post("/api/vehicles", json={
+            "type": "van", "brand": "Renault", "model": "Master", "license_plate": license_plate,
+            "first_registration": "2022-01-01T00:00:00Z", "technical_control_expiry": "2027-01-01T00:00:00Z",
+            "insurance_company": "Assur", "insurance_contract": license_plate, "insurance_amount": 100,
+            "insurance_expiry": "2027-01-01T00:00:00Z", "daily_rate": 50
+        }).json()["id"]
+    return create
+
+
+@pytest.fixture(scope="session")
+def create_order(api, client_id):
+    def create(vehicle_ids, start_date, end_date):
+        return api.post("/api/orders", json={
+            "client_id": client_id,
+            "items": [
+                {"vehicle_id": vehicle_id, "daily_rate": 50, "start_date": start_date, "end_date": end_date}
+                for vehicle_id in vehicle_ids
+            ]
+        })
+    return create
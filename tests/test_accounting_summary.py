@@ -0,0 +1,81 @@
+"""Accounting summary and exports over more entries than a single page, requested concurrently."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import pytest
+
+ACCOUNTS = [("411000", "Clients"), ("706000", "Prestations de services"), ("445571", "TVA collectée 20.0%")]
+PERIODS = [
+    ("2024-01-01T00:00:00+00:00", "2024-06-30T23:59:59+00:00"),
+    ("2024-07-01T00:00:00+00:00", "2024-12-31T23:59:59+00:00"),
+]
+
+
+@pytest.fixture(scope="module")
+def entries(database):
+    # 3000 entries over 2024, one every 2.9 hours
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    documents = [
+        {
+            "id": f"summary-{index}",
+            "entry_date": start + timedelta(hours=index * 2.9),
+            "invoice_id": f"invoice-{index // 3}",
+            "client_id": "client-summary",
+            "account_code": ACCOUNTS[index % 3][0],
+            "account_name": ACCOUNTS[index % 3][1],
+            "debit": (index % 97) + 0.25 if index % 3 == 0 else 0.0,
+            "credit": (index % 89) + 0.5 if index % 3 else 0.0,
+            "description": "Test",
+            "reference": f"FACT-{index // 3}",
+            "entry_type": "sale"
+        }
+        for index in range(3000)
+    ]
+    database.accounting_entries.insert_many([dict(document) for document in documents])
+    return documents
+
+
+def expected(entries, start_date, end_date):
+    start, end = datetime.fromisoformat(start_date), datetime.fromisoformat(end_date)
+    accounts = {}
+    for entry in entries:
+        if start <= entry["entry_date"] <= end:
+            account = accounts.setdefault(entry["account_code"], {"total_debit": 0.0, "total_credit": 0.0, "entries_count": 0})
+            account["total_debit"] += entry["debit"]
+            account["total_credit"] += entry["credit"]
+            account["entries_count"] += 1
+    return accounts
+
+
+def test_summary_covers_the_whole_period(api, entries):
+    response = api.get("/api/accounting/summary", params={"start_date": PERIODS[0][0], "end_date": PERIODS[1][1]})
+    assert response.status_code == 200
+    summary = response.json()["summary"]
+    assert summary["total_entries"] == 3000
+    assert summary["total_debit"] == pytest.approx(sum(entry["debit"] for entry in entries))
+
+
+def test_concurrent_summaries_do_not_mix(api, entries):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(
+            lambda period: api.get("/api/accounting/summary", params={"start_date": period[0], "end_date": period[1]}),
+            PERIODS * 4
+        ))
+
+    for period, response in zip(PERIODS * 4, responses):
+        accounts = response.json()["accounts"]
+        for code, account in expected(entries, *period).items():
+            assert accounts[code]["entries_count"] == account["entries_count"]
+            assert accounts[code]["total_debit"] == pytest.approx(account["total_debit"])
+            assert accounts[code]["balance"] == pytest.approx(account["total_debit"] - account["total_credit"])
+
+
+@pytest.mark.parametrize("format, header", [("csv", "Date;Compte"), ("ciel", "Date\tJournal"), ("sage", "Date_comptable;")])
+def test_exports_hold_every_entry_in_date_order(api, entries, format, header):
+    response = api.get(f"/api/accounting/export/{format}", params={"start_date": PERIODS[0][0], "end_date": PERIODS[1][1]})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith(header) and sum(line.startswith(header) for line in lines) == 1
+    assert len(lines) == 3001
+    if format == "csv":
+        dates = [datetime.strptime(line.split(";")[0], "%d/%m/%Y") for line in lines[1:]]
+        assert dates == sorted(dates)
@@ -0,0 +1,52 @@
+"""Receivables aging report totals."""
+from datetime import datetime, timedelta, timezone
+import uuid
+import pytest
+
+AS_OF = datetime(2026, 6, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def aging_client(database):
+    client_id = f"client-aging-{uuid.uuid4().hex[:6]}"
+
+    def invoice(days_overdue, total=120.0, amount_paid=0.0, status="sent", **fields):
+        due_date = AS_OF - timedelta(days=days_overdue) if days_overdue is not None else None
+        return {
+            "id": str(uuid.uuid4()), "invoice_number": f"FACT-AGING-{uuid.uuid4().hex[:6]}",
+            "order_id": "order-aging", "client_id": client_id, "items": [], "status": status,
+            "total_ht": total / 1.2, "total_vat": total - total / 1.2, "total_ttc": total, "grand_total": total,
+            "amount_paid": amount_paid, "remaining_amount": total - amount_paid,
+            "invoice_date": AS_OF - timedelta(days=40), "due_date": due_date, **fields
+        }
+    database.invoices.insert_many([
+        invoice(-5),
+        invoice(10),
+        invoice(45, amount_paid=20.0, status="partially_paid"),
+        invoice(75),
+        invoice(120),
+        # No due date: due on its invoice date, 40 days ago
+        invoice(None, total=60.0),
+        invoice(15, amount_paid=120.0, status="paid"),
+        # Issued after the as-of date
+        invoice(-20, invoice_date=AS_OF + timedelta(days=1)),
+    ])
+    return client_id
+
+
+def test_aging_totals_put_each_balance_in_one_bucket(api, aging_client):
+    report = api.get("/api/reports/aging", params={"client_id": aging_client, "as_of": AS_OF.isoformat()}).json()
+
+    totals = report["totals"]
+    assert {label: totals[label]["amount"] for label in report["buckets"]} == {
+        "not_due": 120.0, "1-30": 120.0, "31-60": 160.0, "61-90": 120.0, "90+": 120.0
+    }
+    assert totals["31-60"]["invoices"] == 2
+    assert totals["total"] == pytest.approx(640.0) and totals["invoices"] == 6
+
+    # The client row agrees with the totals
+    [row] = report["clients"]
+    assert {label: row[label] for label in report["buckets"]} == {
+        label: totals[label]["amount"] for label in report["buckets"]
+    }
+    assert row["total"] == pytest.approx(640.0) and row["invoices"] == 6
@@ -0,0 +1,111 @@
+"""Bank statements matched against the open invoices."""
+from datetime import date
+import io
+import pytest
+
+CAMT = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"><BkToCstmrStmt><Stmt>
+  <Ntry>
+    <Amt Ccy="EUR">300.00</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+    <BookgDt><Dt>2026-05-20</Dt></BookgDt><AcctSvcrRef>BATCH-1</AcctSvcrRef>
+    <NtryDtls>
+      <TxDtls>
+        <AmtDtls><TxAmt><Amt Ccy="EUR">120.00</Amt></TxAmt></AmtDtls>
+        <RltdPties><Dbtr><Nm>Garage Martin SARL</Nm></Dbtr></RltdPties>
+        <RmtInf><Ustrd>FACT2026-000001</Ustrd></RmtInf>
+      </TxDtls>
+      <TxDtls>
+        <AmtDtls><TxAmt><Amt Ccy="EUR">180.00</Amt></TxAmt></AmtDtls>
+        <Refs><EndToEndId>NOTPROVIDED</EndToEndId></Refs>
+      </TxDtls>
+    </NtryDtls>
+  </Ntry>
+  <Ntry>
+    <Amt Ccy="EUR">45.50</Amt><CdtDbtInd>DBIT</CdtDbtInd>
+    <BookgDt><Dt>2026-05-21</Dt></BookgDt><AcctSvcrRef>FEES-1</AcctSvcrRef>
+  </Ntry>
+</Stmt></BkToCstmrStmt></Document>
+"""
+
+
+@pytest.fixture(scope="module")
+def statement_client(api):
+    # A client of its own, the amounts of other tests' invoices must not be candidates
+    client_id = api.post("/api/clients", json={
+        "company_name": "Garage Martin SARL", "contact_name": "Paul Martin", "email": "martin@example.fr",
+        "phone": "0102030405", "address": "2 rue du Port", "city": "Lyon", "postal_code": "69001"
+    }).json()["id"]
+
+    def invoice(vehicle_id, start_date, end_date):
+        order = api.post("/api/orders", json={"client_id": client_id, "items": [
+            {"vehicle_id": vehicle_id, "daily_rate": 50, "start_date": start_date, "end_date": end_date}
+        ]}).json()
+        return api.get("/api/invoices", params={"order_id": order["id"]}).json()[0]
+    return invoice
+
+
+def import_statement(api, content, filename="releve.csv"):
+    response = api.post("/api/payments/import", files={"file": (filename, io.BytesIO(content.encode("cp1252")))})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_csv_lines_are_matched_by_number_then_by_client_and_amount(api, database, create_vehicle, statement_client):
+    # 3 days at 50€ HT, 180€ TTC and 4 days, 240€ TTC
+    by_number = statement_client(create_vehicle("BS-001-AA"), "2026-05-01T00:00:00Z", "2026-05-03T00:00:00Z")
+    by_amount = statement_client(create_vehicle("BS-002-AA"), "2026-05-01T00:00:00Z", "2026-05-04T00:00:00Z")
+    number = by_number["invoice_number"].replace("-", " ")
+    statement = (
+        "Date opération;Libellé;Montant;Référence\n"
+        f"15/05/2026;VIR SEPA {number} PARTIEL;100,00;REF-1\n"
+        "16/05/2026;VIR SEPA GARAGE MARTIN;240,00;REF-2\n"
+        "16/05/2026;VIR SEPA INCONNU;80,00;REF-3\n"
+        "17/05/2026;PRLV ASSURANCE;-75,00;REF-4\n"
+        "pas une date;VIR;10,00;REF-5\n"
+    )
+
+    summary = import_statement(api, statement)
+    assert summary["lines"] == 4 and summary["credits"] == 3 and summary["invalid_rows"] == [6]
+    assert summary["payments"] == 2 and summary["amount_matched"] == pytest.approx(340)
+    assert summary["review"] == 1
+
+    paid_by_number = database.invoices.find_one({"id": by_number["id"]})
+    assert paid_by_number["amount_paid"] == pytest.approx(100) and paid_by_number["status"] == "partially_paid"
+    assert database.invoices.find_one({"id": by_amount["id"]})["status"] == "paid"
+
+    # The amount alone is not enough, the unnamed line waits for a review
+    reviews = api.get("/api/payments/reviews", params={"import_id": summary["id"]}).json()
+    assert [review["reason"] for review in reviews] == ["amount_only"]
+
+    # Importing the statement again books nothing twice
+    again = import_statement(api, statement)
+    assert again["already_imported"] == 3 and again["payments"] == 0 and again["review"] == 0
+
+
+def test_camt_batch_booking_is_split_per_transfer(server):
+    from bank_statement import BankStatement
+    statement = BankStatement(io.BytesIO(CAMT.encode()), "statement.xml")
+    lines = list(statement)
+
+    assert [(line.amount, line.bank_reference) for line in lines] == [
+        (120.0, "BATCH-1/1"), (180.0, "BATCH-1/2"), (-45.5, "FEES-1")
+    ]
+    assert lines[0].counterparty == "Garage Martin SARL" and lines[0].label == "FACT2026-000001"
+    assert statement.invalid_rows == []
+
+
+def test_one_transfer_settles_the_invoices_it_quotes_in_full(server):
+    from bank_statement import InvoiceMatcher, StatementLine
+    matcher = InvoiceMatcher([
+        {"id": "a", "invoice_number": "FACT2026-000010", "client_id": "c", "remaining_amount": 120.0},
+        {"id": "b", "invoice_number": "FACT2026-000011", "client_id": "c", "remaining_amount": 80.5},
+    ], [])
+
+    def line(amount):
+        return StatementLine("id", date(2026, 5, 1), amount, "FACT2026-000010 FACT2026-000011", "", None)
+
+    assert matcher.match(line(150)).reason == "several_invoices"
+    match = matcher.match(line(200.5))
+    assert match.reason == "invoice_numbers" and match.allocations == [("a", 120.0), ("b", 80.5)]
+    # Both balances are settled, a second transfer quoting them is not booked again
+    assert matcher.match(line(200.5)).allocations == []
@@ -0,0 +1,62 @@
+"""Vehicle booking conflicts."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import uuid
+
+
+def test_overlapping_order_is_rejected(create_vehicle, create_order):
+    vehicle_id = create_vehicle("BK-001-AA")
+    assert create_order([vehicle_id], "2026-06-01T00:00:00Z", "2026-06-10T00:00:00Z").status_code == 200
+
+    response = create_order([vehicle_id], "2026-06-10T00:00:00Z", "2026-06-15T00:00:00Z")
+    assert response.status_code == 409
+    assert "BK-001-AA" in response.json()["detail"]
+    # Next day is free
+    assert create_order([vehicle_id], "2026-06-11T00:00:00Z", "2026-06-15T00:00:00Z").status_code == 200
+
+
+def test_same_vehicle_twice_in_one_order_is_rejected(create_vehicle, api, client_id):
+    vehicle_id = create_vehicle("BK-002-AA")
+    response = api.post("/api/orders", json={"client_id": client_id, "items": [
+        {"vehicle_id": vehicle_id, "daily_rate": 50, "start_date": "2026-06-01T00:00:00Z", "end_date": "2026-06-05T00:00:00Z"},
+        {"vehicle_id": vehicle_id, "daily_rate": 50, "start_date": "2026-06-04T00:00:00Z", "end_date": "2026-06-08T00:00:00Z"}
+    ]})
+    assert response.status_code == 409
+
+
+def test_concurrent_orders_book_a_period_once(create_vehicle, create_order):
+    vehicle_id = create_vehicle("BK-003-AA")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(
+            lambda _: create_order([vehicle_id], "2026-07-01T00:00:00Z", "2026-07-05T00:00:00Z"), range(8)
+        ))
+    assert sorted(response.status_code for response in responses) == [200] + [409] * 7
+
+
+def test_orders_stored_by_another_worker_are_checked(create_vehicle, create_order, database):
+    # Written directly, as another worker would, the local index does not know it
+    vehicle_id = create_vehicle("BK-004-AA")
+    database.orders.insert_one({
+        "id": str(uuid.uuid4()), "order_number": f"CMD-OTHER-{uuid.uuid4().hex[:6]}", "status": "active",
+        "items": [{
+            "vehicle_id": vehicle_id,
+            "start_date": datetime(2026, 8, 1, tzinfo=timezone.utc),
+            "end_date": datetime(2026, 8, 31, tzinfo=timezone.utc)
+        }]
+    })
+    assert create_order([vehicle_id], "2026-08-15T00:00:00Z", "2026-09-05T00:00:00Z").status_code == 409
+
+
+def test_cancelled_order_releases_its_vehicle(api, create_vehicle, create_order):
+    vehicle_id = create_vehicle("BK-005-AA")
+    order_id = create_order([vehicle_id], "2026-09-01T00:00:00Z", "2026-09-10T00:00:00Z").json()["id"]
+
+    cancelled = api.put(f"/api/orders/{order_id}/cancel")
+    assert cancelled.status_code == 200
+    assert cancelled.json()["status"] == "cancelled"
+
+    availability = api.get("/api/vehicles/availability", params={
+        "start": "2026-09-01T00:00:00Z", "end": "2026-09-10T00:00:00Z"
+    }).json()
+    assert next(vehicle for vehicle in availability if vehicle["vehicle_id"] == vehicle_id)["available"]
+    assert create_order([vehicle_id], "2026-09-05T00:00:00Z", "2026-09-12T00:00:00Z").status_code == 200
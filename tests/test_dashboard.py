@@ -0,0 +1,12 @@
+"""Dashboard figures served from the cache."""
+
+
+def test_cancelled_order_is_not_served_from_the_cache(api, create_vehicle, create_order):
+    order_id = create_order([create_vehicle("DB-001-AA")], "2026-12-01T00:00:00Z", "2026-12-03T00:00:00Z").json()["id"]
+    dashboard = api.get("/api/dashboard").json()
+    assert {order["id"]: order["status"] for order in dashboard["recent_orders"]}[order_id] == "active"
+    assert dashboard["stats"]["invoices"] >= 1
+
+    assert api.put(f"/api/orders/{order_id}/cancel").status_code == 200
+    recent_orders = api.get("/api/dashboard").json()["recent_orders"]
+    assert {order["id"]: order["status"] for order in recent_orders}[order_id] == "cancelled"
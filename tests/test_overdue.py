@@ -0,0 +1,80 @@
+"""Invoices going overdue, by the invoice_overdue job or when a payment is deleted."""
+from datetime import datetime, timedelta, timezone
+import uuid
+import pytest
+from tests.test_payment_ledger import pay
+
+
+def insert_invoice(database, due_in_days, status="sent", **fields):
+    invoice = {
+        "id": str(uuid.uuid4()), "invoice_number": f"FACT-OVERDUE-{uuid.uuid4().hex[:6]}",
+        "order_id": "order-overdue", "client_id": "client-overdue", "items": [], "status": status,
+        "total_ht": 100.0, "total_vat": 20.0, "total_ttc": 120.0, "grand_total": 120.0, "amount_paid": 0.0,
+        "invoice_date": datetime.now(timezone.utc) + timedelta(days=due_in_days - 30),
+        "due_date": datetime.now(timezone.utc) + timedelta(days=due_in_days), **fields
+    }
+    database.invoices.insert_one(dict(invoice))
+    return invoice["id"]
+
+
+def test_job_flags_unpaid_invoices_past_due_with_their_bucket(api, database):
+    invoices = {
+        "due": insert_invoice(database, 3),
+        "1-30": insert_invoice(database, -1),
+        "31-60": insert_invoice(database, -45, status="sent"),
+        "61-90": insert_invoice(database, -61, status="partially_paid", amount_paid=20.0),
+        "90+": insert_invoice(database, -200),
+        "paid": insert_invoice(database, -10, status="paid", amount_paid=120.0),
+        "draft": insert_invoice(database, -10, status="draft"),
+    }
+    run = api.post("/api/system/jobs/invoice_overdue/run")
+    assert run.status_code == 200
+
+    stored = {key: database.invoices.find_one({"id": invoice_id}) for key, invoice_id in invoices.items()}
+    assert stored["due"]["status"] == "sent" and stored["paid"]["status"] == "paid"
+    # Never issued to the client, a draft is not overdue
+    assert stored["draft"]["status"] == "draft" and stored["draft"].get("overdue_since") is None
+    for bucket in ("1-30", "31-60", "61-90", "90+"):
+        assert stored[bucket]["status"] == "overdue"
+        assert stored[bucket]["overdue_bucket"] == bucket
+        assert stored[bucket]["overdue_since"] is not None
+
+    # A second run changes nothing
+    assert api.post("/api/system/jobs/invoice_overdue/run").json()["result"]["bucket_changes"] == 0
+    assert database.invoices.find_one({"id": invoices["1-30"]})["overdue_since"] == stored["1-30"]["overdue_since"]
+
+
+@pytest.fixture
+def paid_past_due_invoice(api, database, create_vehicle, create_order):
+    vehicle_id = create_vehicle(f"OV-{uuid.uuid4().hex[:3].upper()}-AA")
+    order_id = create_order([vehicle_id], "2026-03-01T00:00:00Z", "2026-03-02T00:00:00Z").json()["id"]
+    invoice = api.get("/api/invoices", params={"order_id": order_id}).json()[0]
+    # Due 40 days ago, paid in time
+    database.invoices.update_one(
+        {"id": invoice["id"]}, {"$set": {"due_date": datetime.now(timezone.utc) - timedelta(days=40)}}
+    )
+    payment = pay(api, invoice["id"], invoice["grand_total"]).json()
+    assert database.invoices.find_one({"id": invoice["id"]})["status"] == "paid"
+    return invoice, payment
+
+
+def test_deleted_payment_puts_a_past_due_invoice_overdue(api, database, paid_past_due_invoice):
+    invoice, payment = paid_past_due_invoice
+    assert api.delete(f"/api/payments/{payment['id']}").status_code == 200
+
+    stored = database.invoices.find_one({"id": invoice["id"]})
+    assert stored["status"] == "overdue"
+    assert stored["overdue_bucket"] == "31-60"
+    assert stored["overdue_since"] is not None
+    overdue = api.get("/api/invoices/overdue", params={"bucket": "31-60"}).json()
+    assert invoice["id"] in {overdue_invoice["id"] for overdue_invoice in overdue}
+
+
+def test_partial_payment_keeps_an_invoice_overdue(api, database, paid_past_due_invoice):
+    invoice, payment = paid_past_due_invoice
+    api.delete(f"/api/payments/{payment['id']}")
+    overdue_since = database.invoices.find_one({"id": invoice["id"]})["overdue_since"]
+
+    assert pay(api, invoice["id"], 10).status_code == 200
+    stored = database.invoices.find_one({"id": invoice["id"]})
+    assert stored["status"] == "overdue" and stored["overdue_since"] == overdue_since
@@ -0,0 +1,44 @@
+"""Keyset pagination over date fields still holding legacy ISO strings."""
+from datetime import datetime, timedelta, timezone
+import uuid
+import pytest
+
+
+@pytest.fixture
+def vehicle_documents(database):
+    vehicle_id = str(uuid.uuid4())
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    documents = []
+    for day in range(6):
+        uploaded_at = start + timedelta(days=day)
+        documents.append({
+            "id": str(uuid.uuid4()), "vehicle_id": vehicle_id, "label": f"Document {day}",
+            "filename": f"{day}.pdf", "original_filename": f"{day}.pdf", "document_type": "other",
+            "file_path": f"/tmp/{day}.pdf", "file_size": 1, "mime_type": "application/pdf",
+            # Every other document not migrated yet
+            "uploaded_at": uploaded_at.isoformat() if day % 2 else uploaded_at
+        })
+    database.vehicle_documents.insert_many(documents)
+    return vehicle_id, [document["id"] for document in documents]
+
+
+def all_pages(api, url, **params):
+    pages = []
+    cursor = None
+    while True:
+        response = api.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([document["id"] for document in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_mix_native_and_string_dates_in_date_order(api, vehicle_documents, order):
+    vehicle_id, ids = vehicle_documents
+    pages = all_pages(api, f"/api/vehicles/{vehicle_id}/documents", limit=2, order=order)
+
+    assert len(pages) == 3
+    listed = [document_id for page in pages for document_id in page]
+    assert listed == (ids if order == "asc" else ids[::-1])
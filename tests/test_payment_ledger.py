@@ -0,0 +1,73 @@
+"""Concurrent payments against one invoice."""
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+
+@pytest.fixture
+def invoice(api, create_vehicle, create_order):
+    # 10 days at 50€ HT, 600€ TTC
+    vehicle_id = create_vehicle("PL-001-AA")
+    order_id = create_order([vehicle_id], "2026-05-01T00:00:00Z", "2026-05-10T00:00:00Z").json()["id"]
+    invoice = api.get("/api/invoices", params={"order_id": order_id}).json()[0]
+    assert invoice["grand_total"] == 600
+    return invoice
+
+
+def reload(api, invoice):
+    return api.get("/api/invoices", params={"order_id": invoice["order_id"]}).json()[0]
+
+
+def pay(api, invoice_id, amount, idempotency_key=None):
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+    return api.post(
+        f"/api/invoices/{invoice_id}/payments",
+        json={"amount": amount, "payment_date": "2026-05-15T00:00:00Z", "payment_method": "transfer"},
+        headers=headers
+    )
+
+
+def test_concurrent_payments_never_overpay(api, invoice):
+    # 300 payments of 2.5€ for 240 that fit in the invoice
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        responses = list(executor.map(lambda _: pay(api, invoice["id"], 2.5), range(300)))
+
+    accepted = [response for response in responses if response.status_code == 200]
+    assert len(accepted) == 240
+    assert all(response.status_code == 400 for response in responses if response.status_code != 200)
+
+    updated = reload(api, invoice)
+    assert updated["amount_paid"] == pytest.approx(600)
+    assert updated["remaining_amount"] == pytest.approx(0)
+    assert updated["status"] == "paid"
+    assert len(api.get(f"/api/invoices/{invoice['id']}/payments").json()) == 240
+
+
+def test_concurrent_deletes_restore_balance(api, invoice):
+    payment_ids = [pay(api, invoice["id"], 10).json()["id"] for _ in range(20)]
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        list(executor.map(lambda payment_id: api.delete(f"/api/payments/{payment_id}"), payment_ids * 2))
+
+    updated = reload(api, invoice)
+    assert updated["amount_paid"] == pytest.approx(0)
+    assert updated["remaining_amount"] == pytest.approx(600)
+    assert updated["status"] == "draft"
+
+
+def test_idempotency_key_records_payment_once(api, invoice):
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(executor.map(lambda _: pay(api, invoice["id"], 100, "transfer-42"), range(50)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert reload(api, invoice)["amount_paid"] == pytest.approx(100)
+    assert pay(api, "another-invoice", 100, "transfer-42").status_code == 409
+
+
+def test_payment_of_deleted_invoice_can_be_deleted(api, database, invoice):
+    payment_id = pay(api, invoice["id"], 100).json()["id"]
+    database.invoices.delete_one({"id": invoice["id"]})
+
+    assert api.delete(f"/api/payments/{payment_id}").status_code == 200
+    assert database.payments.find_one({"id": payment_id}) is None
+    assert api.delete(f"/api/payments/{payment_id}").status_code == 404
@@ -0,0 +1,26 @@
+"""Payment terms paragraph of invoice PDFs with generated clauses."""
+from datetime import datetime, timezone
+
+INVOICE = {
+    "invoice_date": datetime(2026, 5, 1, tzinfo=timezone.utc),
+    "due_date": datetime(2026, 5, 31, tzinfo=timezone.utc),
+    "total_ttc": 600.0
+}
+
+
+def test_generated_clause_is_escaped(server):
+    from payment_terms import invoice_payment_terms
+    clause = (
+        "Pas d’escompte <b>anticipé</b> & pénalités à trois fois le taux d’intérêt légal, "
+        "indemnité de 40 € pour frais de recouvrement."
+    )
+    terms = invoice_payment_terms(INVOICE, {"30_days": clause})
+    assert "&lt;b&gt;anticipé&lt;/b&gt; &amp; pénalités" in terms
+    assert terms.count("<") == 1  # the <br/> of the template only
+
+
+def test_clause_missing_a_legal_mention_falls_back_to_the_template(server):
+    from payment_terms import LATE_PAYMENT_CLAUSE, invoice_payment_terms
+    # Quotes 40 but not the 40 € indemnity
+    clause = "Pas d'escompte. Pénalités à trois fois le taux d'intérêt légal après 40 jours, frais de recouvrement dus."
+    assert invoice_payment_terms(INVOICE, {"30_days": clause}).endswith(LATE_PAYMENT_CLAUSE)
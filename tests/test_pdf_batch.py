@@ -0,0 +1,49 @@
+"""Invoice PDFs generated in batch, streamed as a ZIP archive."""
+import io
+import json
+import zipfile
+import pytest
+
+
+@pytest.fixture(scope="module")
+def batch_invoices(api, create_vehicle, create_order):
+    invoices = []
+    for license_plate in ("PB-001-AA", "PB-002-AA"):
+        order_id = create_order([create_vehicle(license_plate)], "2026-10-01T00:00:00Z", "2026-10-03T00:00:00Z").json()["id"]
+        invoices.append(api.get("/api/invoices", params={"order_id": order_id}).json()[0])
+    return invoices
+
+
+def generate_batch(api, invoice_ids):
+    response = api.post("/api/invoices/pdf-batch", json={"invoice_ids": invoice_ids})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    return zipfile.ZipFile(io.BytesIO(response.content))
+
+
+def test_archive_holds_the_pdfs_and_a_manifest(api, database, batch_invoices):
+    invoice_ids = [invoice["id"] for invoice in batch_invoices]
+    archive = generate_batch(api, invoice_ids + ["missing-invoice"])
+
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["invoices"] == 2
+    assert [entry["invoice_id"] for entry in manifest["generated"]] == invoice_ids
+    assert not any(entry["cached"] for entry in manifest["generated"])
+    assert manifest["failed"] == [{"invoice_id": "missing-invoice", "invoice_number": None, "error": "Invoice not found"}]
+    assert archive.namelist() == [entry["file"] for entry in manifest["generated"]] + ["manifest.json"]
+    for entry in manifest["generated"]:
+        assert archive.read(entry["file"]).startswith(b"%PDF")
+
+    # The PDFs are attached to their invoices, drafts become sent
+    for invoice_id in invoice_ids:
+        stored = database.invoices.find_one({"id": invoice_id})
+        assert stored["pdf_blob_id"] and stored["pdf_stale"] is False
+        assert stored["status"] == "sent"
+
+
+def test_unchanged_invoices_reuse_their_stored_pdf(api, batch_invoices):
+    invoice_ids = [invoice["id"] for invoice in batch_invoices]
+    generate_batch(api, invoice_ids)
+
+    manifest = json.loads(generate_batch(api, invoice_ids).read("manifest.json"))
+    assert [entry["cached"] for entry in manifest["generated"]] == [True, True]
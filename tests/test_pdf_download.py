@@ -0,0 +1,94 @@
+"""Download of stored invoice PDFs: validators, ranges and staleness."""
+import pytest
+
+VEHICLE = {
+    "type": "van", "brand": "Renault", "model": "Master", "license_plate": "PD-001-AA",
+    "first_registration": "2022-01-01T00:00:00Z", "technical_control_expiry": "2027-01-01T00:00:00Z",
+    "insurance_company": "Assur", "insurance_contract": "PD-001-AA", "insurance_amount": 100,
+    "insurance_expiry": "2027-01-01T00:00:00Z", "daily_rate": 50
+}
+
+
+@pytest.fixture(scope="module")
+def generated_invoice(api, create_order):
+    vehicle_id = api.post("/api/vehicles", json=VEHICLE).json()["id"]
+    order_id = create_order([vehicle_id], "2026-11-01T00:00:00Z", "2026-11-04T00:00:00Z").json()["id"]
+    invoice = api.get("/api/invoices", params={"order_id": order_id}).json()[0]
+    assert api.post(f"/api/invoices/{invoice['id']}/generate-pdf").status_code == 200
+    return invoice, vehicle_id
+
+
+def download(api, invoice, **headers):
+    return api.get(f"/api/invoices/{invoice['id']}/download-pdf", headers=headers)
+
+
+def test_download_is_validated_by_its_etag(api, generated_invoice):
+    invoice, _ = generated_invoice
+    response = download(api, invoice)
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    etag = response.headers["etag"]
+
+    not_modified = download(api, invoice, **{"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert download(api, invoice, **{"If-None-Match": '"another"'}).status_code == 200
+
+
+def test_download_serves_byte_ranges(api, generated_invoice):
+    invoice, _ = generated_invoice
+    full = download(api, invoice)
+    size = len(full.content)
+
+    partial = download(api, invoice, Range="bytes=0-99")
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 0-99/{size}"
+    assert partial.content == full.content[:100]
+
+    suffix = download(api, invoice, Range="bytes=-10")
+    assert suffix.status_code == 206 and suffix.content == full.content[-10:]
+
+    # A range of another version of the file gets the whole file
+    assert download(api, invoice, Range="bytes=0-99", **{"If-Range": '"another"'}).status_code == 200
+    unsatisfiable = download(api, invoice, Range=f"bytes={size}-")
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{size}"
+
+
+def test_vehicle_change_marks_the_pdf_stale(api, generated_invoice):
+    invoice, vehicle_id = generated_invoice
+    assert download(api, invoice).headers["x-pdf-stale"] == "false"
+
+    # Fields not printed on the invoice leave it alone
+    assert api.put(f"/api/vehicles/{vehicle_id}", json={**VEHICLE, "daily_rate": 60}).status_code == 200
+    assert download(api, invoice).headers["x-pdf-stale"] == "false"
+
+    assert api.put(f"/api/vehicles/{vehicle_id}", json={**VEHICLE, "license_plate": "PD-002-AA"}).status_code == 200
+    assert download(api, invoice).headers["x-pdf-stale"] == "true"
+
+    # Generating it again renders the new plate
+    generated = api.post(f"/api/invoices/{invoice['id']}/generate-pdf").json()
+    assert generated["cached"] is False
+    assert download(api, invoice).headers["x-pdf-stale"] == "false"
+
+
+def test_new_payment_clause_marks_the_pdf_stale(api, server, generated_invoice, monkeypatch):
+    invoice, _ = generated_invoice
+    api.post(f"/api/invoices/{invoice['id']}/generate-pdf")
+    assert download(api, invoice).headers["x-pdf-stale"] == "false"
+
+    async def generate(bucket):
+        return (
+            "Aucun escompte pour paiement anticipé. Pénalités de retard à trois fois le taux d'intérêt légal "
+            "et indemnité forfaitaire de 40 € pour frais de recouvrement."
+        )
+    monkeypatch.setattr(server.payment_terms_service, "enabled", True)
+    monkeypatch.setattr(server.payment_terms_service, "_generate", generate)
+    run = api.post("/api/system/jobs/payment_terms/run").json()
+    assert run["result"]["changed"] and not run["result"]["failed"]
+    assert download(api, invoice).headers["x-pdf-stale"] == "true"
+
+    # Same wording again, nothing changed
+    api.post(f"/api/invoices/{invoice['id']}/generate-pdf")
+    assert api.post("/api/system/jobs/payment_terms/run").json()["result"]["changed"] == []
+    assert download(api, invoice).headers["x-pdf-stale"] == "false"
@@ -0,0 +1,31 @@
+"""Number of MongoDB commands issued per request."""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def vehicle_ids(create_vehicle):
+    return [create_vehicle(f"QC-{i:03d}-AA") for i in range(20)]
+
+
+def test_order_creation_commands_do_not_grow_with_items(create_order, vehicle_ids, commands):
+    create_order(vehicle_ids[:1], "2026-01-01T00:00:00Z", "2026-01-31T00:00:00Z")  # warm the authenticated user cache
+
+    commands.reset()
+    assert create_order(vehicle_ids[:1], "2026-02-01T00:00:00Z", "2026-02-28T00:00:00Z").status_code == 200
+    single_item = commands.total
+
+    commands.reset()
+    assert create_order(vehicle_ids, "2026-03-01T00:00:00Z", "2026-03-31T00:00:00Z").status_code == 200
+    assert commands.commands[("find", "vehicles")] == 1
+    assert commands.total == single_item
+
+
+def test_pdf_generation_reads_vehicles_once(api, create_order, vehicle_ids, commands):
+    order_id = create_order(vehicle_ids, "2026-04-01T00:00:00Z", "2026-04-30T00:00:00Z").json()["id"]
+    invoice_id = api.get("/api/invoices", params={"order_id": order_id}).json()[0]["id"]
+
+    commands.reset()
+    assert api.post(f"/api/invoices/{invoice_id}/generate-pdf").status_code == 200
+    assert commands.commands[("find", "vehicles")] == 1
+    assert commands.commands[("find", "clients")] == 1
+    assert commands.total <= 6
@@ -0,0 +1,135 @@
+"""Order renewals interrupted halfway and run again."""
+from datetime import datetime, timezone
+import uuid
+import pytest
+
+
+@pytest.fixture
+def renewable_order(api, client_id, create_vehicle):
+    # Weekly rental that ended in January, its next period is due
+    vehicle_id = create_vehicle("RN-001-AA")
+    order = api.post("/api/orders", json={"client_id": client_id, "items": [{
+        "vehicle_id": vehicle_id, "daily_rate": 50, "is_renewable": True,
+        "rental_period": "weeks", "rental_duration": 1,
+        "start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-07T00:00:00Z"
+    }]}).json()
+    invoice = api.get("/api/invoices", params={"order_id": order["id"]}).json()[0]
+    assert api.put(f"/api/invoices/{invoice['id']}/mark-paid").status_code == 200
+    return order
+
+
+def renewals_of(database, order_id):
+    renewal_orders = list(database.orders.find({"renewed_from": order_id}))
+    invoices = list(database.invoices.find({"order_id": {"$in": [order["id"] for order in renewal_orders]}}))
+    return renewal_orders, invoices
+
+
+def test_retried_renewal_does_not_bill_twice(server, api, database, renewable_order, monkeypatch):
+    # Renewal orders get written, then invoicing fails
+    def failing_build_invoice(*args, **kwargs):
+        raise RuntimeError("invoicing unavailable")
+    monkeypatch.setattr(server, "build_invoice", failing_build_invoice)
+    # Nothing got renewed, the run is a failure
+    assert api.post("/api/orders/renew").status_code == 500
+    run = database.scheduler_runs.find_one({"job": "order_renewal"}, sort=[("started_at", -1)])
+    assert run["status"] == "failed" and run["result"]["failed"] == 1
+    renewal_orders, invoices = renewals_of(database, renewable_order["id"])
+    assert len(renewal_orders) == 1 and invoices == []
+    original = database.orders.find_one({"id": renewable_order["id"]})
+    assert original["items"][0]["end_date"] == datetime(2026, 1, 7, tzinfo=timezone.utc)
+
+    monkeypatch.undo()
+    stats = api.post("/api/orders/renew").json()["stats"]
+    assert stats["renewed"] == 1 and stats["failed"] == 0
+
+    # The renewal order of the first run got invoiced once, the item moved one period
+    renewal_orders, invoices = renewals_of(database, renewable_order["id"])
+    assert len(renewal_orders) == 1 and len(invoices) == 1
+    assert renewal_orders[0]["items"][0]["start_date"] == datetime(2026, 1, 8, tzinfo=timezone.utc)
+    original = database.orders.find_one({"id": renewable_order["id"]})
+    assert original["items"][0]["end_date"] == datetime(2026, 1, 14, tzinfo=timezone.utc)
+
+
+def test_renewal_orders_are_not_renewed_themselves(api, database, renewable_order):
+    # First cycle, the renewal invoice gets paid
+    assert api.post("/api/orders/renew").status_code == 200
+    [first], [invoice] = renewals_of(database, renewable_order["id"])
+    assert api.put(f"/api/invoices/{invoice['id']}/mark-paid").status_code == 200
+
+    # Second cycle: only the original order renews, once, for the next period
+    assert api.post("/api/orders/renew").status_code == 200
+    renewal_orders, invoices = renewals_of(database, renewable_order["id"])
+    assert sorted(order["items"][0]["start_date"] for order in renewal_orders) == [
+        datetime(2026, 1, 8, tzinfo=timezone.utc), datetime(2026, 1, 15, tzinfo=timezone.utc)
+    ]
+    assert len(invoices) == 2
+    assert renewals_of(database, first["id"]) == ([], [])
+
+
+class FailingLedger:
+    """Database whose accounting_entries writes fail"""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        collection = getattr(self._db, name)
+        if name != "accounting_entries":
+            return collection
+
+        class Collection:
+            def __getattr__(self, attribute):
+                return getattr(collection, attribute)
+
+            async def insert_many(self, *args, **kwargs):
+                raise RuntimeError("ledger unavailable")
+        return Collection()
+
+
+def test_lost_accounting_entries_are_counted(server, api, database, renewable_order, monkeypatch):
+    monkeypatch.setattr(server, "db", FailingLedger(server.db))
+    response = api.post("/api/orders/renew")
+    assert response.status_code == 200 and response.json()["stats"]["entries_failed"] >= 1
+
+    # The invoice stands, without its entries
+    _, [invoice] = renewals_of(database, renewable_order["id"])
+    assert database.accounting_entries.count_documents({"invoice_id": invoice["id"]}) == 0
+
+
+@pytest.mark.parametrize("end_date, expected_end", [
+    # Periods start on the 31st: as many days as the following month
+    (datetime(2026, 1, 30, tzinfo=timezone.utc), datetime(2026, 2, 27, tzinfo=timezone.utc)),
+    (datetime(2026, 3, 30, tzinfo=timezone.utc), datetime(2026, 4, 29, tzinfo=timezone.utc)),
+    (datetime(2026, 12, 30, tzinfo=timezone.utc), datetime(2027, 1, 30, tzinfo=timezone.utc)),
+])
+def test_monthly_period_starting_at_month_end(server, end_date, expected_end):
+    item = server.OrderItem(
+        vehicle_id="vehicle", daily_rate=50, is_renewable=True,
+        rental_period="months", rental_duration=1, end_date=end_date
+    )
+    assert server.next_rental_period(item)[1] == expected_end
+
+
+def test_manual_run_leaves_the_scheduled_slot(server, api, database):
+    assert api.post("/api/system/jobs/order_renewal/run").status_code == 200
+    lock = database.scheduler_locks.find_one({"_id": "order_renewal"})
+    # Still unclaimed, the day's scheduled run goes ahead
+    assert lock["slot"].year == 1
+
+
+def test_forecast_skips_legacy_renewal_orders(api, database, client_id):
+    # Renewal orders written before renewed_from existed only carry a -R suffix
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    def order(order_number, vehicle_id):
+        return {
+            "id": str(uuid.uuid4()), "order_number": order_number, "client_id": client_id, "status": "active",
+            "items": [{
+                "vehicle_id": vehicle_id, "daily_rate": 50, "quantity": 1, "is_renewable": True,
+                "rental_period": "months", "rental_duration": 1, "start_date": today, "end_date": today
+            }]
+        }
+    database.orders.insert_many([order("CMD-LEGACY-1", "original"), order("CMD-LEGACY-1-R1767225600", "renewal")])
+
+    forecast = api.get("/api/forecast/renewals", params={"months": 3}).json()
+    projected = {vehicle["vehicle_id"] for vehicle in forecast["vehicles"]}
+    assert "original" in projected and "renewal" not in projected